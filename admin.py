@@ -5,11 +5,16 @@ import time
 import toml
 import os
 
+import perf
+
 # Import shared utilities
 from utils import (
-    load_rsvps, save_rsvps, get_deadline_datetime, is_past_deadline,
-    get_time_until_deadline, format_time_remaining
+    load_rsvps, save_rsvp_changes, get_rsvp_aggregates, search_rsvps, get_rsvp_export, get_deadline_policy,
+    format_time_remaining
 )
+from rsvp_edits import build_changeset
+from rsvp_schema import editable_rsvps
+from rsvp_exports import EXPORTS, ATTENDING_VALUES, available_exports
 
 # Admin password (configured in secrets.toml)
 ADMIN_PASSWORD = st.secrets["admin"]["password"]
@@ -24,6 +29,7 @@ def admin_welcome_header():
     """Display a welcome header for authenticated admin users"""
     st.info(":material/admin_panel_settings: **Welcome, Admin!** You are logged in to the Wedding RSVP Management System")
 
+@perf.timed("page.admin_login")
 def admin_login_page():
     """Admin login page"""
     st.title(":material/lock: Admin Login")
@@ -49,6 +55,7 @@ def admin_login_page():
     st.markdown("---")
     st.info(":material/lightbulb: If you're a guest looking to submit your RSVP, please use the RSVP form instead.")
 
+@perf.timed("page.admin_summary")
 def admin_summary_page():
     """Admin summary page"""
     if not st.session_state.authenticated:
@@ -66,27 +73,24 @@ def admin_summary_page():
     st.title(f":material/bar_chart: RSVP Summary: (Time Zone: ({st.secrets['deadline'].get('timezone', 'UTC')})")
 
     # Display deadline status
-    deadline = get_deadline_datetime()
+    policy = get_deadline_policy()
+    deadline = policy.deadline
     if deadline:
+        deadline_status = policy.status()
         col1, col2 = st.columns(2)
 
         with col1:
-            if is_past_deadline():
+            if deadline_status.past:
                 st.error(f":material/schedule: **Deadline has passed**")
                 st.write(f"Deadline was: {deadline.strftime('%B %d, %Y at %I:%M %p %Z')}")
 
                 # Check if still in grace period
-                grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-                grace_end = deadline + timedelta(hours=grace_hours)
-                now = datetime.now(deadline.tzinfo)
-
-                if now <= grace_end:
-                    st.warning(f":material/timer: Still in grace period until: {grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
+                if deadline_status.in_grace:
+                    st.warning(f":material/timer: Still in grace period until: {policy.grace_end.strftime('%B %d, %Y at %I:%M %p %Z')}")
                 else:
                     st.info(":material/block: Grace period has also ended")
             else:
-                time_remaining = get_time_until_deadline()
-                formatted_time = format_time_remaining(time_remaining)
+                formatted_time = format_time_remaining(deadline_status.remaining)
                 st.success(f":material/schedule: **Deadline is active**")
                 st.error(f"Deadline: {deadline.strftime('%B %d, %Y at %I:%M %p %Z')}")
                 st.info(f"Time remaining: {formatted_time}")
@@ -94,32 +98,31 @@ def admin_summary_page():
         with col2:
             # Deadline configuration display
             st.info(":material/settings: **Deadline Configuration**")
-            warning_days = st.secrets["deadline"].get("warning_days", 7)
-            grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-
-            st.warning(f"Warning period: {warning_days} days before deadline")
-            st.warning(f"Grace period: {grace_hours} hours after deadline")
+            st.warning(f"Warning period: {policy.warning_days} days before deadline")
+            st.warning(f"Grace period: {policy.grace_hours} hours after deadline")
 
         st.markdown("---")
 
-    # Load data
-    df = load_rsvps()
+    # Running totals, no need to count the whole table
+    aggregates = get_rsvp_aggregates()
     
-    if not df.empty:
+    if aggregates.total_rows > 0:
         st.write("**RSVP Gästeliste**")
         # Zeige alle Gäste mit Kontaktperson, Essenspräferenz und Unverträglichkeiten
-        guest_df = df[df['attending'] == 'Ja'].copy()
-        if guest_df.empty:
+        if aggregates.row_count('Ja') == 0:
             st.info(":material/inbox: Noch keine Zusagen.")
         else:
             # Essenspräferenz-Auswertung
-            pref_counts = guest_df['essenspräferenz'].value_counts().reindex(["Keine", "Vegetarisch", "Vegan"], fill_value=0)
+            pref_counts = aggregates.value_counts('Ja', 'essenspräferenz')
             st.subheader(":material/restaurant: Essenspräferenzen")
             col1, col2, col3 = st.columns(3)
-            col1.metric("Alles (Keine)", pref_counts["Keine"])
-            col2.metric("Vegetarisch", pref_counts["Vegetarisch"])
-            col3.metric("Vegan", pref_counts["Vegan"])
+            col1.metric("Alles (Keine)", pref_counts.get("Keine", 0))
+            col2.metric("Vegetarisch", pref_counts.get("Vegetarisch", 0))
+            col3.metric("Vegan", pref_counts.get("Vegan", 0))
 
+            # Guest table needs the rows themselves
+            df = load_rsvps()
+            guest_df = df[df['attending'] == 'Ja']
             # Sortiere nach Zeit, Kontaktperson, Gastname
             guest_df = guest_df.sort_values(['timestamp', 'contact_name', 'guest_last_name', 'guest_first_name'], ascending=[False, True, True, True])
             # Zeige Tabelle
@@ -144,6 +147,7 @@ def admin_summary_page():
     else:
         st.info(":material/inbox: No RSVPs have been submitted yet.")
 
+@perf.timed("page.admin_menu")
 def admin_menu_page():
     """Admin menu planning page"""
     if not st.session_state.authenticated:
@@ -155,58 +159,59 @@ def admin_menu_page():
     
     st.title(":material/restaurant: Menu Planning")
 
-    # Load data
-    df = load_rsvps()
+    # Running totals, no need to count the whole table
+    aggregates = get_rsvp_aggregates()
 
-    # Check if dataframe is empty or missing required columns
-    if df.empty or 'attending' not in df.columns:
+    # Check if there is any data yet
+    if aggregates.total_rows == 0:
         st.info(":material/inbox: No attending guests yet to display menu planning data.")
         return
 
-    total_guests = len(df[df['attending'] == 'Yes'])
+    total_guests = aggregates.row_count('Yes')
 
     if total_guests > 0:
-        attending_df = df[df['attending'] == 'Yes']
-        
         # Menu summary in columns
         col1, col2, col3 = st.columns(3)
         
         with col1:
             st.subheader(":material/restaurant: Starters")
-            starter_counts = attending_df['starter_choice'].value_counts()
+            starter_counts = aggregates.value_counts('Yes', 'starter_choice')
             for starter, count in starter_counts.items():
                 st.write(f"**{starter}:** {count} guests")
             
             # Chart
-            if not starter_counts.empty:
-                st.bar_chart(starter_counts)
+            if starter_counts:
+                st.bar_chart(pd.Series(starter_counts))
         
         with col2:
             st.subheader(":material/dinner_dining: Main Courses")
-            main_counts = attending_df['main_choice'].value_counts()
+            main_counts = aggregates.value_counts('Yes', 'main_choice')
             for main, count in main_counts.items():
                 st.write(f"**{main}:** {count} guests")
             
             # Chart
-            if not main_counts.empty:
-                st.bar_chart(main_counts)
+            if main_counts:
+                st.bar_chart(pd.Series(main_counts))
         
         with col3:
             st.subheader(":material/cake: Desserts")
-            dessert_counts = attending_df['dessert_choice'].value_counts()
+            dessert_counts = aggregates.value_counts('Yes', 'dessert_choice')
             for dessert, count in dessert_counts.items():
                 st.write(f"**{dessert}:** {count} guests")
             
             # Chart
-            if not dessert_counts.empty:
-                st.bar_chart(dessert_counts)
+            if dessert_counts:
+                st.bar_chart(pd.Series(dessert_counts))
         
         # Dietary requirements
         st.subheader(":material/health_and_safety: Dietary Requirements & Allergies")
-        dietary_df = attending_df[attending_df['dietary_requirements'].notna() & 
-                                (attending_df['dietary_requirements'] != '')]
         
-        if not dietary_df.empty:
+        if aggregates.dietary_count('Yes') > 0:
+            # Only the notes themselves need the rows
+            df = load_rsvps()
+            attending_df = df[df['attending'] == 'Yes']
+            dietary_df = attending_df[attending_df['dietary_requirements'].notna() & 
+                                    (attending_df['dietary_requirements'] != '')]
             for _, row in dietary_df.iterrows():
                 guest_name = f"{row.get('guest_first_name', '')} {row.get('guest_last_name', '')}".strip()
                 st.write(f"**{guest_name}:** {row['dietary_requirements']}")
@@ -215,6 +220,7 @@ def admin_menu_page():
     else:
         st.info("No attending guests yet to display menu planning data.")
 
+@perf.timed("page.admin_data")
 def admin_data_page():
     """Admin detailed data page"""
     if not st.session_state.authenticated:
@@ -232,27 +238,20 @@ def admin_data_page():
     if not df.empty:
         # Export functionality
         st.write("**:material/download: Export Data**")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label=":material/description: Download All Data (CSV)",
-                data=csv,
-                file_name=f"wedding_rsvps_all_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        
-        with col2:
-            # Export only attending guests
-            attending_df = df[df['attending'] == 'Yes']
-            if not attending_df.empty:
-                attending_csv = attending_df.to_csv(index=False)
+        # Files are only built when a button is clicked, and cached until the data changes
+        aggregates = get_rsvp_aggregates()
+        has_attending = any(aggregates.row_count(value) for value in ATTENDING_VALUES)
+        export_kinds = [kind for kind in available_exports() if kind != 'attending_csv' or has_attending]
+        export_cols = st.columns(len(export_kinds))
+        for col, kind in zip(export_cols, export_kinds):
+            label, name, extension, mime = EXPORTS[kind][:4]
+            with col:
                 st.download_button(
-                    label=":material/check_circle: Download Attending Only (CSV)",
-                    data=attending_csv,
-                    file_name=f"wedding_rsvps_attending_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
+                    label=label,
+                    data=lambda kind=kind: get_rsvp_export(kind),
+                    file_name=f"wedding_rsvps_{name}_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                    mime=mime,
+                    on_click="ignore"
                 )
         
         # Search and filter
@@ -261,17 +260,17 @@ def admin_data_page():
         
         filtered_df = df
         if search_term:
-            filtered_df = df[
-                df['contact_name'].str.contains(search_term, case=False, na=False) |
-                df['guest_first_name'].str.contains(search_term, case=False, na=False) |
-                df['guest_last_name'].str.contains(search_term, case=False, na=False)
-            ]
+            # Index lookup; also finds "Mueller" for "Müller" and small typos
+            filtered_df = search_rsvps(df, search_term)
         
         # Display data table
         st.write("**:material/table_view: Complete RSVP Data**")
         if not filtered_df.empty:
-            edited_df = st.data_editor(
-                filtered_df,
+            # A new key after each save starts the editor from the saved data
+            editor_key = f"rsvp_editor_{st.session_state.get('rsvp_editor_version', 0)}"
+            st.data_editor(
+                editable_rsvps(filtered_df),
+                key=editor_key,
                 width="content",
                 column_config={
                     "timestamp": "Submitted",
@@ -293,17 +292,25 @@ def admin_data_page():
 
             # Save button to persist changes
             if st.button(":material/save: Save Changes", type="primary"):
-                # Update the original dataframe with edited values
-                if search_term:
-                    # If filtered, update only the filtered rows in the original df
-                    df.update(edited_df)
+                # Only the edited cells are written, to the current stored data,
+                # so RSVPs submitted while editing are kept
+                edited_rows = st.session_state[editor_key].get("edited_rows", {})
+                changeset = build_changeset(df, filtered_df, edited_rows)
+                if not changeset:
+                    st.info(":material/info: No changes to save.")
                 else:
-                    # If not filtered, replace the entire dataframe
-                    df = edited_df
-
-                save_rsvps(df)
-                st.success(":material/check_circle: Changes saved successfully!")
-                st.rerun()
+                    applied, conflicts = save_rsvp_changes(changeset)
+                    if conflicts:
+                        st.warning(f":material/warning: Saved {applied} row(s). {len(conflicts)} row(s) were changed by someone else in the meantime and were not saved:")
+                        for conflict in conflicts:
+                            base = conflict['base']
+                            name = f"{base.get('guest_first_name') or ''} {base.get('guest_last_name') or ''}".strip() or base.get('contact_email') or ''
+                            st.write(f"- Row {conflict['position'] + 1} ({name}): {', '.join(conflict['columns'])}")
+                        st.info("Reload the page to see the current data, then edit these rows again.")
+                    else:
+                        st.session_state.rsvp_editor_version = st.session_state.get('rsvp_editor_version', 0) + 1
+                        st.success(":material/check_circle: Changes saved successfully!")
+                        st.rerun()
         else:
             st.write("No data matches your search criteria.")
     else:
@@ -0,0 +1,109 @@
+import streamlit as st
+from datetime import datetime
+import perf
+from utils import load_rsvps
+from email_campaign import (
+    STATUS_ALL, STATUS_ATTENDING, STATUS_NOT_ATTENDING, DEFAULT_CONNECTIONS, DEFAULT_RATE,
+    build_recipients, create_campaign, list_campaigns, send_campaign
+)
+
+STATUS_LABELS = {
+    STATUS_ALL: "Alle Kontakte",
+    STATUS_ATTENDING: "Nur Zusagen",
+    STATUS_NOT_ATTENDING: "Nur Absagen",
+}
+
+
+def _campaign_settings():
+    """SMTP settings plus campaign directory, connection count and rate from secrets.toml"""
+    smtp = st.secrets["smtp"]
+    directory = smtp.get("campaign_dir", "email_campaigns")
+    connections = int(smtp.get("campaign_connections", DEFAULT_CONNECTIONS))
+    rate = float(smtp.get("campaign_rate", DEFAULT_RATE))
+    return smtp, directory, connections, rate
+
+
+def _send_with_progress(campaign_id):
+    """Send (or resume) a campaign and show a progress bar while it runs"""
+    smtp, directory, connections, rate = _campaign_settings()
+    progress_bar = st.progress(0.0, text="Versand läuft...")
+
+    def on_progress(done, total):
+        progress_bar.progress(done / total if total else 1.0, text=f"{done} von {total} versendet")
+
+    result = send_campaign(directory, campaign_id, smtp, connections=connections, rate=rate, progress=on_progress)
+    if result is None:
+        st.warning(":material/hourglass_top: Diese Rundmail wird bereits versendet.")
+        return
+    sent, failed = result
+    if failed:
+        st.warning(f":material/warning: {sent} E-Mails versendet, {failed} fehlgeschlagen. Fehlgeschlagene werden beim Fortsetzen erneut versucht.")
+    else:
+        st.success(f":material/check_circle: {sent} E-Mails versendet!")
+
+
+@perf.timed("page.admin_campaign")
+def admin_campaign_page():
+    """Admin page for sending an email to all RSVP contacts"""
+    if not st.session_state.get('authenticated', False):
+        st.error(":material/lock: Please log in to access this page.")
+        st.stop()
+
+    main_col1, main_col2, main_col3 = st.columns([1, 4, 1])
+    with main_col2:
+        st.title(":material/mail: Rundmail")
+        st.info(":material/info: Schicke eine E-Mail an alle Kontaktpersonen, z.B. eine Erinnerung an die Anmeldefrist oder Neuigkeiten zur Location.")
+
+        _, directory, _, _ = _campaign_settings()
+
+        # Recipients
+        status = st.radio(
+            "Empfänger",
+            list(STATUS_LABELS),
+            format_func=STATUS_LABELS.get,
+            horizontal=True
+        )
+        recipients = build_recipients(load_rsvps(), status)
+        st.write(f"**{len(recipients)}** Empfänger (jede E-Mail-Adresse nur einmal)")
+        if recipients:
+            with st.expander(":material/group: Empfängerliste"):
+                for recipient in recipients:
+                    st.write(f"{recipient['name']} <{recipient['email']}>")
+
+        # New campaign
+        with st.form("campaign_form"):
+            subject = st.text_input("Betreff*")
+            body = st.text_area(
+                "Nachricht*",
+                value="Hallo {name},\n\n\n\nViele Grüße!",
+                height=250,
+                help="{name} wird durch den Namen der Kontaktperson ersetzt."
+            )
+            submitted = st.form_submit_button(":material/send: Senden", type="primary")
+
+        if submitted:
+            if not subject.strip() or not body.strip():
+                st.error(":material/error: Betreff und Nachricht sind erforderlich!")
+            elif not recipients:
+                st.error(":material/error: Keine Empfänger ausgewählt.")
+            else:
+                campaign_id = create_campaign(directory, subject.strip(), body, recipients)
+                _send_with_progress(campaign_id)
+
+        # Previous campaigns (and resuming interrupted ones)
+        campaigns = list_campaigns(directory)
+        if campaigns:
+            st.markdown("---")
+            st.subheader(":material/history: Bisherige Rundmails")
+            for campaign in campaigns:
+                with st.container(border=True):
+                    created = datetime.fromtimestamp(campaign['created_at']).strftime('%d.%m.%Y %H:%M')
+                    total = len(campaign['recipients'])
+                    st.markdown(f"**{campaign['subject']}** – {created}")
+                    st.caption(f"{campaign['sent']} von {total} versendet"
+                               + (f", {campaign['failed']} fehlgeschlagen" if campaign['failed'] else ""))
+                    if campaign['running']:
+                        st.caption(":material/hourglass_top: Wird gerade versendet...")
+                    elif not campaign['done']:
+                        if st.button(":material/play_arrow: Fortsetzen", key=f"resume_{campaign['id']}"):
+                            _send_with_progress(campaign['id'])
@@ -0,0 +1,96 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import perf
+
+
+def _operations_table(rows):
+    """perf.summary() rows as a display table (durations in ms)"""
+    table = pd.DataFrame([{
+        "Operation": row['operation'],
+        "Calls": row['calls'],
+        "Errors": row['errors'],
+        "Mean (ms)": row.get('mean', 0) * 1000,
+        "p50 (ms)": row.get('p50', 0) * 1000,
+        "p95 (ms)": row.get('p95', 0) * 1000,
+        "p99 (ms)": row.get('p99', 0) * 1000,
+        "Max (ms)": row.get('max', 0) * 1000,
+        "Total (s)": row['total_seconds'],
+    } for row in rows])
+    return table
+
+
+@perf.timed("page.admin_performance")
+def admin_performance_page():
+    """Admin page with the timings of storage, SMTP and page renders"""
+    if not st.session_state.get('authenticated', False):
+        st.error(":material/lock: Please log in to access this page.")
+        st.stop()
+
+    st.title(":material/speed: Performance")
+    started = datetime.fromtimestamp(perf.started_at()).strftime("%Y-%m-%d %H:%M:%S")
+    st.caption(f"Recorded by this server process since {started}. Percentiles cover the last "
+               f"{perf.RING_SIZE} calls; call and error counts cover everything since then.")
+
+    rows = perf.summary()
+    if not rows:
+        st.info(":material/info: Nothing recorded yet.")
+        return
+
+    groups = sorted({row['operation'].split('.')[0] for row in rows})
+    selected = st.multiselect("Show", groups, default=groups, format_func=str.capitalize)
+    rows = [row for row in rows if row['operation'].split('.')[0] in selected]
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Operations", len(rows))
+    with col2:
+        st.metric("Calls", sum(row['calls'] for row in rows))
+    with col3:
+        st.metric("Errors", sum(row['errors'] for row in rows))
+    with col4:
+        slowest_row = rows[0] if rows else None
+        st.metric("Slowest p95", f"{slowest_row['p95'] * 1000:.0f} ms" if slowest_row and 'p95' in slowest_row else "-",
+                  help=slowest_row['operation'] if slowest_row else None)
+
+    st.subheader(":material/list: Operations")
+    if rows:
+        st.dataframe(
+            _operations_table(rows),
+            hide_index=True,
+            width='stretch',
+            column_config={
+                col: st.column_config.NumberColumn(format="%.1f")
+                for col in ["Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"]
+            } | {"Total (s)": st.column_config.NumberColumn(format="%.2f")}
+        )
+
+    st.subheader(":material/hourglass_bottom: Slowest calls")
+    slowest = [s for s in perf.slowest(200) if s.name.split('.')[0] in selected][:20]
+    if slowest:
+        st.dataframe(
+            pd.DataFrame([{
+                "Operation": s.name,
+                "Duration (ms)": round(s.seconds * 1000, 1),
+                "Finished": datetime.fromtimestamp(s.ended_at).strftime("%H:%M:%S"),
+                "Thread": s.thread,
+                "Error": not s.ok,
+            } for s in slowest]),
+            hide_index=True,
+            width='stretch'
+        )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            label=":material/download: Prometheus metrics",
+            data=perf.prometheus_text,
+            file_name="wedding_metrics.prom",
+            mime="text/plain",
+            on_click="ignore",
+            width='stretch'
+        )
+    with col2:
+        if st.button(":material/restart_alt: Reset", width='stretch'):
+            perf.reset()
+            st.rerun()
@@ -3,6 +3,10 @@ import toml
 import os
 from datetime import datetime
 
+import perf
+from utils import reload_deadline_policy
+
+@perf.timed("page.admin_settings")
 def admin_settings_page():
     """Admin settings page for editing secrets.toml"""
     if not st.session_state.get('authenticated', False):
@@ -152,6 +156,7 @@ def admin_settings_page():
                     # Write updated secrets
                     with open(secrets_path, 'w') as f:
                         toml.dump(secrets, f)
+                    reload_deadline_policy()
 
                     st.success(f":material/check_circle: Settings saved! Backup created at {backup_path}")
                     st.info(":material/restart_alt: **Important:** Restart the Streamlit app for changes to take effect.")
@@ -1,7 +1,9 @@
 import streamlit as st
-import pandas as pd
-from utils import load_gift_registry, save_gift_registry
+import perf
+from image_pipeline import cache_remote_image
+from utils import load_gift_registry, add_gift, update_gift, delete_gift
 
+@perf.timed("page.admin_wishlist")
 def admin_wishlist_page():
     """Admin page for managing the gift registry/wishlist"""
     if not st.session_state.get('authenticated', False):
@@ -52,23 +54,18 @@ def admin_wishlist_page():
 
                     if submitted:
                         if name.strip() and description.strip():
-                            # Create new gift entry
-                            new_gift = pd.DataFrame([{
+                            new_gift = {
                                 'name': name.strip(),
                                 'description': description.strip(),
                                 'url': url.strip(),
                                 'image_url': image_url.strip(),
-                                'purchased': False,
-                                'session_id': '',
-                                'quantity_total': quantity_total,
-                                'quantity_purchased': 0,
-                                'purchase_details': '[]'
-                            }])
+                                'quantity_total': quantity_total
+                            }
 
-                            # Append to dataframe
-                            df = pd.concat([df, new_gift], ignore_index=True)
-
-                            if save_gift_registry(df):
+                            if add_gift(new_gift):
+                                if new_gift['image_url']:
+                                    with st.spinner("Bild wird optimiert..."):
+                                        cache_remote_image(new_gift['image_url'])
                                 st.success(":material/check_circle: Geschenk erfolgreich hinzugefügt!")
                                 st.session_state.adding_new_gift = False
                                 st.rerun()
@@ -85,6 +82,7 @@ def admin_wishlist_page():
         if not df.empty:
             st.subheader(":material/list: Vorhandene Geschenke")
 
+            # idx is the gift's stable id, so keys stay valid if other gifts are added or deleted
             for idx, row in df.iterrows():
                 with st.container(border=True):
                     # Check if this gift is being edited
@@ -119,17 +117,20 @@ def admin_wishlist_page():
 
                             if save_btn:
                                 if new_name.strip() and new_description.strip():
-                                    # Update the dataframe
-                                    df.at[idx, 'name'] = new_name.strip()
-                                    df.at[idx, 'description'] = new_description.strip()
-                                    df.at[idx, 'url'] = new_url.strip()
-                                    df.at[idx, 'image_url'] = new_image_url.strip()
-                                    df.at[idx, 'quantity_total'] = new_quantity_total
-
-                                    # Update purchased flag based on quantity
-                                    df.at[idx, 'purchased'] = (quantity_purchased >= new_quantity_total)
-
-                                    if save_gift_registry(df):
+                                    # Only the edited fields are written; purchases made
+                                    # meanwhile by guests are kept
+                                    changes = {
+                                        'name': new_name.strip(),
+                                        'description': new_description.strip(),
+                                        'url': new_url.strip(),
+                                        'image_url': new_image_url.strip(),
+                                        'quantity_total': new_quantity_total
+                                    }
+
+                                    if update_gift(idx, changes):
+                                        if changes['image_url']:
+                                            with st.spinner("Bild wird optimiert..."):
+                                                cache_remote_image(changes['image_url'])
                                         st.success(":material/check_circle: Geschenk erfolgreich aktualisiert!")
                                         st.session_state.editing_gift = None
                                         st.rerun()
@@ -187,8 +188,7 @@ def admin_wishlist_page():
                             col_yes, col_no = st.columns(2)
                             with col_yes:
                                 if st.button("✓ Ja, löschen", key=f"confirm_yes_{idx}", type="primary", width='stretch'):
-                                    df = df.drop(idx).reset_index(drop=True)
-                                    if save_gift_registry(df):
+                                    if delete_gift(idx):
                                         st.success(":material/check_circle: Geschenk erfolgreich gelöscht!")
                                         st.session_state[f'confirm_delete_{idx}'] = False
                                         st.rerun()
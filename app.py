@@ -1,21 +1,19 @@
 import streamlit as st
-from email_utils import send_confirmation_email
-from datetime import datetime, timedelta
+from email_outbox import enqueue_email, get_outbox
+import perf
+from app_logging import get_logger
+from datetime import datetime
 
-# Import admin functions
-from admin import admin_login_page, admin_summary_page, admin_menu_page, admin_data_page
-from admin_settings import admin_settings_page
-from admin_wishlist import admin_wishlist_page
+log = get_logger(__name__)
+
+# Admin pages are imported in _run_admin_navigation / admin_login_page: they
+# pull in pandas, which public visitors don't need
 
 # Import event info page
 from event_info import event_info_page
 
 # Import shared utilities
-from utils import (
-    save_rsvp, get_deadline_datetime, is_past_deadline,
-    is_within_grace_period, is_within_warning_period, get_time_until_deadline,
-    format_time_remaining
-)
+from utils import save_rsvp_batch, get_deadline_policy, format_time_remaining, prepare_images
 
 # Configure the page
 st.set_page_config(
@@ -31,6 +29,7 @@ COLUMN_RATIO_HEADER = [2.5, 1]  # Column ratio for header layout
 COLUMN_RATIO_CONTACT = [3, 4, 2]  # Column ratio for contact information
 COLUMN_RATIO_GUEST = [3, 1]  # Column ratio for guest details
 COLUMN_RATIO_MENU = [1.2, 1.8, 1.1]  # Column ratio for menu selections
+COUNTDOWN_REFRESH_SECONDS = 60  # How often the deadline countdown updates itself
 
 # Menu options (optional - for admin menu planning page)
 STARTERS = st.secrets.get("menu", {}).get("starters", [])
@@ -61,6 +60,12 @@ def remove_guest(index):
     if len(st.session_state.guests) > 1 and not st.session_state.submission_in_progress:
         st.session_state.guests.pop(index)
 
+def _remove_guest_from_block(index):
+    """Callback of a guest's "Entfernen" button"""
+    remove_guest(index)
+    # The click came from the guest's own block, but the whole list shifts
+    st.rerun(scope="rsvp_guests")
+
 def reset_form():
     """Reset the form after submission"""
     # Reset main form state
@@ -93,20 +98,20 @@ def process_submission():
     form_data = st.session_state.form_data
 
     # Check deadline enforcement first
-    if is_past_deadline() and not is_within_grace_period():
+    deadline_status = get_deadline_policy().status()
+    if deadline_status.past and not deadline_status.in_grace:
         st.error(":material/block: Die Anmeldefrist für die Zusage ist abgelaufen. Zusagen werden nicht mehr angenommen.")
         st.info("Bitte kontaktiere das Hochzeitspaar direkt, wenn du deine Zusage noch ändern möchtest.")
         st.session_state.submission_in_progress = False
         return False
 
     # Show warning if in grace period
-    if is_within_grace_period():
+    if deadline_status.in_grace:
         st.warning(":material/timer: Du befindest dich in der Nachfrist – die Anmeldefrist ist abgelaufen, aber Zusagen werden noch angenommen.")
 
     # Show urgency warning if within warning period
-    if is_within_warning_period():
-        time_remaining = get_time_until_deadline()
-        formatted_time = format_time_remaining(time_remaining)
+    if deadline_status.in_warning:
+        formatted_time = format_time_remaining(deadline_status.remaining)
         st.warning(f":material/schedule: Die Anmeldefrist endet bald – noch {formatted_time} übrig!")
 
     # Validation
@@ -138,9 +143,10 @@ def process_submission():
     
     try:
         if form_data.get('attending') == "Ja, ich/wir nehme(n) teil":
-            # Save each guest as a separate row
+            # One row per guest, stored together in a single write
+            rsvp_rows = []
             for i, _ in enumerate(st.session_state.guests):
-                rsvp_data = {
+                rsvp_rows.append({
                     "timestamp": timestamp,
                     "contact_name": form_data.get('contact_name', '').strip(),
                     "contact_email": form_data.get('contact_email', '').strip(),
@@ -151,8 +157,8 @@ def process_submission():
                     "essenspräferenz": form_data.get(f"preference_{i}", "Keine"),
                     "dietary_requirements": form_data.get(f"dietary_{i}", "").strip(),
                     "comments": form_data.get('comments', '').strip()
-                }
-                save_rsvp(rsvp_data)
+                })
+            save_rsvp_batch(rsvp_rows)
         else:
             # Save single "not attending" entry
             rsvp_data = {
@@ -169,7 +175,7 @@ def process_submission():
                 "dietary_requirements": "",
                 "comments": form_data.get('comments', '').strip()
             }
-            save_rsvp(rsvp_data)
+            save_rsvp_batch([rsvp_data])
 
         # Sende Bestätigungs-E-Mail
         to_email = form_data.get('contact_email', '').strip()
@@ -197,22 +203,26 @@ def process_submission():
                 org_subject = "Absage zur Hochzeit erhalten"
                 org_body = f"Absage von: {form_data.get('contact_name', '')} ({to_email})\nStatus: Absage\n\nDetails siehe CSV."
 
-            # Try to send confirmation email to user
-            user_mail_success = send_confirmation_email(to_email, subject, body)
-
-            # If user email failed, notify organizers about the failure
-            if not user_mail_success:
-                failure_subject = "RSVP gespeichert - E-Mail an Gast fehlgeschlagen"
-                failure_body = f"Eine neue RSVP wurde gespeichert, aber die Bestätigungs-E-Mail konnte nicht zugestellt werden.\n\n"
-                failure_body += f"Gast: {form_data.get('contact_name', '')} ({to_email})\n"
-                failure_body += f"Status: {'Zusage' if form_data.get('attending') == 'Ja, ich/wir nehme(n) teil' else 'Absage'}\n\n"
-                if form_data.get('attending') == "Ja, ich/wir nehme(n) teil":
-                    failure_body += f"Gäste: {len(gast_liste)}\nAngemeldete Personen:\n{gast_text}\n\n"
-                failure_body += "Bitte kontaktiere den Gast manuell zur Bestätigung.\n\nDetails siehe CSV."
-                send_confirmation_email(organizer_email, failure_subject, failure_body)
-            else:
-                # User email succeeded, send normal organizer notification
-                send_confirmation_email(organizer_email, org_subject, org_body)
+            # If the guest email can't be delivered, organizers get this notice instead
+            failure_subject = "RSVP gespeichert - E-Mail an Gast fehlgeschlagen"
+            failure_body = f"Eine neue RSVP wurde gespeichert, aber die Bestätigungs-E-Mail konnte nicht zugestellt werden.\n\n"
+            failure_body += f"Gast: {form_data.get('contact_name', '')} ({to_email})\n"
+            failure_body += f"Status: {'Zusage' if form_data.get('attending') == 'Ja, ich/wir nehme(n) teil' else 'Absage'}\n\n"
+            if form_data.get('attending') == "Ja, ich/wir nehme(n) teil":
+                failure_body += f"Gäste: {len(gast_liste)}\nAngemeldete Personen:\n{gast_text}\n\n"
+            failure_body += "Bitte kontaktiere den Gast manuell zur Bestätigung.\n\nDetails siehe CSV."
+
+            # Queue the guest confirmation; the organizer mail follows once its outcome is known.
+            # Delivery happens in the background so the guest doesn't wait for SMTP.
+            try:
+                enqueue_email(
+                    to_email, subject, body,
+                    on_success={"to": organizer_email, "subject": org_subject, "body": org_body},
+                    on_failure={"to": organizer_email, "subject": failure_subject, "body": failure_body}
+                )
+            except Exception as e:
+                # The RSVP is already stored - don't fail the submission over the email
+                log.warning("Could not queue confirmation email: %s", e)
 
         # Mark as successfully submitted
         st.session_state.form_submitted = True
@@ -223,6 +233,120 @@ def process_submission():
         st.session_state.submission_in_progress = False
         return False
 
+# The form is split into fragments: typing into a field or adding a guest
+# reruns only the block it belongs to, not the page with its deadline
+# checks. Widget values stay in st.session_state, where the submit button
+# reads them.
+
+@st.fragment(run_every=COUNTDOWN_REFRESH_SECONDS)
+def _deadline_countdown():
+    """Countdown of the warning period; updates itself without rerunning the form"""
+    policy = get_deadline_policy()
+    deadline_status = policy.status()
+    if not deadline_status.in_warning:
+        # The deadline passed while the form was open
+        st.rerun()
+    formatted_time = format_time_remaining(deadline_status.remaining)
+
+    st.warning(f":material/schedule: **Anmeldefrist endet bald!**")
+
+    # Create a prominent countdown display
+    with st.container():
+        st.markdown(f"""
+        <div style="
+            background: linear-gradient(90deg, #ff6b6b, #ee5a52);
+            padding: 15px;
+            border-radius: 8px;
+            text-align: center;
+            color: white;
+            margin: 10px 0;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+        ">
+            <h3>⏰ Verbleibende Zeit: {formatted_time}</h3>
+            <p>Frist: {policy.deadline.strftime('%d. %B %Y um %H:%M %Z')}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+@st.fragment
+def _contact_fields():
+    """Contact information"""
+    with st.container(border=True):
+        st.markdown("**Kontaktinformationen**")
+        contact_col1, contact_col2, contact_col3 = st.columns(COLUMN_RATIO_CONTACT)
+        with contact_col1:
+            st.text_input("Name der Hauptkontaktperson*", key="contact_name", width=300)
+        with contact_col2:
+            st.text_input("E-Mail-Adresse*", key="contact_email", width=350)
+        with contact_col3:
+            st.text_input("Telefonnummer", key="contact_phone", width=200)
+
+@st.fragment
+@perf.timed("page.rsvp_guest")
+def _guest_block(i):
+    """Fields of one guest"""
+    with st.container(border=True):
+        st.markdown(f"**Gast {i + 1}**")
+
+        # Create columns for guest details
+        guest_col1, guest_col2 = st.columns(COLUMN_RATIO_GUEST)
+
+        with guest_col1:
+            name_col1, name_col2 = st.columns(2)
+            with name_col1:
+                st.text_input(
+                    f"Vorname*",
+                    key=f"guest_first_name_{i}",
+                    placeholder="Vorname"
+                )
+            with name_col2:
+                st.text_input(
+                    f"Nachname*",
+                    key=f"guest_last_name_{i}",
+                    placeholder="Nachname"
+                )
+
+            # Essenspräferenz Dropdown
+            st.selectbox(
+                "Essenspräferenz",
+                ["Keine", "Vegetarisch", "Vegan"],
+                key=f"preference_{i}",
+                index=0
+            )
+
+        with guest_col2:
+            if i > 0:  # Don't show remove button for first guest
+                st.button(f"Entfernen", key=f"remove_{i}", on_click=_remove_guest_from_block, args=(i,))
+
+        # Dietary requirements
+        st.text_area(
+            "Unverträglichkeiten/Allergien",
+            key=f"dietary_{i}",
+            placeholder="Bitte gebe Unverträglichkeiten oder Allergien an",
+            height=60
+        )
+
+@st.fragment(key="rsvp_guests")
+@perf.timed("page.rsvp_guests")
+def _guest_list():
+    """One block per guest and the button for another one"""
+    for i, _ in enumerate(st.session_state.guests):
+        _guest_block(i)
+
+    # Add guest button
+    st.button("**Weiteren Gast hinzufügen**", icon=":material/add:", on_click=add_guest)
+
+@st.fragment
+def _comments_field():
+    """Additional comments"""
+    with st.container(border=True):
+        st.markdown("**Weitere Kommentare**")
+        st.text_area(
+            "Weitere Kommentare oder besondere Wünsche:",
+            key="comments",
+            height=100
+        )
+
+@perf.timed("page.rsvp_form")
 def rsvp_form_page():
     """Main RSVP form page"""
     # Create 3-column layout with 2,5,2 ratio - left and right are spacers
@@ -233,43 +357,22 @@ def rsvp_form_page():
         st.write(st.secrets["ui"]["welcome_message"])
         
         # Check deadline status and display countdown/warning
-        deadline = get_deadline_datetime()
+        policy = get_deadline_policy()
+        deadline = policy.deadline
         if deadline:
-            if is_past_deadline():
-                if is_within_grace_period():
+            deadline_status = policy.status()
+            if deadline_status.past:
+                if deadline_status.in_grace:
                     st.error(":material/schedule: Die Anmeldefrist ist abgelaufen, aber Zusagen werden noch für kurze Zeit angenommen.")
-                    grace_end = deadline + timedelta(hours=st.secrets["deadline"].get("grace_period_hours", 24))
-                    st.warning(f":material/timer: Nachfrist endet: {grace_end.strftime('%d. %B %Y um %H:%M %Z')}")
+                    st.warning(f":material/timer: Nachfrist endet: {policy.grace_end.strftime('%d. %B %Y um %H:%M %Z')}")
                 else:
                     st.error(":material/block: Die Anmeldefrist ist abgelaufen. Neue Zusagen werden nicht mehr angenommen.")
                     st.info("Bitte kontaktiere das Hochzeitspaar direkt, wenn du deine Zusage noch ändern möchtest.")
                     return  # Stop rendering the form
-            elif is_within_warning_period():
-                time_remaining = get_time_until_deadline()
-                formatted_time = format_time_remaining(time_remaining)
-
-                st.warning(f":material/schedule: **Anmeldefrist endet bald!**")
-
-                # Create a prominent countdown display
-                with st.container():
-                    st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(90deg, #ff6b6b, #ee5a52);
-                        padding: 15px;
-                        border-radius: 8px;
-                        text-align: center;
-                        color: white;
-                        margin: 10px 0;
-                        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-                    ">
-                        <h3>⏰ Verbleibende Zeit: {formatted_time}</h3>
-                        <p>Frist: {deadline.strftime('%d. %B %Y um %H:%M %Z')}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+            elif deadline_status.in_warning:
+                _deadline_countdown()
             else:
                     # Show normal deadline info
-                    time_remaining = get_time_until_deadline()
-                    formatted_time = format_time_remaining(time_remaining)
                     # Deutsches Datumsformat und Zeit (24h)
                     import locale
                     try:
@@ -292,7 +395,7 @@ def rsvp_form_page():
                             parts.append(f"{minutes} Minute{'n' if minutes != 1 else ''}")
                         return ", ".join(parts) if parts else "weniger als 1 Minute"
 
-                    formatted_time_de = format_time_de(get_time_until_deadline())
+                    formatted_time_de = format_time_de(deadline_status.remaining)
                     st.info(f":material/schedule: **Anmeldefrist**:  {deadline_str} ({formatted_time_de} verbleibend)")
 
         st.markdown("---")
@@ -333,90 +436,24 @@ def rsvp_form_page():
                 key="attending", horizontal=True, label_visibility="collapsed"
             )
 
-        # Contact Information
-        with st.container(border=True):
-            st.markdown("**Kontaktinformationen**")
-            contact_col1, contact_col2, contact_col3 = st.columns(COLUMN_RATIO_CONTACT)
-            with contact_col1:
-                contact_name = st.text_input("Name der Hauptkontaktperson*", key="contact_name", width=300)
-            with contact_col2:
-                contact_email = st.text_input("E-Mail-Adresse*", key="contact_email", width=350)
-            with contact_col3:
-                contact_phone = st.text_input("Telefonnummer", key="contact_phone", width=200)
+        _contact_fields()
 
         if attending == "Ja, ich/wir nehme(n) teil":
             st.markdown("**Gästedetails**")
             st.write("Bitte gib die Details für jeden teilnehmenden Gast an:")
+            _guest_list()
 
-            # Display guests
-            for i, _ in enumerate(st.session_state.guests):
-                with st.container(border=True):
-                    st.markdown(f"**Gast {i + 1}**")
-
-                    # Create columns for guest details
-                    guest_col1, guest_col2 = st.columns(COLUMN_RATIO_GUEST)
-
-                    with guest_col1:
-                        name_col1, name_col2 = st.columns(2)
-                        with name_col1:
-                            st.text_input(
-                                f"Vorname*",
-                                key=f"guest_first_name_{i}",
-                                placeholder="Vorname"
-                            )
-                        with name_col2:
-                            st.text_input(
-                                f"Nachname*",
-                                key=f"guest_last_name_{i}",
-                                placeholder="Nachname"
-                            )
-
-                        # Essenspräferenz Dropdown
-                        st.selectbox(
-                            "Essenspräferenz",
-                            ["Keine", "Vegetarisch", "Vegan"],
-                            key=f"preference_{i}",
-                            index=0
-                        )
-
-                    with guest_col2:
-                        if i > 0:  # Don't show remove button for first guest
-                            if st.button(f"Entfernen", key=f"remove_{i}"):
-                                remove_guest(i)
-                                st.rerun()
-
-                    # Dietary requirements
-                    st.text_area(
-                        "Unverträglichkeiten/Allergien",
-                        key=f"dietary_{i}",
-                        placeholder="Bitte gebe Unverträglichkeiten oder Allergien an",
-                        height=60
-                    )
-
-
-            # Add guest button
-            if st.button("**Weiteren Gast hinzufügen**", icon=":material/add:"):
-                add_guest()
-                st.rerun()
-
-        # Additional comments
-        with st.container(border=True):
-            st.markdown("**Weitere Kommentare**")
-            comments = st.text_area(
-                "Weitere Kommentare oder besondere Wünsche:",
-                key="comments",
-                height=100
-            )
+        _comments_field()
 
         # Submit button
         if st.button("Antwort absenden", type="primary", width="content"):
             # Store form data in session state before processing
             st.session_state.form_data = {
                 'attending': attending,
-                'contact_name': contact_name,
-                'contact_email': contact_email,
-                'contact_phone': contact_phone,
-                'comments': comments
+                'contact_name': st.session_state.get("contact_name", ""),
+                'contact_email': st.session_state.get("contact_email", ""),
+                'contact_phone': st.session_state.get("contact_phone", ""),
+                'comments': st.session_state.get("comments", "")
             }
 
             # Store guest data
@@ -434,6 +471,16 @@ def main():
     """Main application entry point"""
     initialize_session_state()
 
+    # Make sure the email worker runs (it also delivers mails queued before a restart)
+    get_outbox()
+    # Resized venue photos (only new or changed ones are converted)
+    prepare_images()
+
+    # Optional: keep a Prometheus textfile with the hot-path timings up to date
+    metrics_file = st.secrets.get("perf", {}).get("prometheus_file")
+    if metrics_file:
+        perf.start_textfile_export(metrics_file, st.secrets["perf"].get("prometheus_interval", 15))
+
     if st.session_state.authenticated:
         # Admin is logged in - show only admin pages with sidebar navigation
         _run_admin_navigation()
@@ -441,7 +488,18 @@ def main():
         # Public user - show RSVP Form, Event Info, and Admin Login
         _run_public_navigation()
 
+def admin_login_page():
+    """Admin login (same name as admin.admin_login_page, so the page URL stays /admin_login_page)"""
+    from admin import admin_login_page as login_page
+    login_page()
+
 def _run_admin_navigation():
+    from admin import admin_summary_page, admin_menu_page, admin_data_page
+    from admin_settings import admin_settings_page
+    from admin_wishlist import admin_wishlist_page
+    from admin_campaign import admin_campaign_page
+    from admin_performance import admin_performance_page
+
     st.set_page_config(
         page_title=st.secrets["wedding"]["page_title"],
         page_icon=st.secrets["wedding"]["page_icon"],
@@ -454,7 +512,9 @@ def _run_admin_navigation():
         st.Page(admin_summary_page, title="Summary", icon=":material/bar_chart:", default=True),
         st.Page(admin_menu_page, title="Menu Planning", icon=":material/restaurant:"),
         st.Page(admin_wishlist_page, title="Wishlist", icon=":material/card_giftcard:"),
+        st.Page(admin_campaign_page, title="Rundmail", icon=":material/mail:"),
         st.Page(admin_data_page, title="Data Export", icon=":material/download:"),
+        st.Page(admin_performance_page, title="Performance", icon=":material/speed:"),
         st.Page(admin_settings_page, title="Settings", icon=":material/settings:"),
     ]
 
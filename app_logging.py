@@ -0,0 +1,117 @@
+"""Logging for all app modules.
+
+Every module gets its logger with ``log = get_logger(__name__)``; they all
+sit below the ``wedding`` logger, which is set up on first use:
+
+* records go through a QueueHandler, a background QueueListener thread
+  formats and writes them, so a slow stdout (container logs) never holds
+  up a page render or a storage call
+* one JSON object per line (time, level, logger, message, any ``extra``
+  fields, traceback), or readable text with LOG_FORMAT=text
+* the level comes from LOG_LEVEL (default INFO); below it a call like
+  ``log.debug("...", arg)`` returns after the level check, without
+  formatting anything
+
+Pass values as arguments or ``extra`` fields instead of f-strings so that
+disabled debug lines stay free.
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+ROOT_LOGGER = "wedding"
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for local development, extra fields as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread with only the cheap work done here"""
+
+    def prepare(self, record):
+        # Args and exc_info may hold objects that change or die after this call,
+        # so render them now; the listener thread does the actual formatting
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """Set up the ``wedding`` logger once per process (later calls only change the level)"""
+    global _listener
+
+    level = (level or os.environ.get("LOG_LEVEL") or "INFO").upper()
+    logger = logging.getLogger(ROOT_LOGGER)
+    with _setup_lock:
+        logger.setLevel(level)
+        if _listener is not None:
+            return logger
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        fmt = fmt or os.environ.get("LOG_FORMAT", "json")
+        output.setFormatter(TextFormatter() if fmt == "text" else JSONFormatter())
+
+        records = queue.SimpleQueue()
+        logger.addHandler(_QueueHandler(records))
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        # Write out whatever is still queued when the process exits
+        atexit.register(_listener.stop)
+    return logger
+
+
+def get_logger(name):
+    """Logger for a module, e.g. ``get_logger(__name__)``"""
+    if _listener is None:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
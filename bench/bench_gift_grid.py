@@ -0,0 +1,188 @@
+"""Rerun time and websocket payload of the wishlist page
+
+Starts the real app (``streamlit run app.py``) on a free port against a
+generated registry of --gifts gifts in a temporary directory, connects to
+its websocket the way a browser does and measures, per interaction:
+
+* ``open``: the first run of the event info page
+* ``purchase``: clicking "Als gekauft markieren" on a gift card
+* ``confirm``: clicking "✓ Ja" in the confirmation that follows
+
+Time is from sending the rerun request until the script run (or fragment
+run) that it caused has finished, including any st.rerun in between;
+bytes and messages are everything the server sent back in that time.
+Widget states are sent the way the frontend does: a click inside a
+fragment carries the fragment's id, so the server reruns only that.
+
+Needs Streamlit (and the websockets package it comes with). Run from the
+repository root:
+
+    python bench/bench_gift_grid.py --gifts 60 --repeat 10
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import websockets  # noqa: E402
+from streamlit.proto.BackMsg_pb2 import BackMsg  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from streamlit.proto.WidgetStates_pb2 import WidgetState  # noqa: E402
+
+from load_test import write_gifts, write_secrets  # noqa: E402
+
+PURCHASE_LABEL = "Als gekauft markieren"
+CONFIRM_LABEL = "✓ Ja"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(directory, port, verbose, env=None, stderr=None):
+    """streamlit run app.py with directory as working directory; waits until healthy
+
+    ``stderr`` (a file) receives the server's error output instead of the console.
+    """
+    if stderr is None:
+        stderr = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(REPO_ROOT, "app.py"),
+         f"--server.port={port}", "--server.headless=true", "--server.fileWatcherType=none",
+         "--browser.gatherUsageStats=false"],
+        cwd=directory,
+        env=env,
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=stderr,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("streamlit did not start")
+
+
+class Session:
+    """One browser tab: sends reruns with the current field values, remembers the widgets of the last render"""
+
+    WIDGET_TYPES = ("button", "text_input", "text_area")
+
+    def __init__(self, websocket, page_name=""):
+        self.websocket = websocket
+        self.page_name = page_name
+        self.widgets = []  # (type, label, widget id, fragment id) in render order
+        self.values = {}  # widget id -> WidgetState, sent with every rerun like the frontend does
+
+    async def rerun(self, widget=None, value=None):
+        """Request a rerun, optionally clicking a button or typing ``value`` into a text field
+
+        Returns (seconds, bytes, messages).
+        """
+        message = BackMsg()
+        message.rerun_script.query_string = "uid=usr_benchmark"
+        message.rerun_script.page_name = self.page_name
+        fragment_id = ""
+        if widget:
+            kind, _, widget_id, fragment_id = widget
+            if kind == "button":
+                state = message.rerun_script.widget_states.widgets.add()
+                state.id = widget_id
+                state.trigger_value = True
+            else:
+                self.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+        message.rerun_script.fragment_id = fragment_id
+        message.rerun_script.widget_states.widgets.extend(self.values.values())
+
+        if not fragment_id:
+            self.widgets = []
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        received = count = 0
+        while True:
+            data = await self.websocket.recv()
+            received += len(data)
+            count += 1
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            element_type = forward.delta.new_element.WhichOneof("type") if kind == "delta" else None
+            if element_type in self.WIDGET_TYPES:
+                element = getattr(forward.delta.new_element, element_type)
+                self.widgets = [w for w in self.widgets if w[2] != element.id]
+                self.widgets.append((element_type, element.label, element.id, forward.delta.fragment_id))
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start, received, count
+
+    def find(self, label, index=0):
+        """The index-th widget with this label"""
+        matches = [widget for widget in self.widgets if widget[1] == label]
+        if len(matches) <= index:
+            raise LookupError(f"no widget {label!r} (#{index + 1}) on the page")
+        return matches[index]
+
+
+async def measure(port, repeat):
+    results = {"open": [], "purchase": [], "confirm": []}
+    for _ in range(repeat):
+        async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                      max_size=None) as websocket:
+            session = Session(websocket)
+            results["open"].append(await session.rerun())
+            results["purchase"].append(await session.rerun(session.find(PURCHASE_LABEL)))
+            results["confirm"].append(await session.rerun(session.find(CONFIRM_LABEL)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gifts", type=int, default=60, help="gifts in the generated registry")
+    parser.add_argument("--repeat", type=int, default=10, help="sessions to measure")
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_secrets(tmp, "csv")
+        shutil.copy(os.path.join(REPO_ROOT, ".streamlit", "config.toml"), os.path.join(tmp, ".streamlit"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            write_gifts("gift_registry.csv", args.gifts)
+        finally:
+            os.chdir(cwd)
+
+        port = free_port()
+        server = start_server(tmp, port, args.verbose)
+        try:
+            asyncio.run(measure(port, 1))  # warm up imports and caches
+            results = asyncio.run(measure(port, args.repeat))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"gifts={args.gifts} sessions={args.repeat}")
+    print(f"{'interaction':<12}{'median ms':>12}{'max ms':>10}{'KB':>10}{'messages':>10}")
+    for name, samples in results.items():
+        seconds = [s for s, _, _ in samples]
+        print(f"{name:<12}{statistics.median(seconds) * 1000:>12.1f}{max(seconds) * 1000:>10.1f}"
+              f"{statistics.median(b for _, b, _ in samples) / 1024:>10.1f}"
+              f"{statistics.median(c for _, _, c in samples):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Import time a fresh server pays for a guest's first page view
+
+Starts the real app like bench_gift_grid.py, with Python's import time
+profiling on (``PYTHONPROFILEIMPORTTIME``), and opens one page over the
+websocket. Everything the server imports from then on is what the first
+guest after a restart (or deploy) waits for:
+
+* ``import ms``: the cumulative time of those imports
+* ``first run ms``: the whole first run of the page, imports included
+* ``pandas``: whether the page loaded pandas
+
+Pages are the event info page (``info``, the default page), the RSVP form
+(``form``) and the admin login (``admin``). Each repeat starts a new
+server. --top lists the slowest imports of the last run per page. Run from
+the repository root:
+
+    python bench/bench_importtime.py --repeat 5 --top 8
+"""
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import websockets
+
+from bench_gift_grid import REPO_ROOT, Session, free_port, start_server
+from load_test import write_gifts, write_secrets
+
+PAGES = {"info": "", "form": "rsvp_form_page", "admin": "admin_login_page"}
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def parse_imports(text):
+    """Entries of an importtime log as (module, cumulative seconds, nesting level)"""
+    imports = []
+    for line in text.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            imports.append((match.group(4), int(match.group(2)) / 1e6, len(match.group(3)) // 2))
+    return imports
+
+
+async def first_run(port, page_name):
+    async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                  max_size=None) as websocket:
+        seconds, _, _ = await Session(websocket, page_name=page_name).rerun()
+    return seconds
+
+
+def measure(directory, page_name, verbose):
+    """(first run seconds, imports during it) on a fresh server"""
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    log_path = os.path.join(directory, "importtime.log")
+    with open(log_path, "w") as log:
+        port = free_port()
+        server = start_server(directory, port, verbose, env=env, stderr=log)
+        try:
+            offset = os.path.getsize(log_path)
+            seconds = asyncio.run(first_run(port, page_name))
+            time.sleep(0.5)  # let background threads started by the run finish their imports
+        finally:
+            server.terminate()
+            server.wait()
+    with open(log_path, "r", errors="replace") as f:
+        f.seek(offset)
+        return seconds, parse_imports(f.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES), help="pages to open")
+    parser.add_argument("--gifts", type=int, default=60, help="gifts in the generated registry")
+    parser.add_argument("--repeat", type=int, default=5, help="server starts per page")
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports per page")
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        write_secrets(tmp, "csv")
+        shutil.copy(os.path.join(REPO_ROOT, ".streamlit", "config.toml"), os.path.join(tmp, ".streamlit"))
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            write_gifts("gift_registry.csv", args.gifts)
+        finally:
+            os.chdir(cwd)
+
+        for page in args.pages:
+            results[page] = [measure(tmp, PAGES[page], args.verbose) for _ in range(args.repeat)]
+
+    print(f"gifts={args.gifts} server starts per page={args.repeat}")
+    print(f"{'page':<8}{'import ms':>12}{'first run ms':>14}{'pandas':>8}")
+    for page, samples in results.items():
+        import_seconds = statistics.median(
+            sum(s for _, s, level in imports if level == 0) for _, imports in samples
+        )
+        pandas = any(name == "pandas" for _, imports in samples for name, _, _ in imports)
+        print(f"{page:<8}{import_seconds * 1000:>12.1f}{statistics.median(s for s, _ in samples) * 1000:>14.1f}"
+              f"{'yes' if pandas else 'no':>8}")
+    for page, samples in results.items():
+        if args.top:
+            print(f"\n{page}: slowest imports (last run)")
+            top_level = [(name, s) for name, s, level in samples[-1][1] if level == 0]
+            for name, seconds in sorted(top_level, key=lambda item: -item[1])[:args.top]:
+                print(f"  {name:<40}{seconds * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Server CPU, time and websocket payload per RSVP form interaction
+
+Starts the real app like bench_gift_grid.py and fills in the RSVP form
+over the websocket, the way a guest does:
+
+* ``open``: the first run of the form page
+* ``add_guest``: clicking "Weiteren Gast hinzufügen" (until --guests guests)
+* ``guest_name``: typing a first name into the middle guest's block
+* ``contact``: typing the contact person's name
+
+Server CPU is the user+system time the server process used while handling
+the interaction (read from /proc, so Linux only; the clock ticks are
+coarse, which is why it is summed over all sessions and then divided).
+Run from the repository root:
+
+    python bench/bench_rsvp_form.py --guests 8 --repeat 10
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+import toml
+import websockets
+
+from bench_gift_grid import REPO_ROOT, Session, free_port, start_server
+from load_test import write_secrets
+
+PAGE_NAME = "rsvp_form_page"
+ADD_GUEST_LABEL = "**Weiteren Gast hinzufügen**"
+FIRST_NAME_LABEL = "Vorname*"
+CONTACT_LABEL = "Name der Hauptkontaktperson*"
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process so far"""
+    with open(f"/proc/{pid}/stat", "r") as f:
+        # The command name may contain spaces; the fields after it don't
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+
+async def measure(port, pid, guests, repeat):
+    results = {"open": [], "add_guest": [], "guest_name": [], "contact": []}
+
+    async def timed(name, coroutine):
+        before = cpu_seconds(pid)
+        seconds, received, _ = await coroutine
+        results[name].append((seconds, received, cpu_seconds(pid) - before))
+
+    for _ in range(repeat):
+        async with websockets.connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                                      max_size=None) as websocket:
+            session = Session(websocket, page_name=PAGE_NAME)
+            await timed("open", session.rerun())
+            for _ in range(guests - 1):
+                await timed("add_guest", session.rerun(session.find(ADD_GUEST_LABEL)))
+            middle = guests // 2
+            await timed("guest_name", session.rerun(session.find(FIRST_NAME_LABEL, middle), "Erika"))
+            await timed("contact", session.rerun(session.find(CONTACT_LABEL), "Erika Mustermann"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guests", type=int, default=8, help="guests to add to the form")
+    parser.add_argument("--repeat", type=int, default=10, help="sessions to measure")
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        secrets = write_secrets(tmp, "csv")
+        # Keep the form open: a deadline far enough out for no countdown either
+        deadline = datetime.datetime.now() + datetime.timedelta(days=60)
+        secrets["deadline"]["deadline_datetime"] = deadline.strftime("%Y-%m-%d %H:%M")
+        with open(os.path.join(tmp, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+            toml.dump(secrets, f)
+        shutil.copy(os.path.join(REPO_ROOT, ".streamlit", "config.toml"), os.path.join(tmp, ".streamlit"))
+
+        port = free_port()
+        server = start_server(tmp, port, args.verbose)
+        try:
+            asyncio.run(measure(port, server.pid, args.guests, 1))  # warm up imports and caches
+            results = asyncio.run(measure(port, server.pid, args.guests, args.repeat))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"guests={args.guests} sessions={args.repeat}")
+    print(f"{'interaction':<12}{'median ms':>12}{'CPU ms':>10}{'KB':>10}")
+    for name, samples in results.items():
+        print(f"{name:<12}{statistics.median(s for s, _, _ in samples) * 1000:>12.1f}"
+              f"{sum(c for _, _, c in samples) / len(samples) * 1000:>10.1f}"
+              f"{statistics.median(b for _, b, _ in samples) / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Benchmark: untyped vs. typed RSVP loading
+
+Writes --rows synthetic RSVPs to a temporary CSV and compares the old
+loader (plain read_csv, object columns) with rsvp_schema.read_rsvps_csv:
+parse time, memory of the resulting frame, and the dashboard-style
+"filter attending, count food preferences" query on both. Needs pandas.
+Run from the repository root:
+
+    python bench/bench_rsvp_schema.py --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import rsvp_schema  # noqa: E402
+
+COLUMNS = ["timestamp", "contact_name", "contact_email", "contact_phone", "attending",
+           "guest_first_name", "guest_last_name", "essenspräferenz", "dietary_requirements", "comments"]
+
+
+def write_csv(path, rows, seed=42):
+    """Synthetic RSVPs: parties of 1-4 guests, a few declines, sparse notes"""
+    rng = random.Random(seed)
+    written = 0
+    party = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        while written < rows:
+            party += 1
+            attending = rng.random() > 0.15
+            size = rng.randint(1, 4) if attending else 1
+            stamp = f"2026-{rng.randint(1, 5):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+            for _ in range(min(size, rows - written)):
+                if attending:
+                    f.write(f"{stamp},Kontakt {party},gast{party}@example.com,0176{party:07d},Ja,"
+                            f"Vorname{written},Nachname{written % 5000},"
+                            f"{rng.choice(['Keine', 'Keine', 'Vegetarisch', 'Vegan'])},"
+                            f"{'Laktoseintoleranz' if rng.random() < 0.05 else ''},"
+                            f"{'Wir freuen uns!' if rng.random() < 0.1 else ''}\n")
+                else:
+                    f.write(f"{stamp},Kontakt {party},gast{party}@example.com,0176{party:07d},No,,,,,\n")
+                written += 1
+
+
+def legacy_load(path):
+    """The loader before the schema layer"""
+    return pd.read_csv(path, dtype={'contact_phone': str})
+
+
+def dashboard_query(df):
+    guests = df[df['attending'] == 'Ja']
+    return guests['essenspräferenz'].value_counts()
+
+
+def median_seconds(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rsvps.csv")
+        write_csv(path, args.rows)
+        print(f"rows={args.rows} csv={os.path.getsize(path) / 1e6:.1f} MB text dtype={rsvp_schema.TEXT_DTYPE}")
+
+        loaders = [("untyped (read_csv)", legacy_load), ("typed (rsvp_schema)", rsvp_schema.read_rsvps_csv)]
+        print(f"{'loader':<22} {'parse ms':>9} {'memory MB':>10} {'query ms':>9}")
+        for label, loader in loaders:
+            parse, df = median_seconds(lambda: loader(path), args.repeats)
+            query, _ = median_seconds(lambda: dashboard_query(df), args.repeats * 4)
+            memory = df.memory_usage(deep=True).sum() / 1e6
+            print(f"{label:<22} {parse * 1000:9.1f} {memory:10.1f} {query * 1000:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
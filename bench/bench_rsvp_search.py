@@ -0,0 +1,105 @@
+"""Benchmark: name search on the admin data page
+
+Builds an RSVPSearchIndex over --rows synthetic RSVPs and times a set of
+queries (exact, prefix, umlaut spelling variants, typos) against it. If
+pandas is installed, the old three-column ``str.contains`` filter is timed
+on the same data for comparison. Run from the repository root:
+
+    python bench/bench_rsvp_search.py --rows 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rsvp_search import RSVPSearchIndex  # noqa: E402
+
+FIRST_NAMES = ["Anna", "Jürgen", "Sören", "Jörg", "Björn", "Lena", "Maximilian", "Sophie", "Lukas",
+               "Marie", "Paul", "Hannah", "Felix", "Emma", "Jonas", "Mia", "Noël", "Zoë", "Manuel"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+              "Schulz", "Hoffmann", "Schäfer", "Koch", "Bauer", "Richter", "Klein", "Wolf",
+              "Schröder", "Neumann", "Schwarz", "Zimmermann", "Braun", "Krüger", "Hofmann", "Groß"]
+
+QUERIES = ["müller", "Mueller", "muller", "Mülller", "schr", "jürgen schmidt", "groß", "gross",
+           "zimmerm", "noel", "xyz"]
+
+
+def generate_rows(count, seed=42):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        # Add a number to some last names so there are many distinct tokens, like real data
+        last = rng.choice(LAST_NAMES) + (f"-{rng.choice(LAST_NAMES)}" if i % 7 == 0 else "")
+        rows.append({
+            'contact_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'guest_first_name': rng.choice(FIRST_NAMES),
+            'guest_last_name': last,
+        })
+    return rows
+
+
+def time_queries(search, repeats):
+    """{query: (median ms, hits)}"""
+    results = {}
+    for query in QUERIES:
+        timings = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            hits = search(query)
+            timings.append((time.perf_counter() - t0) * 1000)
+        results[query] = (statistics.median(timings), len(hits))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows)
+
+    t0 = time.perf_counter()
+    index = RSVPSearchIndex()
+    index.add_rows(rows)
+    build_ms = (time.perf_counter() - t0) * 1000
+    print(f"rows={args.rows} index build={build_ms:.0f} ms")
+
+    # Incremental append of one party
+    t0 = time.perf_counter()
+    index.add_rows(generate_rows(4, seed=7))
+    print(f"append 4 rows={(time.perf_counter() - t0) * 1000:.3f} ms")
+
+    indexed = time_queries(index.search, args.repeats)
+
+    scanned = None
+    try:
+        import pandas as pd
+    except ImportError:
+        print("pandas not installed, skipping str.contains comparison")
+    else:
+        df = pd.DataFrame(rows)
+
+        def scan(term):
+            return df[
+                df['contact_name'].str.contains(term, case=False, na=False) |
+                df['guest_first_name'].str.contains(term, case=False, na=False) |
+                df['guest_last_name'].str.contains(term, case=False, na=False)
+            ]
+        scanned = time_queries(scan, max(1, args.repeats // 4))
+
+    print(f"{'query':<16} {'index ms':>9} {'hits':>7}" + (f" {'scan ms':>9} {'hits':>7}" if scanned else ""))
+    for query in QUERIES:
+        ms, hits = indexed[query]
+        line = f"{query:<16} {ms:9.3f} {hits:7d}"
+        if scanned:
+            line += f" {scanned[query][0]:9.3f} {scanned[query][1]:7d}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: cost of saving one RSVP row as the CSV grows
+
+Compares the old read-concat-rewrite approach with the append-only
+storage.append_rows. Run from the repository root:
+
+    python bench/bench_rsvp_storage.py --sizes 1000 10000 50000
+
+With --party-size N each timed save stores a whole party of N guests in
+one batch, the way app.process_submission does.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+
+def make_row(i):
+    """Build a synthetic RSVP row"""
+    return {
+        "timestamp": "2026-01-01 12:00:00",
+        "contact_name": f"Kontakt {i}",
+        "contact_email": f"gast{i}@example.com",
+        "contact_phone": f"0176{i:07d}",
+        "attending": "Ja",
+        "guest_first_name": f"Vorname{i}",
+        "guest_last_name": f"Nachname{i}",
+        "essenspräferenz": "Keine",
+        "dietary_requirements": "",
+        "comments": "",
+    }
+
+
+def legacy_save(path, row):
+    """The previous utils.save_rsvp: parse everything, concat, rewrite"""
+    import pandas as pd
+    df = pd.read_csv(path, dtype={'contact_phone': str}) if os.path.exists(path) else pd.DataFrame()
+    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    df['contact_phone'] = df['contact_phone'].astype(str)
+    df.to_csv(path, index=False)
+
+
+def time_saves(save_fn, path, start, repeats):
+    """Average seconds per save over a number of repeats"""
+    t0 = time.perf_counter()
+    for i in range(repeats):
+        save_fn(path, start + i)
+    return (time.perf_counter() - t0) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--party-size", type=int, default=1, help="guests stored per submission")
+    parser.add_argument("--skip-legacy", action="store_true", help="don't time the pandas rewrite (needs pandas)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'append (ms)':>12} {'legacy (ms)':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rsvps.csv")
+            storage.append_rows(path, [make_row(i) for i in range(size)])
+            party = args.party_size
+            append_ms = time_saves(
+                lambda p, i: storage.append_rows(p, [make_row(i * party + g) for g in range(party)]),
+                path, size, args.repeats
+            ) * 1000
+
+            legacy_ms = float("nan")
+            if not args.skip_legacy:
+                legacy_path = os.path.join(tmp, "legacy.csv")
+                storage.append_rows(legacy_path, [make_row(i) for i in range(size)])
+                legacy_ms = time_saves(
+                    lambda p, i: [legacy_save(p, make_row(i * party + g)) for g in range(party)],
+                    legacy_path, size, args.repeats
+                ) * 1000
+
+        print(f"{size:>8} {append_ms:>12.3f} {legacy_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Benchmark: one SMTP connection per message vs. a reused session
+
+Starts a local SMTP stub (plain text, accepts any AUTH) that delays every
+reply by --latency-ms to mimic a round-trip to a real mail server, then
+sends --messages emails twice: once the old way (connect, EHLO, AUTH, send,
+QUIT for every message) and once through email_utils.SMTPConnectionManager.
+A final pass has the stub drop idle connections to check that the manager
+reconnects instead of losing messages. Run from the repository root:
+
+    python bench/bench_smtp.py --messages 50 --latency-ms 20
+
+The stub can also be used on its own for local testing of the app; point
+[smtp] at it with ``starttls = false``:
+
+    python bench/bench_smtp.py --serve --port 2525
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import statistics
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_utils import SMTPConnectionManager  # noqa: E402
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to make smtplib happy; counts delivered messages"""
+
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+        self.wfile.flush()
+
+    def handle(self):
+        self.server.stats["connections"] += 1
+        if self.server.idle_timeout:
+            self.connection.settimeout(self.server.idle_timeout)
+        self.reply("220 localhost SMTP stub ready")
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode("utf-8", "replace").strip().upper()
+                if command.startswith("EHLO"):
+                    self.reply("250-localhost")
+                    self.reply("250 AUTH PLAIN LOGIN")
+                elif command.startswith("HELO"):
+                    self.reply("250 localhost")
+                elif command.startswith("AUTH"):
+                    self.reply("235 Authentication successful")
+                elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                    self.reply("250 OK")
+                elif command == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                        pass
+                    self.server.stats["messages"] += 1
+                    self.reply("250 OK: queued")
+                elif command == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+        except OSError:
+            # Idle timeout or client went away
+            return
+
+
+class SMTPStubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency=0.0, idle_timeout=None):
+        super().__init__(address, SMTPStubHandler)
+        self.latency = latency
+        self.idle_timeout = idle_timeout
+        self.stats = {"connections": 0, "messages": 0}
+
+
+def start_stub(port=0, latency=0.0, idle_timeout=None):
+    server = SMTPStubServer(("127.0.0.1", port), latency=latency, idle_timeout=idle_timeout)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def send_per_connection(port, to_email, subject, body):
+    """What send_confirmation_email used to do for every message"""
+    msg = MIMEText(body, "plain", "utf-8")
+    msg["From"] = "bench@example.com"
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    with smtplib.SMTP("127.0.0.1", port, timeout=10) as server:
+        server.login("bench", "secret")
+        server.sendmail("bench@example.com", to_email, msg.as_string())
+    return True
+
+
+def timed(send, messages):
+    """Per-message latencies in milliseconds"""
+    latencies = []
+    for to_email, subject, body in messages:
+        t0 = time.perf_counter()
+        assert send(to_email, subject, body)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def report(label, latencies, stats):
+    total = sum(latencies)
+    print(f"{label:<24} total={total:8.1f} ms  mean={statistics.mean(latencies):6.2f} ms  "
+          f"p95={sorted(latencies)[int(len(latencies) * 0.95) - 1]:6.2f} ms  "
+          f"connections={stats['connections']}  delivered={stats['messages']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated delay per server reply")
+    parser.add_argument("--serve", action="store_true", help="only run the stub until interrupted")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    if args.serve:
+        server = start_stub(args.port or 2525, latency)
+        print(f"SMTP stub listening on 127.0.0.1:{server.server_address[1]}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    messages = [(f"guest{i}@example.com", "Bestätigung", "Danke für deine Anmeldung!\n" * 20)
+                for i in range(args.messages)]
+    print(f"messages={args.messages} latency={args.latency_ms} ms/reply")
+
+    server = start_stub(latency=latency)
+    port = server.server_address[1]
+    report("connection per message", timed(lambda *m: send_per_connection(port, *m), messages), server.stats)
+    server.shutdown()
+
+    server = start_stub(latency=latency)
+    manager = SMTPConnectionManager("127.0.0.1", server.server_address[1], "bench", "secret",
+                                    from_email="bench@example.com", starttls=False)
+    report("reused session", timed(manager.send, messages), server.stats)
+
+    server.stats.update(connections=0, messages=0)
+    t0 = time.perf_counter()
+    results = manager.send_many(messages)
+    print(f"{'send_many':<24} total={(time.perf_counter() - t0) * 1000:8.1f} ms  "
+          f"connections={server.stats['connections']}  delivered={server.stats['messages']}")
+    assert all(results)
+    manager.close()
+    server.shutdown()
+
+    # Server drops the session after 50 ms idle; every send has to notice and reconnect
+    server = start_stub(latency=0, idle_timeout=0.05)
+    manager = SMTPConnectionManager("127.0.0.1", server.server_address[1], "bench", "secret",
+                                    from_email="bench@example.com", starttls=False, idle_check_after=0)
+    delivered = 0
+    for to_email, subject, body in messages[:10]:
+        delivered += manager.send(to_email, subject, body)
+        time.sleep(0.1)
+    manager.close()
+    server.shutdown()
+    print(f"{'dropped idle sessions':<24} sent={delivered}/10  connections={server.stats['connections']}  "
+          f"delivered={server.stats['messages']}")
+    sys.exit(0 if delivered == 10 and server.stats["messages"] == 10 else 1)
+
+
+if __name__ == "__main__":
+    main()
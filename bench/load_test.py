@@ -0,0 +1,376 @@
+"""Load test: many guests using the app at once
+
+Generates a synthetic RSVP table and gift registry of the requested size
+in a temporary directory (with its own .streamlit/secrets.toml), then lets
+--workers threads hammer the shared code paths the way concurrent Streamlit
+sessions do, which run as threads of one server process:
+
+* storage functions from utils (load_rsvps, save_rsvp / save_rsvp_batch,
+  get_gift_registry_snapshot, mark_gift_as_purchased and
+  unmark_gift_as_purchased, get_rsvp_aggregates)
+* whole page renders through Streamlit's AppTest (event info, RSVP form and
+  the admin summary / data pages), unless --no-pages is given. AppTest
+  swaps process-wide runtime state, so renders take turns; their latency
+  is the render alone, while the storage calls keep running alongside
+
+Reports count, errors, p50/p95/p99 latency and throughput per operation.
+With --json the results (plus commit, versions and settings) are written to
+a file; --compare prints the change against such a file from an earlier
+commit. Needs pandas and Streamlit. Run from the repository root:
+
+    python bench/load_test.py --rsvps 5000 --gifts 200 --workers 32 --duration 30 --json after.json
+    python bench/load_test.py --rsvps 5000 --gifts 200 --workers 32 --duration 30 --compare after.json
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import pandas as pd  # noqa: E402
+import streamlit  # noqa: E402
+import toml  # noqa: E402
+
+# Share of each operation in the workload (relative weights)
+OPERATIONS = {
+    "load_rsvps": 20,
+    "save_rsvp": 10,
+    "gift_snapshot": 25,
+    "mark_gift": 8,
+    "unmark_gift": 8,
+    "aggregates": 5,
+    "page_event_info": 4,
+    "page_rsvp_form": 4,
+    "page_admin_summary": 1,
+    "page_admin_data": 1,
+}
+
+# Script run by AppTest for each page: (module, function, needs admin login)
+PAGES = {
+    "page_event_info": ("event_info", "event_info_page", False),
+    "page_rsvp_form": ("app", "rsvp_form_page", False),
+    "page_admin_summary": ("admin", "admin_summary_page", True),
+    "page_admin_data": ("admin", "admin_data_page", True),
+}
+
+FIRST_NAMES = ["Anna", "Jonas", "Lena", "Felix", "Marie", "Paul", "Sophie", "Lukas", "Emma", "Jürgen", "Özlem", "Björn"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schäfer", "Koch"]
+PREFERENCES = ["Keine", "Keine", "Vegetarisch", "Vegan"]
+
+
+# Synthetic data
+
+def make_party(rng, party):
+    """RSVP rows of one submission, shaped like app.process_submission's"""
+    stamp = f"2026-{rng.randint(1, 5):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+    contact = {
+        "timestamp": stamp,
+        "contact_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "contact_email": f"gast{party}@example.com",
+        "contact_phone": f"0176{party:07d}",
+    }
+    if rng.random() < 0.15:
+        return [dict(contact, attending="No", guest_first_name="", guest_last_name="",
+                     starter_choice="", main_choice="", dessert_choice="",
+                     dietary_requirements="", comments="")]
+    comments = "Wir freuen uns!" if rng.random() < 0.1 else ""
+    return [
+        dict(contact, attending="Ja",
+             guest_first_name=rng.choice(FIRST_NAMES), guest_last_name=rng.choice(LAST_NAMES),
+             essenspräferenz=rng.choice(PREFERENCES),
+             dietary_requirements="Laktoseintoleranz" if rng.random() < 0.05 else "",
+             comments=comments)
+        for _ in range(rng.randint(1, 4))
+    ]
+
+
+def write_rsvps(path, rows, seed):
+    """Synthetic RSVP CSV with about ``rows`` rows; returns the next party number"""
+    rng = random.Random(seed)
+    records = []
+    party = 0
+    while len(records) < rows:
+        party += 1
+        records.extend(make_party(rng, party))
+    df = pd.DataFrame(records[:rows])
+    df.to_csv(path, index=False)
+    return party + 1
+
+
+def write_gifts(path, gifts):
+    """Synthetic gift registry; every gift has plenty in stock so buying never runs dry"""
+    import storage
+
+    df = pd.DataFrame([{
+        "id": f"gift_load{i:05d}",
+        "name": f"Geschenk {i}",
+        "description": "Synthetisches Geschenk für den Lasttest",
+        "url": "",
+        "image_url": "",
+        "purchased": False,
+        "session_id": "",
+        "quantity_total": 1000000,
+        "quantity_purchased": 0,
+        "purchase_details": "[]",
+    } for i in range(gifts)], columns=storage.GIFT_COLUMNS)
+    storage.assign_gift_ids(df)
+    storage.write_gift_registry_csv(path, df)
+    return df.index.tolist()
+
+
+def write_secrets(directory, backend):
+    """secrets.toml from the example, pointed at the generated files"""
+    with open(os.path.join(REPO_ROOT, ".streamlit", "secrets.toml.example"), encoding="utf-8") as f:
+        secrets = toml.load(f)
+    secrets["files"].update({"csv_file": "wedding_rsvps.csv", "backend": backend, "sqlite_file": "wedding.db"})
+    secrets["smtp"].update({"outbox_dir": "email_outbox", "campaign_dir": "email_campaigns"})
+    os.makedirs(os.path.join(directory, ".streamlit"), exist_ok=True)
+    with open(os.path.join(directory, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        toml.dump(secrets, f)
+    return secrets
+
+
+# Workload
+
+class Recorder:
+    """Collects (operation, seconds, ok) from all workers"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, operation):
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self.errors.setdefault(operation, []).append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.samples.setdefault(operation, []).append(elapsed)
+
+
+# AppTest installs its own Runtime instance and secrets globally while it runs
+_page_lock = threading.Lock()
+
+
+def run_page(operation, secrets, recorder):
+    """Render one page in a fresh AppTest session; raises if the script failed"""
+    from streamlit.testing.v1 import AppTest
+
+    module, function, admin = PAGES[operation]
+    at = AppTest.from_string(f"from {module} import {function}\n{function}()\n", default_timeout=60)
+    at.secrets.update(secrets)
+    if admin:
+        at.session_state["authenticated"] = True
+    with _page_lock, recorder.measure(operation):
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+
+def worker(worker_id, args, state, recorder, deadline):
+    """One simulated session: weighted random operations until the deadline"""
+    import utils
+
+    rng = random.Random(args.seed + worker_id)
+    state.local.browser_id = f"usr_load{worker_id:04d}"
+    purchases = []  # gifts this session bought and can hand back
+    operations = [op for op in OPERATIONS if args.pages or op not in PAGES]
+    weights = [OPERATIONS[op] for op in operations]
+
+    done = 0
+    while time.monotonic() < deadline and (not args.iterations or done < args.iterations):
+        operation = rng.choices(operations, weights)[0]
+        if operation == "unmark_gift" and not purchases:
+            operation = "mark_gift"
+        done += 1
+
+        if operation in PAGES:
+            run_page(operation, state.secrets, recorder)
+            continue
+
+        with recorder.measure(operation):
+            if operation == "load_rsvps":
+                utils.load_rsvps()
+            elif operation == "save_rsvp":
+                with state.lock:
+                    party = state.next_party
+                    state.next_party += 1
+                rows = make_party(rng, party)
+                if len(rows) == 1:
+                    utils.save_rsvp(rows[0])
+                else:
+                    utils.save_rsvp_batch(rows)
+            elif operation == "gift_snapshot":
+                utils.get_gift_registry_snapshot()
+            elif operation == "mark_gift":
+                gift_id = rng.choice(state.gift_ids)
+                if not utils.mark_gift_as_purchased(gift_id):
+                    raise RuntimeError(f"could not buy {gift_id}")
+                purchases.append(gift_id)
+            elif operation == "unmark_gift":
+                gift_id = purchases.pop(rng.randrange(len(purchases)))
+                if not utils.unmark_gift_as_purchased(gift_id, 1):
+                    raise RuntimeError(f"could not hand back {gift_id}")
+            elif operation == "aggregates":
+                utils.get_rsvp_aggregates().row_count("Ja")
+
+
+# Results
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, errors, elapsed):
+    """Per-operation statistics, latencies in milliseconds"""
+    results = {}
+    for operation in sorted(set(samples) | set(errors)):
+        values = sorted(samples.get(operation, []))
+        stats = {
+            "count": len(values),
+            "errors": len(errors.get(operation, [])),
+            "throughput_per_s": round(len(values) / elapsed, 2),
+        }
+        if values:
+            stats.update({
+                "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+            })
+        results[operation] = stats
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    header = f"{'operation':<20} {'count':>7} {'errors':>6} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for operation, stats in results.items():
+        line = (f"{operation:<20} {stats['count']:>7} {stats['errors']:>6} {stats['throughput_per_s']:>8.1f} "
+                f"{stats.get('p50_ms', float('nan')):>9.2f} {stats.get('p95_ms', float('nan')):>9.2f} "
+                f"{stats.get('p99_ms', float('nan')):>9.2f}")
+        if baseline:
+            base = baseline.get(operation, {}).get("p95_ms")
+            if base and "p95_ms" in stats:
+                line += f" {(stats['p95_ms'] - base) / base * 100:>+11.1f}%"
+            else:
+                line += f" {'-':>12}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rsvps", type=int, default=2000, help="rows in the generated RSVP table")
+    parser.add_argument("--gifts", type=int, default=100, help="gifts in the generated registry")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent sessions")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    parser.add_argument("--iterations", type=int, default=0, help="stop each worker after this many operations")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--no-pages", dest="pages", action="store_false", help="skip the AppTest page renders")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", metavar="PATH", help="write the results to this file")
+    parser.add_argument("--compare", metavar="PATH", help="results file of an earlier run to compare with")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own output")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    # Threads outside a script run would each log this warning on every Streamlit call
+    # (a filter, since Streamlit resets its loggers' levels when AppTest runs)
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.getMessage())
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # utils reads .streamlit/secrets.toml and the data files from here
+        try:
+            state = argparse.Namespace(lock=threading.Lock(), local=threading.local())
+            state.secrets = write_secrets(tmp, args.backend)
+            state.next_party = write_rsvps("wedding_rsvps.csv", args.rsvps, args.seed)
+            state.gift_ids = write_gifts("gift_registry.csv", args.gifts)
+            if args.backend == "sqlite":
+                import sqlite_store
+                sqlite_store.migrate_from_csv("wedding.db", "wedding_rsvps.csv", "gift_registry.csv")
+
+            import utils
+
+            # Outside a script run all threads share one session_state, so each
+            # worker gets its own browser id for the gift purchases (page
+            # renders run in AppTest's own session and keep the real one)
+            session_browser_id = utils.get_browser_id
+            utils.get_browser_id = lambda: getattr(state.local, "browser_id", None) or session_browser_id()
+
+            recorder = Recorder()
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+            with quiet:
+                start = time.monotonic()
+                deadline = start + args.duration
+                threads = [threading.Thread(target=worker, args=(i, args, state, recorder, deadline), daemon=True)
+                           for i in range(args.workers)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.monotonic() - start
+            rows_after = len(utils.load_rsvps())
+        finally:
+            os.chdir(cwd)
+
+    results = summarize(recorder.samples, recorder.errors, elapsed)
+    total = sum(stats["count"] for stats in results.values())
+    print(f"backend={args.backend} rsvps={args.rsvps} gifts={args.gifts} workers={args.workers} "
+          f"elapsed={elapsed:.1f}s operations={total} ({total / elapsed:.1f}/s) rsvps after run={rows_after}")
+    print_table(results, baseline and baseline.get("operations"))
+    for operation, messages in sorted(recorder.errors.items()):
+        print(f"{operation}: {len(messages)} errors, first: {messages[0]}")
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "streamlit": streamlit.__version__,
+            "settings": {key: value for key, value in vars(args).items() if key not in ("json", "compare", "verbose")},
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(total / elapsed, 2),
+            "operations": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Stress test: many processes reserving the same gift at once
+
+Starts --workers processes that all try to mark one gift (with
+--quantity items in stock) as purchased until it is sold out, then checks
+that exactly --quantity reservations succeeded and the stored purchase
+records add up. Exits with status 1 if the gift was oversold or a purchase
+got lost. Run from the repository root:
+
+    python bench/stress_gift_reservation.py --backend csv --workers 48 --quantity 10
+    python bench/stress_gift_reservation.py --backend sqlite --workers 48 --quantity 10
+
+The CSV backend needs pandas.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+import sqlite_store  # noqa: E402
+from gift_registry import reserve_purchase  # noqa: E402
+
+GIFT_ID = "gift_stresstest"
+
+
+def setup_csv(path, quantity):
+    """Write a registry with a single gift"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('"id";"name";"description";"url";"image_url";"purchased";"session_id";'
+                '"quantity_total";"quantity_purchased";"purchase_details"\n')
+        f.write(f'"{GIFT_ID}";"Teller";"Stress test";"";"";False;"";{quantity};0;"[]"\n')
+
+
+def setup_sqlite(path, quantity):
+    """Create a database with a single gift"""
+    with sqlite_store.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO gifts (gift_id, name, description, quantity_total) VALUES (?, 'Teller', 'Stress test', ?)",
+            (GIFT_ID, quantity)
+        )
+
+
+def reserve_once(backend, path, user_id):
+    """Try to buy one item; True if the reservation went through"""
+    if backend == "sqlite":
+        return sqlite_store.mark_gift_as_purchased(path, GIFT_ID, user_id, 1)
+    return storage.update_gift_registry_csv(path, lambda df: reserve_purchase(df, GIFT_ID, user_id, 1))
+
+
+def worker(backend, path, worker_id, attempts, start_event, results):
+    """Hammer the gift and report how many reservations succeeded"""
+    start_event.wait()
+    succeeded = 0
+    for _ in range(attempts):
+        if reserve_once(backend, path, f"usr_worker{worker_id}"):
+            succeeded += 1
+    results.put((worker_id, succeeded))
+
+
+def read_state(backend, path):
+    """Return (quantity_total, quantity_purchased, {user_id: quantity})"""
+    if backend == "sqlite":
+        with sqlite_store.connect(path) as conn:
+            gift = conn.execute(
+                "SELECT id, quantity_total, quantity_purchased FROM gifts WHERE gift_id = ?", (GIFT_ID,)
+            ).fetchone()
+            purchases = {row['user_id']: row['quantity'] for row in
+                         conn.execute("SELECT user_id, quantity FROM gift_purchases WHERE gift_id = ?", (gift['id'],))}
+        return gift['quantity_total'], gift['quantity_purchased'], purchases
+
+    df = storage.read_gift_registry_csv(path)
+    purchases = {p['user_id']: p['quantity'] for p in json.loads(df.at[GIFT_ID, 'purchase_details'])}
+    return int(df.at[GIFT_ID, 'quantity_total']), int(df.at[GIFT_ID, 'quantity_purchased']), purchases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--workers", type=int, default=48)
+    parser.add_argument("--attempts", type=int, default=5, help="reservation attempts per worker")
+    parser.add_argument("--quantity", type=int, default=10, help="items in stock")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "gift_registry.csv" if args.backend == "csv" else "wedding.db")
+        if args.backend == "csv":
+            setup_csv(path, args.quantity)
+        else:
+            setup_sqlite(path, args.quantity)
+
+        # Spawn fresh interpreters so no connection or lock state is inherited
+        ctx = multiprocessing.get_context("spawn")
+        start_event = ctx.Event()
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=worker, args=(args.backend, path, i, args.attempts, start_event, results))
+            for i in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        t0 = time.perf_counter()
+        start_event.set()
+        succeeded = sum(results.get()[1] for _ in processes)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - t0
+
+        total, purchased, purchases = read_state(args.backend, path)
+
+    expected = min(args.quantity, args.workers * args.attempts)
+    print(f"backend={args.backend} workers={args.workers} attempts={args.workers * args.attempts} "
+          f"elapsed={elapsed:.2f}s")
+    print(f"successful reservations: {succeeded}, stored: {purchased}/{total}, "
+          f"sum of purchase records: {sum(purchases.values())}")
+
+    ok = succeeded == expected and purchased == expected and sum(purchases.values()) == expected
+    print("OK" if ok else "FAILED: gift oversold or purchases lost")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
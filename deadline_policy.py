@@ -0,0 +1,90 @@
+"""The RSVP deadline and the periods around it.
+
+A DeadlinePolicy is built once from the ``[deadline]`` settings (parsing
+the date and looking up the timezone) and then answers every question
+about the current moment from a single ``now``:
+
+* before ``warning_start``: open
+* ``warning_start`` .. ``deadline``: open, but guests see a countdown
+* ``deadline`` .. ``grace_end``: past the deadline, RSVPs still accepted
+* after ``grace_end``: closed
+
+Periods are measured in elapsed time and compared in UTC: a 24 hour grace
+period is 24 real hours even across a DST change. A deadline that falls
+into the spring-forward gap is moved to the same moment after the change
+(02:30 -> 03:30), an ambiguous one in the fall means the first 02:30.
+
+utils.get_deadline_policy caches the policy per settings revision.
+"""
+import collections
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+DEADLINE_FORMAT = "%Y-%m-%d %H:%M"
+DEFAULT_GRACE_HOURS = 24
+DEFAULT_WARNING_DAYS = 7
+
+# Answers for one moment; remaining is timedelta(0) once the deadline passed
+DeadlineStatus = collections.namedtuple("DeadlineStatus", "now past in_grace in_warning remaining")
+
+_NO_DEADLINE = DeadlineStatus(None, False, False, False, None)
+
+
+class DeadlinePolicy:
+    """Deadline, grace period end and warning period start in the configured timezone"""
+
+    def __init__(self, deadline=None, grace_hours=DEFAULT_GRACE_HOURS, warning_days=DEFAULT_WARNING_DAYS,
+                 error=None):
+        self.grace_hours = grace_hours
+        self.warning_days = warning_days
+        # Why the settings couldn't be used (then deadline is None)
+        self.error = error
+        if deadline is None:
+            self.deadline = self.grace_end = self.warning_start = None
+            return
+
+        # Datetimes sharing a zoneinfo tzinfo add, subtract and compare by wall
+        # clock, which is off by the DST shift; so the arithmetic is done in UTC
+        # and only the results are converted back for display
+        self._deadline_utc = deadline.astimezone(timezone.utc)
+        self._grace_end_utc = self._deadline_utc + timedelta(hours=grace_hours)
+        self._warning_start_utc = self._deadline_utc - timedelta(days=warning_days)
+        self.deadline = self._deadline_utc.astimezone(deadline.tzinfo)
+        self.grace_end = self._grace_end_utc.astimezone(deadline.tzinfo)
+        self.warning_start = self._warning_start_utc.astimezone(deadline.tzinfo)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build from a ``[deadline]`` section; a broken section gives a policy without deadline"""
+        grace_hours = settings.get("grace_period_hours", DEFAULT_GRACE_HOURS)
+        warning_days = settings.get("warning_days", DEFAULT_WARNING_DAYS)
+        try:
+            deadline_naive = datetime.strptime(settings["deadline_datetime"], DEADLINE_FORMAT)
+            tz = ZoneInfo(settings.get("timezone", "UTC"))
+            return cls(deadline_naive.replace(tzinfo=tz), grace_hours, warning_days)
+        except Exception as e:
+            return cls(None, grace_hours, warning_days, error=e)
+
+    def now(self):
+        """Current time in the deadline's timezone"""
+        return datetime.now(self.deadline.tzinfo)
+
+    def status(self, now=None):
+        """DeadlineStatus for ``now`` (default: the current time)
+
+        A naive ``now`` is taken as wall-clock time in the deadline's timezone.
+        """
+        if self.deadline is None:
+            return _NO_DEADLINE
+        now = now or self.now()
+        if now.tzinfo is None:
+            now = now.replace(tzinfo=self.deadline.tzinfo)
+        now_utc = now.astimezone(timezone.utc)
+        past = now_utc > self._deadline_utc
+        return DeadlineStatus(
+            now=now.astimezone(self.deadline.tzinfo),
+            past=past,
+            in_grace=past and now_utc <= self._grace_end_utc,
+            in_warning=self._warning_start_utc <= now_utc <= self._deadline_utc,
+            remaining=timedelta(0) if past else self._deadline_utc - now_utc,
+        )
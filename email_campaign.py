@@ -0,0 +1,279 @@
+"""Bulk emails to the RSVP contacts (deadline reminders, venue updates).
+
+Each campaign has its own directory below the campaign directory:
+``campaign.json`` holds subject, body and recipient list and is written once,
+``progress.log`` gets one JSON line per recipient as soon as their email was
+sent (or failed). If the app dies halfway through, sending the campaign again
+skips everyone already logged as sent, so guests don't get the email twice.
+
+Sending runs on a few worker threads, each keeping its own SMTP session open
+(email_utils.SMTPConnectionManager) and sharing one rate limit so the mail
+provider doesn't start refusing us.
+"""
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+from email_utils import create_smtp_manager
+from rsvp_schema import is_blank
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+STATUS_ALL = "all"
+STATUS_ATTENDING = "attending"
+STATUS_NOT_ATTENDING = "not_attending"
+
+DEFAULT_CONNECTIONS = 3
+DEFAULT_RATE = 5.0  # messages per second over all connections
+
+# Campaigns currently being sent by this process
+_running = set()
+_running_lock = threading.Lock()
+
+
+def build_recipients(df, status=STATUS_ALL):
+    """One recipient per contact email, in submission order
+
+    Emails are compared case-insensitively; the latest RSVP of a contact
+    decides their attending status and name.
+    """
+    if df.empty or 'contact_email' not in df.columns:
+        return []
+
+    recipients = {}
+    for row in df.to_dict('records'):
+        email = '' if is_blank(row.get('contact_email')) else str(row['contact_email']).strip()
+        if '@' not in email:
+            continue
+        key = email.lower()
+        recipient = recipients.get(key, {'email': email})
+        recipient['name'] = '' if is_blank(row.get('contact_name')) else str(row['contact_name']).strip()
+        recipient['attending'] = row.get('attending') == 'Ja'
+        recipients[key] = recipient
+
+    if status == STATUS_ATTENDING:
+        return [r for r in recipients.values() if r['attending']]
+    if status == STATUS_NOT_ATTENDING:
+        return [r for r in recipients.values() if not r['attending']]
+    return list(recipients.values())
+
+
+def render_body(body, recipient):
+    """Fill in the {name} placeholder"""
+    return body.replace("{name}", recipient.get('name') or '')
+
+
+# Campaign files
+
+def _campaign_path(directory, campaign_id, name):
+    return os.path.join(directory, campaign_id, name)
+
+
+def create_campaign(directory, subject, body, recipients):
+    """Store a new campaign and return its id"""
+    campaign_id = time.strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:6]
+    campaign_dir = os.path.join(directory, campaign_id)
+    os.makedirs(campaign_dir)
+    campaign = {
+        'id': campaign_id,
+        'subject': subject,
+        'body': body,
+        'recipients': recipients,
+        'created_at': time.time(),
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=campaign_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(campaign, f, ensure_ascii=False)
+    os.replace(tmp_path, _campaign_path(directory, campaign_id, "campaign.json"))
+    return campaign_id
+
+
+def _read_progress(directory, campaign_id):
+    """Last logged result per recipient email: {email: True/False}"""
+    results = {}
+    try:
+        with open(_campaign_path(directory, campaign_id, "progress.log"), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                results[entry['email']] = entry['ok']
+    except FileNotFoundError:
+        pass
+    return results
+
+
+def _terminate_torn_line(path):
+    """End a half-written last line so the next entry starts on its own line"""
+    try:
+        with open(path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+
+def load_campaign(directory, campaign_id):
+    """Campaign dict plus its progress (``sent``/``failed`` counts)"""
+    with open(_campaign_path(directory, campaign_id, "campaign.json"), "r", encoding="utf-8") as f:
+        campaign = json.load(f)
+    results = _read_progress(directory, campaign_id)
+    campaign['sent'] = sum(1 for ok in results.values() if ok)
+    campaign['failed'] = sum(1 for ok in results.values() if not ok)
+    campaign['done'] = campaign['sent'] == len(campaign['recipients'])
+    with _running_lock:
+        campaign['running'] = campaign_id in _running
+    return campaign
+
+
+def list_campaigns(directory):
+    """All stored campaigns, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    campaigns = []
+    for campaign_id in sorted(os.listdir(directory), reverse=True):
+        try:
+            campaigns.append(load_campaign(directory, campaign_id))
+        except (OSError, ValueError):
+            continue
+    return campaigns
+
+
+# Sending
+
+class RateLimiter:
+    """Spaces out calls from several threads to at most ``rate`` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def send_campaign(directory, campaign_id, smtp_config, connections=DEFAULT_CONNECTIONS,
+                  rate=DEFAULT_RATE, progress=None):
+    """Send a campaign to everyone not logged as sent yet
+
+    ``progress(done, total)`` is called from the calling thread after every
+    message. Results are logged by the workers themselves, so the log stays
+    complete even if the caller stops waiting (e.g. a Streamlit rerun).
+    Returns (sent, failed) for this run, or None if the campaign is already
+    being sent.
+    """
+    with _running_lock:
+        if campaign_id in _running:
+            return None
+        _running.add(campaign_id)
+
+    try:
+        campaign = load_campaign(directory, campaign_id)
+        already_sent = {email for email, ok in _read_progress(directory, campaign_id).items() if ok}
+        pending = [r for r in campaign['recipients'] if r['email'] not in already_sent]
+    except Exception:
+        with _running_lock:
+            _running.discard(campaign_id)
+        raise
+
+    log_path = _campaign_path(directory, campaign_id, "progress.log")
+    _terminate_torn_line(log_path)
+
+    work = queue.Queue()
+    for recipient in pending:
+        work.put(recipient)
+    results = queue.Queue()
+    limiter = RateLimiter(rate)
+    log_lock = threading.Lock()
+
+    def log_result(recipient, ok):
+        entry = json.dumps({'email': recipient['email'], 'ok': ok, 'at': time.time()}, ensure_ascii=False)
+        with log_lock:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(entry + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def worker():
+        try:
+            manager = create_smtp_manager(smtp_config)
+        except Exception as e:
+            # Without a session this thread can't send anything; fail what's left
+            # rather than leave it to the other workers, which share the same config
+            log.error("Campaign SMTP setup failed: %s", e, extra={'campaign_id': campaign_id})
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    break
+                results.put(False)
+            results.put(None)
+            return
+        try:
+            while True:
+                try:
+                    recipient = work.get_nowait()
+                except queue.Empty:
+                    return
+                limiter.wait()
+                ok = False
+                try:
+                    ok = manager.send(recipient['email'], campaign['subject'], render_body(campaign['body'], recipient))
+                    log_result(recipient, ok)
+                except Exception as e:
+                    log.warning("Campaign email failed: %s", e,
+                                extra={'campaign_id': campaign_id, 'to': recipient['email']})
+                finally:
+                    results.put(ok)
+        finally:
+            try:
+                manager.close()
+            finally:
+                results.put(None)  # This worker is done
+
+    def run_workers(threads):
+        for thread in threads:
+            thread.join()
+        with _running_lock:
+            _running.discard(campaign_id)
+
+    threads = [threading.Thread(target=worker, name=f"campaign-{campaign_id}-{i}", daemon=True)
+               for i in range(max(1, min(connections, len(pending))))]
+    for thread in threads:
+        thread.start()
+    # Clears the running flag once all workers are done, even if nobody waits for them
+    threading.Thread(target=run_workers, args=(threads,), daemon=True).start()
+
+    sent = failed = 0
+    total = len(campaign['recipients'])
+    finished = 0
+    while finished < len(threads):
+        ok = results.get()
+        if ok is None:
+            finished += 1
+            continue
+        if ok:
+            sent += 1
+        else:
+            failed += 1
+        if progress:
+            progress(len(already_sent) + sent + failed, total)
+    # All workers have reported back: clear the running flag now, not whenever the
+    # background run_workers gets to it, or sending again right away is refused
+    run_workers(threads)
+    return sent, failed
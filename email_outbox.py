@@ -0,0 +1,196 @@
+"""Persistent outbox for confirmation emails.
+
+Submitting an RSVP used to wait for up to two SMTP round-trips. Now the
+messages are written to an on-disk queue (one JSON file per message) and a
+background thread delivers them, retrying with exponential backoff. Queued
+messages survive a restart: the worker picks them up again when the app
+starts.
+
+A message can carry follow-ups: ``on_success`` is queued once it has been
+delivered, ``on_failure`` once all attempts failed or the server refused
+the message for good (5xx). That's how the organizers get either the
+normal notification or a "guest email failed" notice.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = 30  # seconds, doubled after every failed attempt
+RETRY_MAX_DELAY = 30 * 60
+
+
+def _send_confirmation_email(to_email, subject, body):
+    """email_utils.send_confirmation_email, imported on the first delivery (smtplib isn't needed before)"""
+    from email_utils import send_confirmation_email
+
+    return send_confirmation_email(to_email, subject, body, raise_rejected=True)
+
+
+class EmailOutbox:
+    """On-disk email queue drained by a background worker thread"""
+
+    def __init__(self, directory, send_fn=_send_confirmation_email):
+        self.directory = directory
+        self.failed_directory = os.path.join(directory, "failed")
+        self.send_fn = send_fn
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        os.makedirs(self.failed_directory, exist_ok=True)
+
+    # Queue files
+
+    def _write_message(self, path, message):
+        """Write a message file atomically (temp file + os.replace)"""
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=self.directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(message, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _pending_files(self):
+        """Queued message files, oldest first"""
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.endswith(".json") and not name.startswith(".tmp_")
+        )
+
+    def enqueue(self, to_email, subject, body, on_success=None, on_failure=None):
+        """Queue a message for delivery and wake up the worker
+
+        ``on_success``/``on_failure`` are optional follow-up messages, given as
+        dicts with ``to``, ``subject`` and ``body``.
+        """
+        message = {
+            "id": uuid.uuid4().hex,
+            "to": to_email,
+            "subject": subject,
+            "body": body,
+            "on_success": on_success,
+            "on_failure": on_failure,
+            "attempts": 0,
+            "next_attempt_at": 0,
+            "created_at": time.time(),
+        }
+        # Timestamp prefix keeps the directory listing in submission order
+        name = f"{time.time_ns()}_{message['id']}.json"
+        self._write_message(os.path.join(self.directory, name), message)
+        self.start()
+        self._wakeup.set()
+        return message["id"]
+
+    def pending_count(self):
+        """Number of messages still waiting for delivery"""
+        return len(self._pending_files())
+
+    # Delivery
+
+    def _deliver(self, name, message):
+        """Try to send one message; returns the retry delay if it was rescheduled
+
+        ``send_fn`` returns True once the message is out and False for a
+        failure worth retrying; it raises email_utils.MessageRejected when
+        the server refused the message for good.
+
+        A follow-up is queued before the message leaves the queue, so a
+        crash in between sends the message (and follow-up) again rather than
+        losing the follow-up.
+        """
+        path = os.path.join(self.directory, name)
+        message["attempts"] += 1
+        try:
+            delivered = self.send_fn(message["to"], message["subject"], message["body"])
+        except Exception as e:
+            from email_utils import MessageRejected
+
+            if not isinstance(e, MessageRejected):
+                raise
+            log.error("Email rejected, giving up: %s", e, extra={'to': message['to']})
+            self._give_up(name, message)
+            return None
+
+        if delivered:
+            self._queue_follow_up(message.get("on_success"))
+            os.remove(path)
+            return None
+        if message["attempts"] < MAX_ATTEMPTS:
+            delay = min(RETRY_BASE_DELAY * 2 ** (message["attempts"] - 1), RETRY_MAX_DELAY)
+            message["next_attempt_at"] = time.time() + delay
+            self._write_message(path, message)
+            log.warning("Email failed, retrying in %ss", delay,
+                        extra={'to': message['to'], 'attempt': message['attempts']})
+            return delay
+        log.error("Email failed %s times, giving up", MAX_ATTEMPTS, extra={'to': message['to']})
+        self._give_up(name, message)
+        return None
+
+    def _give_up(self, name, message):
+        """Queue the on_failure follow-up, then keep the message in failed/ for inspection"""
+        self._queue_follow_up(message.get("on_failure"))
+        os.replace(os.path.join(self.directory, name), os.path.join(self.failed_directory, name))
+
+    def _queue_follow_up(self, follow_up):
+        if follow_up:
+            self.enqueue(follow_up["to"], follow_up["subject"], follow_up["body"])
+
+    def process_due(self):
+        """Deliver every message that is due; returns seconds until the next one"""
+        next_due = None
+        for name in self._pending_files():
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    message = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            wait = message.get("next_attempt_at", 0) - time.time()
+            if wait <= 0:
+                wait = self._deliver(name, message)
+            if wait is not None:
+                next_due = wait if next_due is None else min(next_due, wait)
+        return next_due
+
+    def _run(self):
+        """Worker loop: deliver due messages, then sleep until the next is due or a new one arrives"""
+        while True:
+            self._wakeup.clear()
+            try:
+                next_due = self.process_due()
+            except Exception:
+                log.exception("Email outbox error")
+                next_due = RETRY_BASE_DELAY
+            self._wakeup.wait(timeout=next_due)
+
+    def start(self):
+        """Start the background worker if it isn't running yet"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+                self._worker.start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_outbox():
+    """The process-wide outbox (one worker thread per server process)"""
+    directory = st.secrets.get("smtp", {}).get("outbox_dir", "email_outbox")
+    outbox = EmailOutbox(directory)
+    # Deliver anything left over from before a restart
+    outbox.start()
+    return outbox
+
+
+def enqueue_email(to_email, subject, body, on_success=None, on_failure=None):
+    """Queue an email for background delivery (see EmailOutbox.enqueue)"""
+    return get_outbox().enqueue(to_email, subject, body, on_success=on_success, on_failure=on_failure)
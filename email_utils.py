@@ -1,28 +1,205 @@
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import streamlit as st
 
-def send_confirmation_email(to_email, subject, body):
-    smtp = st.secrets["smtp"]
-    smtp_host = smtp["host"]
-    smtp_port = int(smtp.get("port", 587))
-    smtp_user = smtp["user"]
-    smtp_password = smtp["password"]
-    from_email = smtp.get("from", smtp_user)
+import perf
+from app_logging import get_logger
 
-    msg = MIMEText(body, "plain", "utf-8")
-    msg["From"] = from_email
-    msg["To"] = to_email
-    msg["Subject"] = subject
+log = get_logger(__name__)
 
+
+class MessageRejected(Exception):
+    """The server refused a message for good (5xx); sending it again won't help"""
+
+
+def _rejected_for_good(error):
+    """A permanent answer about this message: refused recipient or DATA error with a 5xx code
+
+    Auth and connect errors are left out, they are about our setup and may
+    well be fixed before the next attempt.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return bool(error.recipients) and all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPDataError) and error.smtp_code >= 500
+
+
+def _connection_lost(error):
+    """A dropped or unreachable server (ConnectionError, socket.timeout, ...), not an answer from it"""
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionManager:
+    """Keeps one authenticated SMTP session open and reuses it across messages
+
+    Connecting costs a TCP connect, STARTTLS handshake and AUTH; with the
+    session kept open, every further message is just MAIL/RCPT/DATA. A
+    session that has been idle for a while is checked with NOOP first, and
+    a send that hits a dropped connection reconnects and retries once.
+    """
+
+    def __init__(self, host, port, user, password, from_email=None, timeout=10,
+                 starttls=True, idle_check_after=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.from_email = from_email or user
+        self.timeout = timeout
+        self.starttls = starttls
+        self.idle_check_after = idle_check_after
+        self._server = None
+        self._last_used = 0
+        self._lock = threading.Lock()
+
+    @perf.timed("smtp.connect")
+    def _connect(self):
+        """Open and authenticate a new session"""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def _disconnect(self):
+        """Close the session, ignoring errors from an already dead connection"""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                try:
+                    self._server.close()
+                except Exception:
+                    pass
+            self._server = None
+
+    def _is_alive(self):
+        """Check a session that may have been dropped by the server"""
+        try:
+            return self._server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _ensure_connected(self):
+        """Reuse the current session if it's still usable, otherwise reconnect"""
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_check_after:
+            if not self._is_alive():
+                self._disconnect()
+        if self._server is None:
+            self._connect()
+
+    def _build_message(self, to_email, subject, body):
+        msg = MIMEText(body, "plain", "utf-8")
+        msg["From"] = self.from_email
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        return msg
+
+    @perf.timed("smtp.send")
+    def _send_one(self, to_email, subject, body):
+        """Send over the current session, reconnecting once if it was dropped
+
+        Only a lost connection is retried. An answer from the server (refused
+        recipient, DATA or auth error) is raised as it is: the message was
+        rejected, sending it again would not help, and sendmail has already
+        reset the session for the next message.
+        """
+        msg = self._build_message(to_email, subject, body).as_string()
+        for attempt in range(2):
+            try:
+                self._ensure_connected()
+                self._server.sendmail(self.from_email, to_email, msg)
+                self._last_used = time.monotonic()
+                return
+            except OSError as e:  # smtplib's exceptions are OSErrors too
+                if not _connection_lost(e):
+                    raise
+                self._disconnect()
+                if attempt == 1:
+                    raise
+
+    def _try_send(self, to_email, subject, body):
+        """Send one message with the lock held; returns the error, or None on success"""
+        try:
+            self._send_one(to_email, subject, body)
+            return None
+        except smtplib.SMTPRecipientsRefused as e:
+            # Only this recipient failed, the session is still fine
+            log.warning("SMTP recipient refused: %s", e, extra={'to': to_email})
+            return e
+        except smtplib.SMTPResponseException as e:
+            # The server rejected this message (sender, DATA); the session is still fine
+            log.warning("SMTP error %s: %s", e.smtp_code, e.smtp_error, extra={'to': to_email})
+            return e
+        except Exception as e:
+            log.warning("SMTP error: %s", e, extra={'to': to_email})
+            self._disconnect()
+            return e
+
+    def send(self, to_email, subject, body, raise_rejected=False):
+        """Send one message; returns True on success
+
+        With ``raise_rejected``, a permanent rejection raises MessageRejected
+        instead of returning False, so callers that retry can tell it apart.
+        """
+        with self._lock:
+            error = self._try_send(to_email, subject, body)
+        if error is not None and raise_rejected and _rejected_for_good(error):
+            raise MessageRejected(str(error)) from error
+        return error is None
+
+    def send_many(self, messages):
+        """Send several (to, subject, body) messages over one session
+
+        Returns one success flag per message.
+        """
+        with self._lock:
+            return [self._try_send(to_email, subject, body) is None for to_email, subject, body in messages]
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+def create_smtp_manager(smtp_config):
+    """Build a connection manager from an [smtp] secrets section"""
+    return SMTPConnectionManager(
+        host=smtp_config["host"],
+        port=int(smtp_config.get("port", 587)),
+        user=smtp_config["user"],
+        password=smtp_config["password"],
+        from_email=smtp_config.get("from", smtp_config["user"]),
+        starttls=smtp_config.get("starttls", True),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_smtp_manager():
+    """The process-wide SMTP session (shared by all sessions and the outbox)"""
+    return create_smtp_manager(st.secrets["smtp"])
+
+
+def send_confirmation_email(to_email, subject, body, raise_rejected=False):
     try:
-        with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.sendmail(from_email, to_email, msg.as_string())
-        return True
+        return get_smtp_manager().send(to_email, subject, body, raise_rejected=raise_rejected)
+    except MessageRejected:
+        raise
     except Exception as e:
         # Silently fail - don't show errors to users
-        print(f"SMTP Error: {e}")  # Log to console for debugging
+        log.warning("SMTP error: %s", e, extra={'to': to_email})
         return False
+
+
+def send_emails(messages):
+    """Send several (to, subject, body) messages over one SMTP session"""
+    try:
+        return get_smtp_manager().send_many(messages)
+    except Exception as e:
+        log.warning("SMTP error: %s", e)
+        return [False] * len(messages)
@@ -1,6 +1,230 @@
 import streamlit as st
-from utils import load_gift_registry, mark_gift_as_purchased, unmark_gift_as_purchased, can_undo_purchase, get_browser_id, get_remaining_quantity, get_user_purchased_quantity
+import perf
+import image_pipeline
+from utils import get_gift_registry_snapshot, mark_gift_as_purchased, unmark_gift_as_purchased, get_browser_id
+
+# Gift card images fill a square; one card is a third of the page (full width on phones)
+GIFT_IMAGE_SIZES = "(max-width: 640px) 100vw, 30vw"
+GIFT_IMAGE_STYLE = "position: absolute; top: 0; left: 0; width: 100%; height: 100%; object-fit: cover;"
+
+# Cards rendered before the guest asks for more (three rows)
+GIFTS_PER_PAGE = 9
+GIFT_FILTERS = {
+    "all": "Alle",
+    "available": "Noch verfügbar",
+    "mine": "Meine Käufe",
+}
+
+
+# Card buttons act in on_click callbacks, which run before the card is
+# drawn again: one fragment run per click, showing the result right away
+
+def _set_state(key, value):
+    st.session_state[key] = value
+
+
+def _purchase(idx, quantity):
+    if mark_gift_as_purchased(idx, quantity):
+        st.session_state[f'confirm_{idx}'] = False
+    else:
+        st.session_state[f'gift_error_{idx}'] = "Fehler beim Speichern. Bitte versuche es erneut."
+
+
+def _undo_purchase(idx):
+    if unmark_gift_as_purchased(idx):
+        st.session_state[f'undo_{idx}'] = False
+    else:
+        st.session_state[f'gift_error_{idx}'] = "Fehler beim Rückgängigmachen."
+
+
+def _undo_buttons(idx, user_purchased_qty):
+    """Undo button for this browser's purchase, with its confirmation"""
+    undo_key = f'undo_{idx}'
+    if not st.session_state.get(undo_key, False):
+        st.button("Rückgängig machen", key=f"undo_btn_{idx}", type="secondary", width='stretch',
+                  on_click=_set_state, args=(undo_key, True))
+        return
+
+    if user_purchased_qty > 1:
+        st.warning(f"Möchtest du deine {user_purchased_qty} Stück wirklich rückgängig machen?")
+    else:
+        st.warning("Möchtest du die Markierung wirklich rückgängig machen?")
+    col_yes, col_no = st.columns(2)
+    with col_yes:
+        st.button("✓ Ja", key=f"undo_yes_{idx}", type="primary", width='stretch',
+                  on_click=_undo_purchase, args=(idx,))
+    with col_no:
+        st.button("✗ Nein", key=f"undo_no_{idx}", width='stretch', on_click=_set_state, args=(undo_key, False))
+
+
+@st.fragment
+@perf.timed("page.gift_card")
+def _gift_card(idx):
+    """One wishlist card; its buttons rerun only this card"""
+    # Read the registry here rather than taking the row as an argument:
+    # a fragment rerun has to show the state after this card's own purchase
+    registry = get_gift_registry_snapshot()
+    if idx not in registry:
+        st.info("Dieser Wunsch ist nicht mehr auf der Liste.")
+        return
+    item = registry.gifts[idx]
+
+    with st.container(border=True):
+        # Display image as square
+        if item.get('image_url') and item['image_url'].strip():
+            image_url = item['image_url'].strip()
+            image = image_pipeline.lookup(image_url)
+            if image:
+                img_tag = image_pipeline.picture_html(image, alt=item['name'], sizes=GIFT_IMAGE_SIZES,
+                                                      img_style=GIFT_IMAGE_STYLE)
+            else:
+                # Not cached yet: hotlink this once and fetch it in the background
+                image_pipeline.prefetch(image_url)
+                img_tag = f'<img src="{image_url}" loading="lazy" style="{GIFT_IMAGE_STYLE}">'
+            st.markdown(f"""
+            <div style="width: 100%; padding-bottom: 100%; position: relative; overflow: hidden; border-radius: 8px;">
+                {img_tag}
+            </div>
+            """, unsafe_allow_html=True)
+            st.write("")
+
+        # Title
+        st.markdown(f"### {item['name']}")
+
+        # Description
+        st.write(item['description'])
+
+        st.write("")
+
+        # Product link
+        if item['url'] and item['url'].strip():
+            st.markdown(f"[:material/link: Zum Produkt]({item['url']})")
+
+        st.write("")
+
+        # Quantity information
+        quantity_total = int(item.get('quantity_total', 1))
+        quantity_purchased = int(item.get('quantity_purchased', 0))
+        quantity_remaining = quantity_total - quantity_purchased
+        user_purchased_qty = registry.user_purchased_quantity(idx, get_browser_id())
+
+        # Show quantity info if total > 1
+        if quantity_total > 1:
+            if quantity_purchased > 0:
+                st.info(f"📊 {quantity_purchased} von {quantity_total} bereits gekauft")
+            else:
+                st.info(f"📊 {quantity_total} Stück verfügbar")
+
+        st.write("")
+
+        error = st.session_state.pop(f'gift_error_{idx}', None)
+        if error:
+            st.error(error)
+
+        # Status and action buttons
+        if quantity_remaining <= 0:
+            st.success("✓ Vollständig gekauft")
+
+            # Show undo option only if this session purchased it
+            if user_purchased_qty > 0:
+                if user_purchased_qty > 1:
+                    st.caption(f"Du hast {user_purchased_qty} Stück gekauft")
+                _undo_buttons(idx, user_purchased_qty)
+        else:
+            # Still available for purchase
+            if quantity_purchased > 0 and user_purchased_qty > 0:
+                # Show partial purchase with undo option
+                if user_purchased_qty > 1:
+                    st.success(f"✓ Du hast {user_purchased_qty} Stück gekauft")
+                else:
+                    st.success(f"✓ Du hast bereits gekauft")
+                _undo_buttons(idx, user_purchased_qty)
+
+                st.write("")
+
+            # Check if we're in confirmation mode for this item
+            confirm_key = f'confirm_{idx}'
+
+            if not st.session_state.get(confirm_key, False):
+                # Show quantity selector if more than 1 available
+                if quantity_total > 1:
+                    quantity_to_buy = st.number_input(
+                        f"Anzahl:",
+                        min_value=1,
+                        max_value=quantity_remaining,
+                        value=1,
+                        step=1,
+                        key=f"quantity_{idx}"
+                    )
+                    st.session_state[f"selected_quantity_{idx}"] = quantity_to_buy
+                else:
+                    st.session_state[f"selected_quantity_{idx}"] = 1
 
+                # Show initial button
+                st.button("Als gekauft markieren", key=f"purchase_btn_{idx}", type="primary", width='stretch',
+                          on_click=_set_state, args=(confirm_key, True))
+            else:
+                # Show confirmation
+                selected_qty = st.session_state.get(f"selected_quantity_{idx}", 1)
+                if quantity_total > 1:
+                    st.warning(f"Möchtest du {selected_qty} Stück wirklich als gekauft markieren?")
+                else:
+                    st.warning("Möchtest du diesen Artikel wirklich als gekauft markieren?")
+                col_yes, col_no = st.columns(2)
+                with col_yes:
+                    st.button("✓ Ja", key=f"yes_{idx}", type="primary", width='stretch',
+                              on_click=_purchase, args=(idx, selected_qty))
+                with col_no:
+                    st.button("✗ Nein", key=f"no_{idx}", width='stretch', on_click=_set_state, args=(confirm_key, False))
+
+
+def _filter_gifts(registry, browser_id, gift_filter):
+    """Gift ids shown for a filter, in registry order"""
+    if gift_filter == "available":
+        return [gift_id for gift_id in registry.gifts if registry.remaining_quantity(gift_id) > 0]
+    if gift_filter == "mine":
+        my_purchases = registry.purchases_for_user(browser_id)
+        return [gift_id for gift_id in registry.gifts if gift_id in my_purchases]
+    return list(registry.gifts)
+
+
+@st.fragment
+@perf.timed("page.gift_grid")
+def _gift_grid():
+    """Filter and the first GIFTS_PER_PAGE cards, more on request; reruns without the rest of the page"""
+    registry = get_gift_registry_snapshot()
+
+    gift_filter = st.radio("Anzeigen", list(GIFT_FILTERS), format_func=GIFT_FILTERS.get, horizontal=True,
+                           key="gift_filter", label_visibility="collapsed")
+    gift_ids = _filter_gifts(registry, get_browser_id(), gift_filter)
+    if not gift_ids:
+        if gift_filter == "mine":
+            st.info("Du hast noch nichts als gekauft markiert.")
+        else:
+            st.info("Alle Wünsche sind bereits erfüllt - vielen Dank!")
+        return
+
+    # Each filter remembers how far the guest has scrolled
+    limit_key = f"gift_limit_{gift_filter}"
+    limit = st.session_state.get(limit_key, GIFTS_PER_PAGE)
+    visible = gift_ids[:limit]
+
+    # Display gifts as cards in a grid (3 columns)
+    num_cols = 3
+    for start in range(0, len(visible), num_cols):
+        cols = st.columns(num_cols)
+        for col, gift_id in zip(cols, visible[start:start + num_cols]):
+            with col:
+                _gift_card(gift_id)
+
+    hidden = len(gift_ids) - len(visible)
+    if hidden > 0:
+        st.button(f"Mehr anzeigen ({hidden} weitere)", key=f"more_gifts_{gift_filter}",
+                  icon=":material/expand_more:", width='stretch',
+                  on_click=_set_state, args=(limit_key, limit + GIFTS_PER_PAGE))
+
+
+@perf.timed("page.event_info")
 def event_info_page():
     # Initialize browser ID for persistent gift tracking
     _ = get_browser_id()
@@ -117,179 +341,14 @@ def event_info_page():
                 
                 st.write("🌴 Alternativ könnt ihr uns auch mit einem Beitrag zu unserer Hochzeitsreise eine Freude machen!")
                 
-                # Load gift registry
-                gift_df = load_gift_registry()
-                
-                if not gift_df.empty:
-                    # Get browser ID
-                    browser_id = get_browser_id()
-                    
+                # Registry is read inside the grid fragment; this only checks there is one
+                if not get_gift_registry_snapshot().empty:
                     # Info message
                     st.info("💡 Du kannst nur deine eigenen Markierungen rückgängig machen. Diese werden über die URL gespeichert - kopiere die URL, um später darauf zuzugreifen!")
                     
                     st.write("")
                     
-                    # Display gifts as cards in a grid (3 columns)
-                    num_cols = 3
-                    rows = [gift_df.iloc[i:i+num_cols] for i in range(0, len(gift_df), num_cols)]
-                    
-                    for row_items in rows:
-                        cols = st.columns(num_cols)
-                        
-                        for col_idx, (idx, item) in enumerate(row_items.iterrows()):
-                            with cols[col_idx]:
-                                # Create a card container
-                                with st.container(border=True):
-                                    # Display image as square
-                                    if item.get('image_url') and item['image_url'].strip():
-                                        st.markdown(f"""
-                                        <div style="width: 100%; padding-bottom: 100%; position: relative; overflow: hidden; border-radius: 8px;">
-                                            <img src="{item['image_url']}" style="position: absolute; top: 0; left: 0; width: 100%; height: 100%; object-fit: cover;">
-                                        </div>
-                                        """, unsafe_allow_html=True)
-                                        st.write("")
-                                    
-                                    # Title
-                                    st.markdown(f"### {item['name']}")
-                                    
-                                    # Description
-                                    st.write(item['description'])
-                                    
-                                    st.write("")
-                                    
-                                    # Product link
-                                    if item['url'] and item['url'].strip():
-                                        st.markdown(f"[:material/link: Zum Produkt]({item['url']})")
-                                    
-                                    st.write("")
-                                    
-                                    # Quantity information
-                                    quantity_total = int(item.get('quantity_total', 1))
-                                    quantity_purchased = int(item.get('quantity_purchased', 0))
-                                    quantity_remaining = quantity_total - quantity_purchased
-                                    user_purchased_qty = get_user_purchased_quantity(idx)
-                                    
-                                    # Show quantity info if total > 1
-                                    if quantity_total > 1:
-                                        if quantity_purchased > 0:
-                                            st.info(f"📊 {quantity_purchased} von {quantity_total} bereits gekauft")
-                                        else:
-                                            st.info(f"📊 {quantity_total} Stück verfügbar")
-                                    
-                                    st.write("")
-                                    
-                                    # Status and action buttons
-                                    if quantity_remaining <= 0:
-                                        st.success("✓ Vollständig gekauft")
-                                        
-                                        # Show undo option only if this session purchased it
-                                        if can_undo_purchase(idx):
-                                            if user_purchased_qty > 1:
-                                                st.caption(f"Du hast {user_purchased_qty} Stück gekauft")
-                                            
-                                            undo_key = f'undo_{idx}'
-                                            
-                                            if not st.session_state.get(undo_key, False):
-                                                if st.button("Rückgängig machen", key=f"undo_btn_{idx}", type="secondary", width='stretch'):
-                                                    st.session_state[undo_key] = True
-                                                    st.rerun()
-                                            else:
-                                                # Show undo confirmation
-                                                if user_purchased_qty > 1:
-                                                    st.warning(f"Möchtest du deine {user_purchased_qty} Stück wirklich rückgängig machen?")
-                                                else:
-                                                    st.warning("Möchtest du die Markierung wirklich rückgängig machen?")
-                                                col_yes, col_no = st.columns(2)
-                                                with col_yes:
-                                                    if st.button("✓ Ja", key=f"undo_yes_{idx}", type="primary", width='stretch'):
-                                                        if unmark_gift_as_purchased(idx):
-                                                            st.success("Die Markierung wurde rückgängig gemacht.")
-                                                            st.session_state[undo_key] = False
-                                                            st.rerun()
-                                                        else:
-                                                            st.error("Fehler beim Rückgängigmachen.")
-                                                with col_no:
-                                                    if st.button("✗ Nein", key=f"undo_no_{idx}", width='stretch'):
-                                                        st.session_state[undo_key] = False
-                                                        st.rerun()
-                                    else:
-                                        # Still available for purchase
-                                        if quantity_purchased > 0 and can_undo_purchase(idx):
-                                            # Show partial purchase with undo option
-                                            if user_purchased_qty > 1:
-                                                st.success(f"✓ Du hast {user_purchased_qty} Stück gekauft")
-                                            else:
-                                                st.success(f"✓ Du hast bereits gekauft")
-                                            
-                                            undo_key = f'undo_{idx}'
-                                            if not st.session_state.get(undo_key, False):
-                                                if st.button("Rückgängig machen", key=f"undo_btn_{idx}", type="secondary", width='stretch'):
-                                                    st.session_state[undo_key] = True
-                                                    st.rerun()
-                                            else:
-                                                # Show undo confirmation
-                                                if user_purchased_qty > 1:
-                                                    st.warning(f"Möchtest du deine {user_purchased_qty} Stück wirklich rückgängig machen?")
-                                                else:
-                                                    st.warning("Möchtest du die Markierung wirklich rückgängig machen?")
-                                                col_yes, col_no = st.columns(2)
-                                                with col_yes:
-                                                    if st.button("✓ Ja", key=f"undo_yes_{idx}", type="primary", width='stretch'):
-                                                        if unmark_gift_as_purchased(idx):
-                                                            st.success("Die Markierung wurde rückgängig gemacht.")
-                                                            st.session_state[undo_key] = False
-                                                            st.rerun()
-                                                        else:
-                                                            st.error("Fehler beim Rückgängigmachen.")
-                                                with col_no:
-                                                    if st.button("✗ Nein", key=f"undo_no_{idx}", width='stretch'):
-                                                        st.session_state[undo_key] = False
-                                                        st.rerun()
-                                            
-                                            st.write("")
-                                        
-                                        # Check if we're in confirmation mode for this item
-                                        confirm_key = f'confirm_{idx}'
-                                        
-                                        if not st.session_state.get(confirm_key, False):
-                                            # Show quantity selector if more than 1 available
-                                            if quantity_total > 1:
-                                                quantity_to_buy = st.number_input(
-                                                    f"Anzahl:",
-                                                    min_value=1,
-                                                    max_value=quantity_remaining,
-                                                    value=1,
-                                                    step=1,
-                                                    key=f"quantity_{idx}"
-                                                )
-                                                st.session_state[f"selected_quantity_{idx}"] = quantity_to_buy
-                                            else:
-                                                st.session_state[f"selected_quantity_{idx}"] = 1
-                                            
-                                            # Show initial button
-                                            if st.button("Als gekauft markieren", key=f"purchase_btn_{idx}", type="primary", width='stretch'):
-                                                st.session_state[confirm_key] = True
-                                                st.rerun()
-                                        else:
-                                            # Show confirmation
-                                            selected_qty = st.session_state.get(f"selected_quantity_{idx}", 1)
-                                            if quantity_total > 1:
-                                                st.warning(f"Möchtest du {selected_qty} Stück wirklich als gekauft markieren?")
-                                            else:
-                                                st.warning("Möchtest du diesen Artikel wirklich als gekauft markieren?")
-                                            col_yes, col_no = st.columns(2)
-                                            with col_yes:
-                                                if st.button("✓ Ja", key=f"yes_{idx}", type="primary", width='stretch'):
-                                                    if mark_gift_as_purchased(idx, selected_qty):
-                                                        st.success("Vielen Dank! Der Artikel wurde als gekauft markiert.")
-                                                        st.session_state[confirm_key] = False
-                                                        st.rerun()
-                                                    else:
-                                                        st.error("Fehler beim Speichern. Bitte versuche es erneut.")
-                                            with col_no:
-                                                if st.button("✗ Nein", key=f"no_{idx}", width='stretch'):
-                                                    st.session_state[confirm_key] = False
-                                                    st.rerun()
+                    _gift_grid()
                 else:
                     st.info("Die Wunschliste wird in Kürze verfügbar sein.")
 
@@ -0,0 +1,203 @@
+"""In-memory view of the gift registry.
+
+The wishlist tab asks several questions per gift card (remaining quantity,
+what the current browser bought, whether it can undo). A
+GiftRegistrySnapshot parses the registry once and answers all of them from
+memory; utils.get_gift_registry_snapshot keeps one snapshot around until the
+underlying file changes or the app writes to the registry. It is built
+from plain rows (dicts), so the guest pages can show the wishlist without
+loading pandas.
+
+Gifts are addressed by their stable id (the ``id`` column), never by row
+position, so an admin deleting or reordering gifts can't redirect a guest's
+click to a different gift. Purchases are normalized into
+(gift_id, user_id, quantity) records with an index keyed by user id, so
+"what has this browser bought" is a single dict lookup instead of a JSON
+decode per gift.
+
+The functions below apply a change to a freshly loaded registry dataframe
+(indexed by gift id). They are meant to run inside
+storage.update_gift_registry_csv, which holds the registry lock from the
+read to the write, so checks like "is there stock left" can't go stale in
+between.
+"""
+import json
+
+from storage import new_gift_id
+
+
+class GiftRegistrySnapshot:
+    """Read-only view of the gift registry, loaded once and queried in memory"""
+
+    def __init__(self, rows):
+        # gift_id -> row (dict with the registry's columns), in registry order
+        self.gifts = {row['id']: row for row in rows}
+
+        # gift_id -> (quantity_total, quantity_purchased)
+        self._quantities = {}
+        self.purchases = []
+        for gift_id, row in self.gifts.items():
+            self._quantities[gift_id] = (int(row['quantity_total']), int(row['quantity_purchased']))
+
+            # Decode purchase_details once into normalized purchase records
+            try:
+                details = json.loads(row['purchase_details'])
+            except (TypeError, ValueError):
+                details = []
+            for purchase in details:
+                self.purchases.append((gift_id, purchase['user_id'], int(purchase['quantity'])))
+
+        # user_id -> {gift_id: quantity}
+        self._by_user = {}
+        for gift_id, user_id, quantity in self.purchases:
+            user_purchases = self._by_user.setdefault(user_id, {})
+            user_purchases[gift_id] = user_purchases.get(gift_id, 0) + quantity
+
+    def __len__(self):
+        return len(self._quantities)
+
+    def __contains__(self, gift_id):
+        return gift_id in self._quantities
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def remaining_quantity(self, gift_id):
+        """Remaining quantity available for a gift"""
+        if gift_id not in self._quantities:
+            return 0
+        total, purchased = self._quantities[gift_id]
+        return max(0, total - purchased)
+
+    def purchases_for_user(self, user_id):
+        """All purchases of a user as {gift_id: quantity} (don't modify)"""
+        return self._by_user.get(user_id, {})
+
+    def user_purchased_quantity(self, gift_id, user_id):
+        """Quantity of a gift purchased by the given user"""
+        return self.purchases_for_user(user_id).get(gift_id, 0)
+
+    def can_undo_purchase(self, gift_id, user_id):
+        """True if the given user has purchased any of this gift"""
+        return self.user_purchased_quantity(gift_id, user_id) > 0
+
+
+def reserve_purchase(df, gift_id, user_id, quantity=1):
+    """Record a purchase of up to ``quantity`` items for a user
+
+    Returns False (and leaves df alone) if the gift doesn't exist or
+    nothing is left, so quantity_purchased never exceeds quantity_total.
+    """
+    if gift_id not in df.index:
+        return False
+
+    total_available = int(df.at[gift_id, 'quantity_total'])
+    current_purchased = int(df.at[gift_id, 'quantity_purchased'])
+
+    # Don't allow purchasing more than available
+    quantity = min(quantity, total_available - current_purchased)
+    if quantity <= 0:
+        return False
+
+    try:
+        purchase_details = json.loads(df.at[gift_id, 'purchase_details'])
+    except (TypeError, ValueError):
+        purchase_details = []
+
+    # Add to the user's existing purchase record, or create one
+    for purchase in purchase_details:
+        if purchase['user_id'] == user_id:
+            purchase['quantity'] += quantity
+            break
+    else:
+        purchase_details.append({'user_id': user_id, 'quantity': quantity})
+
+    new_purchased = current_purchased + quantity
+    df.at[gift_id, 'quantity_purchased'] = new_purchased
+    df.at[gift_id, 'purchase_details'] = json.dumps(purchase_details)
+    df.at[gift_id, 'session_id'] = user_id  # Keep for backward compatibility
+
+    # Mark as fully purchased if quantity reached
+    if new_purchased >= total_available:
+        df.at[gift_id, 'purchased'] = True
+    return True
+
+
+def release_purchase(df, gift_id, user_id, quantity=None):
+    """Remove a user's purchases of a gift (all of them if quantity is None)
+
+    Returns False if the user has no purchase of this gift.
+    """
+    if gift_id not in df.index:
+        return False
+
+    try:
+        purchase_details = json.loads(df.at[gift_id, 'purchase_details'])
+    except (TypeError, ValueError):
+        purchase_details = []
+
+    user_index = next((i for i, p in enumerate(purchase_details) if p['user_id'] == user_id), None)
+    if user_index is None:
+        return False
+    user_purchase = purchase_details[user_index]
+
+    qty_to_remove = user_purchase['quantity'] if quantity is None else min(quantity, user_purchase['quantity'])
+    user_purchase['quantity'] -= qty_to_remove
+
+    # Remove user from list if they have no more purchases
+    if user_purchase['quantity'] <= 0:
+        purchase_details.pop(user_index)
+
+    new_total = int(df.at[gift_id, 'quantity_purchased']) - qty_to_remove
+    df.at[gift_id, 'quantity_purchased'] = new_total
+    df.at[gift_id, 'purchase_details'] = json.dumps(purchase_details)
+    df.at[gift_id, 'purchased'] = (new_total >= int(df.at[gift_id, 'quantity_total']))
+
+    # Session id follows the last remaining purchaser
+    df.at[gift_id, 'session_id'] = purchase_details[-1]['user_id'] if purchase_details else ''
+    return True
+
+
+# Columns the admin page may edit; purchase columns are owned by the guests
+EDITABLE_GIFT_COLUMNS = ['name', 'description', 'url', 'image_url', 'quantity_total']
+
+
+def insert_gift(df, gift):
+    """Append a new gift (dict of editable columns) with a fresh id"""
+    gift_id = new_gift_id()
+    record = {
+        'id': gift_id,
+        'purchased': False,
+        'session_id': '',
+        'quantity_total': 1,
+        'quantity_purchased': 0,
+        'purchase_details': '[]',
+    }
+    record.update({col: gift[col] for col in EDITABLE_GIFT_COLUMNS if col in gift})
+    df.loc[gift_id] = [record.get(col, '') for col in df.columns]
+    return True
+
+
+def apply_gift_changes(df, gift_id, changes):
+    """Update the editable columns of one gift, keeping its purchases intact"""
+    if gift_id not in df.index:
+        return False
+
+    for col, value in changes.items():
+        if col in EDITABLE_GIFT_COLUMNS:
+            df.at[gift_id, col] = value
+
+    # Update purchased flag based on quantity
+    df.at[gift_id, 'purchased'] = (
+        int(df.at[gift_id, 'quantity_purchased']) >= int(df.at[gift_id, 'quantity_total'])
+    )
+    return True
+
+
+def remove_gift(df, gift_id):
+    """Delete one gift"""
+    if gift_id not in df.index:
+        return False
+    df.drop(index=gift_id, inplace=True)
+    return True
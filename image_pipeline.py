@@ -0,0 +1,315 @@
+"""Resized WebP/AVIF variants of the venue photos and gift images.
+
+Full-size PNGs and hotlinked product photos cost guests on mobile data
+megabytes for what ends up as a thumbnail. This module writes smaller
+copies to ``static/img/`` (served by Streamlit's static file serving under
+``app/static/img/``) and renders ``<picture>`` tags with a ``srcset`` per
+format, so the browser picks AVIF or WebP at the width it actually needs.
+A JPEG/PNG fallback covers browsers without either.
+
+* images in ``images/`` are converted at build time (``python
+  image_pipeline.py`` in the Dockerfile) and checked again at startup
+* remote gift images are downloaded once, when the admin saves the gift,
+  or in the background the first time a guest sees it
+* variant file names contain a hash of the source content, so an edited
+  photo gets new files (and browsers can cache them forever)
+
+``static/img/manifest.json`` maps each source (path or URL) to its
+variants. Nothing that is already listed there and on disk is fetched or
+converted again. Page renders only read the manifest.
+"""
+import argparse
+import collections
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+IMAGE_DIR = "images"
+OUTPUT_DIR = os.path.join("static", "img")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+# Everything in static/ is served, so the manifest's lock file lives outside it
+MANIFEST_LOCK_PATH = "image_manifest.lock"
+URL_PREFIX = "app/static/img/"
+
+# Venue photos span the page width, gift cards a third of it
+PHOTO_WIDTHS = (480, 960, 1600)
+GIFT_WIDTHS = (240, 480)
+QUALITY = {'avif': 55, 'webp': 78, 'jpeg': 82}
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+MAX_DOWNLOAD_BYTES = 15 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 10
+RETRY_FAILED_AFTER = 3600  # seconds before a failed download is tried again
+
+ImageSet = collections.namedtuple("ImageSet", "width height sources fallback")
+
+_manifest_cache = {'signature': None, 'images': {}}
+_manifest_guard = threading.Lock()
+_fetcher = None
+_pending = set()
+_failed = {}  # url -> time of the last failed download
+_pending_guard = threading.Lock()
+
+
+def _formats():
+    """Modern formats this Pillow build can write, best first"""
+    from PIL import features
+
+    return ('avif', 'webp') if features.check('avif') else ('webp',)
+
+
+def _slug(name):
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')[:40]
+    return slug or 'image'
+
+
+def _url(filename):
+    return URL_PREFIX + filename
+
+
+# Manifest
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get('images', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _manifest():
+    """The manifest's entries, re-read only when the file changed"""
+    try:
+        stat = os.stat(MANIFEST_PATH)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    with _manifest_guard:
+        if signature != _manifest_cache['signature']:
+            _manifest_cache['images'] = _read_manifest() if signature else {}
+            _manifest_cache['signature'] = signature
+        return _manifest_cache['images']
+
+
+def _write_atomically(path, data):
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it readable for the owner only
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _store_entry(key, entry):
+    """Add one source to the manifest (other processes may be adding theirs)"""
+    with storage.file_lock(MANIFEST_PATH, lock_path=MANIFEST_LOCK_PATH):
+        images = _read_manifest()
+        images[key] = entry
+        _write_atomically(MANIFEST_PATH, json.dumps({'images': images}, indent=1).encode("utf-8"))
+
+
+def _complete(entry):
+    """All files of a manifest entry are still on disk"""
+    files = [entry['fallback']] + [name for variants in entry['sources'].values() for _, name in variants]
+    return all(os.path.exists(os.path.join(OUTPUT_DIR, name)) for name in files)
+
+
+def _image_set(entry):
+    return ImageSet(
+        width=entry['width'],
+        height=entry['height'],
+        sources={fmt: [(_url(name), width) for width, name in variants] for fmt, variants in entry['sources'].items()},
+        fallback=_url(entry['fallback'])
+    )
+
+
+# Conversion
+
+def _render(data, name, widths):
+    """Write the variants of one source image; returns its manifest entry"""
+    from PIL import Image, ImageOps
+
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    with Image.open(io.BytesIO(data)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        image.load()
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    # Never upscale: widths above the original collapse into the original width
+    chosen = sorted({min(width, image.width) for width in widths})
+    resized = {}
+
+    def variant(width, fmt):
+        filename = f"{_slug(name)}-{digest}-{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+        path = os.path.join(OUTPUT_DIR, filename)
+        if not os.path.exists(path):
+            if width not in resized:
+                height = round(image.height * width / image.width)
+                resized[width] = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized[width].save(buffer, fmt.upper(), quality=QUALITY.get(fmt, 80), optimize=fmt != 'avif')
+            _write_atomically(path, buffer.getvalue())
+        return filename
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    sources = {fmt: [[width, variant(width, fmt)] for width in chosen] for fmt in _formats()}
+    fallback_width = chosen[len(chosen) // 2]
+    return {
+        'digest': digest,
+        'width': image.width,
+        'height': image.height,
+        'sources': sources,
+        'fallback': variant(fallback_width, 'png' if has_alpha else 'jpeg'),
+    }
+
+
+def process_file(path, widths=PHOTO_WIDTHS):
+    """Variants of a local image, converting it only if it changed"""
+    key = os.path.normpath(path)
+    stat = os.stat(path)
+    entry = _manifest().get(key)
+    if entry and entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size and _complete(entry):
+        return _image_set(entry)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    entry = _render(data, os.path.splitext(os.path.basename(path))[0], widths)
+    entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    _store_entry(key, entry)
+    log.info("Converted image", extra={'source': key, 'variants': sum(len(v) for v in entry['sources'].values())})
+    return _image_set(entry)
+
+
+def _download(url):
+    request = urllib.request.Request(url, headers={'User-Agent': 'wedding-rsvp-image-cache/1.0'})
+    with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+        data = response.read(MAX_DOWNLOAD_BYTES + 1)
+    if len(data) > MAX_DOWNLOAD_BYTES:
+        raise ValueError(f"image larger than {MAX_DOWNLOAD_BYTES // (1024 * 1024)} MB")
+    return data
+
+
+def process_url(url, widths=GIFT_WIDTHS):
+    """Variants of a remote image, downloading it only if it isn't cached yet"""
+    entry = _manifest().get(url)
+    if entry and _complete(entry):
+        return _image_set(entry)
+
+    data = _download(url)
+    entry = _render(data, 'gift', widths)
+    _store_entry(url, entry)
+    log.info("Cached remote image", extra={'source': url, 'bytes': len(data)})
+    return _image_set(entry)
+
+
+def cache_remote_image(url):
+    """process_url for admin pages: returns None (and logs) instead of raising"""
+    try:
+        return process_url(url)
+    except Exception as e:
+        log.warning("Could not cache image: %s", e, extra={'source': url})
+        return None
+
+
+# Page renders
+
+def lookup(source):
+    """ImageSet for an image path or URL that has been converted, else None (never converts)"""
+    if not source:
+        return None
+    entry = _manifest().get(source) or _manifest().get(os.path.normpath(source))
+    if entry and os.path.exists(os.path.join(OUTPUT_DIR, entry['fallback'])):
+        return _image_set(entry)
+    return None
+
+
+def prefetch(url):
+    """Cache a remote image in the background (at most once at a time per URL)"""
+    global _fetcher
+
+    with _pending_guard:
+        failed_at = _failed.get(url)
+        if url in _pending or (failed_at and time.time() - failed_at < RETRY_FAILED_AFTER):
+            return
+        _pending.add(url)
+        if _fetcher is None:
+            _fetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-fetch")
+
+    def run():
+        try:
+            process_url(url)
+            _failed.pop(url, None)
+        except Exception as e:
+            _failed[url] = time.time()
+            log.warning("Could not cache image: %s", e, extra={'source': url})
+        finally:
+            with _pending_guard:
+                _pending.discard(url)
+
+    _fetcher.submit(run)
+
+
+def _escape(value):
+    return str(value).replace("&", "&amp;").replace('"', "&quot;").replace("<", "&lt;")
+
+
+def picture_html(image, alt="", sizes="100vw", img_style="width: 100%; height: auto;"):
+    """``<picture>`` with one srcset per format plus the fallback ``<img>``"""
+    sources = "".join(
+        f'<source type="image/{fmt}" srcset="{", ".join(f"{url} {width}w" for url, width in variants)}" sizes="{sizes}">'
+        for fmt, variants in image.sources.items()
+    )
+    return (
+        f'<picture>{sources}<img src="{image.fallback}" alt="{_escape(alt)}" width="{image.width}" '
+        f'height="{image.height}" loading="lazy" decoding="async" style="{img_style}"></picture>'
+    )
+
+
+# Build step
+
+def build(image_dir=IMAGE_DIR, gift_registry=None):
+    """Convert all images in image_dir (and the gift images of a registry CSV)"""
+    converted = 0
+    if os.path.isdir(image_dir):
+        for name in sorted(os.listdir(image_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                process_file(os.path.join(image_dir, name))
+                converted += 1
+
+    if gift_registry and os.path.exists(gift_registry):
+        for url in storage.read_gift_registry_csv(gift_registry)['image_url']:
+            if url.strip() and cache_remote_image(url.strip()):
+                converted += 1
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the resized image variants")
+    parser.add_argument("--images", default=IMAGE_DIR, help="directory with the venue photos")
+    parser.add_argument("--gifts", help="gift registry CSV whose image URLs should be cached too")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    count = build(args.images, args.gifts)
+    print(f"{count} images ready in {OUTPUT_DIR} ({time.perf_counter() - t0:.1f}s, formats: {', '.join(_formats())})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Timing of the hot paths (storage, SMTP sends, page renders).
+
+Wrap code in ``timed(name)``, either as a context manager or as a
+decorator:
+
+    @perf.timed("rsvps.append")
+    def save_rsvp_batch(rows): ...
+
+    with perf.timed("smtp.send"):
+        ...
+
+Every call's duration goes into a ring buffer of the last RING_SIZE calls
+(percentiles and the slowest calls are computed from it); call counts,
+error counts and total time per operation are kept for the life of the
+process. prometheus_text() renders everything in the Prometheus text
+format, and start_textfile_export() writes it to a file periodically for
+node_exporter's textfile collector. The admin "Performance" page shows the
+same numbers.
+
+Streamlit's st.stop()/st.rerun() end a page by raising a control-flow
+exception; those count as normal calls, only real exceptions as errors.
+"""
+import collections
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+RING_SIZE = 5000
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "wedding_operation"
+
+Sample = collections.namedtuple("Sample", "name seconds ok ended_at thread")
+
+_lock = threading.Lock()
+_samples = collections.deque(maxlen=RING_SIZE)
+_totals = {}  # name -> [calls, errors, seconds]
+_started_at = time.time()
+
+
+def record(name, seconds, ok=True):
+    """Record one call of an operation"""
+    sample = Sample(name, seconds, ok, time.time(), threading.current_thread().name)
+    with _lock:
+        _samples.append(sample)
+        totals = _totals.setdefault(name, [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += 0 if ok else 1
+        totals[2] += seconds
+
+
+@contextmanager
+def timed(name):
+    """Time the wrapped block or function under ``name``"""
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except Exception:
+        ok = False
+        raise
+    finally:
+        record(name, time.perf_counter() - start, ok)
+
+
+def reset():
+    """Forget everything recorded so far"""
+    global _started_at
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _started_at = time.time()
+
+
+def samples():
+    """Copy of the ring buffer, oldest first"""
+    with _lock:
+        return list(_samples)
+
+
+def started_at():
+    """When recording started (process start or last reset)"""
+    return _started_at
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summary():
+    """Per-operation statistics, slowest p95 first
+
+    ``calls``, ``errors`` and ``total_seconds`` cover the whole process
+    lifetime; mean, percentiles and max are over the calls still in the
+    ring buffer (``window`` of them).
+    """
+    with _lock:
+        recent = list(_samples)
+        totals = {name: list(values) for name, values in _totals.items()}
+
+    durations = {}
+    for sample in recent:
+        durations.setdefault(sample.name, []).append(sample.seconds)
+
+    rows = []
+    for name, (calls, errors, seconds) in totals.items():
+        values = sorted(durations.get(name, []))
+        row = {'operation': name, 'calls': calls, 'errors': errors, 'total_seconds': seconds,
+               'window': len(values)}
+        if values:
+            row['mean'] = sum(values) / len(values)
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}"] = percentile(values, q)
+            row['max'] = values[-1]
+        rows.append(row)
+    rows.sort(key=lambda row: row.get('p95', 0), reverse=True)
+    return rows
+
+
+def slowest(count=20):
+    """The slowest individual calls in the ring buffer"""
+    return sorted(samples(), key=lambda sample: sample.seconds, reverse=True)[:count]
+
+
+# Prometheus
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """All operations in the Prometheus text exposition format"""
+    rows = summary()
+    rows.sort(key=lambda row: row['operation'])
+    lines = [
+        f"# HELP {METRIC_PREFIX}_duration_seconds Duration of instrumented operations "
+        f"(quantiles over the last {RING_SIZE} calls)",
+        f"# TYPE {METRIC_PREFIX}_duration_seconds summary",
+    ]
+    for row in rows:
+        label = f'operation="{_label(row["operation"])}"'
+        for q in QUANTILES:
+            key = f"p{int(q * 100)}"
+            if key in row:
+                lines.append(f'{METRIC_PREFIX}_duration_seconds{{{label},quantile="{q}"}} {row[key]:.6f}')
+        lines.append(f"{METRIC_PREFIX}_duration_seconds_sum{{{label}}} {row['total_seconds']:.6f}")
+        lines.append(f"{METRIC_PREFIX}_duration_seconds_count{{{label}}} {row['calls']}")
+
+    lines.append(f"# HELP {METRIC_PREFIX}_errors_total Calls that raised an exception")
+    lines.append(f"# TYPE {METRIC_PREFIX}_errors_total counter")
+    for row in rows:
+        lines.append(f'{METRIC_PREFIX}_errors_total{{operation="{_label(row["operation"])}"}} {row["errors"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path):
+    """Write prometheus_text() atomically (the collector must never see half a file)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".prom", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_textfile_export(path, interval=15):
+    """Rewrite ``path`` every ``interval`` seconds on a daemon thread (once per process)"""
+    global _exporter
+
+    def run():
+        while True:
+            try:
+                write_prometheus_file(path)
+            except OSError as e:
+                log.warning("Could not write metrics: %s", e, extra={'path': path})
+            time.sleep(interval)
+
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=run, name="perf-textfile-export", daemon=True)
+            _exporter.start()
+    return _exporter
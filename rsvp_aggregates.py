@@ -0,0 +1,78 @@
+"""Running totals over the RSVPs for the admin dashboards.
+
+The summary and menu pages only need a handful of numbers: how many rows
+per attending status, how often each food preference / course was chosen
+and how many guests left dietary notes. RSVPAggregates keeps those counts
+and is updated with the new rows whenever a submission is appended, so the
+dashboards don't have to filter and count the whole RSVP table on every
+view. A full rewrite (admin edits) or a change made outside the app
+rebuilds the counts from scratch; utils.get_rsvp_aggregates takes care of
+that by comparing the storage file signature.
+
+Counts are kept per raw ``attending`` value ('Ja', 'No', older 'Yes'
+rows), so each page can keep filtering on the value it always used.
+"""
+import threading
+
+from rsvp_schema import is_blank as _is_blank
+
+# Columns whose values are counted per attending status
+COUNTED_COLUMNS = ['essenspräferenz', 'starter_choice', 'main_choice', 'dessert_choice']
+
+
+class RSVPAggregates:
+    """Counts over all RSVP rows, kept up to date incrementally"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Signature of the stored data these counts belong to (None = unknown)
+        self.signature = None
+        self._reset()
+
+    def _reset(self):
+        self.total_rows = 0
+        self._rows_by_status = {}  # attending -> row count
+        self._counts = {}  # (attending, column) -> {value: count}
+        self._dietary = {}  # attending -> rows with dietary notes
+
+    def add_rows(self, rows):
+        """Count newly stored rows (dicts of column -> value)"""
+        with self.lock:
+            for row in rows:
+                status = row.get('attending')
+                status = None if _is_blank(status) else status
+                self.total_rows += 1
+                self._rows_by_status[status] = self._rows_by_status.get(status, 0) + 1
+
+                for column in COUNTED_COLUMNS:
+                    value = row.get(column)
+                    if not _is_blank(value):
+                        counts = self._counts.setdefault((status, column), {})
+                        counts[value] = counts.get(value, 0) + 1
+
+                if not _is_blank(row.get('dietary_requirements')):
+                    self._dietary[status] = self._dietary.get(status, 0) + 1
+
+    def rebuild(self, df, signature=None):
+        """Recount everything from a full RSVP dataframe"""
+        with self.lock:
+            self._reset()
+            if not df.empty:
+                self.add_rows(df.to_dict('records'))
+            self.signature = signature
+
+    def row_count(self, status):
+        """Number of rows with the given attending value"""
+        with self.lock:
+            return self._rows_by_status.get(status, 0)
+
+    def value_counts(self, status, column):
+        """{value: count} of a counted column among rows with the given status, most frequent first"""
+        with self.lock:
+            counts = dict(self._counts.get((status, column), {}))
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+    def dietary_count(self, status):
+        """Number of rows with the given status that have dietary notes"""
+        with self.lock:
+            return self._dietary.get(status, 0)
@@ -0,0 +1,92 @@
+"""Row-level changes from the admin data editor.
+
+Instead of writing back the whole table the admin had on screen (which
+would drop RSVPs submitted in the meantime), the edited cells are turned
+into a changeset: per row its position, the values the admin saw and the
+new values. The changeset is applied to the current stored data while
+holding the storage lock.
+
+A change is only applied if the row still holds what the admin saw: the
+identifying columns and the edited cells must be unchanged. Otherwise the
+row was modified (or the table rewritten) by someone else, and the change
+is reported back as a conflict instead of overwriting it.
+"""
+from rsvp_schema import is_blank as _is_blank
+
+# Columns that tell whether the row at a position is still the same RSVP
+IDENTITY_COLUMNS = ['timestamp', 'contact_email', 'guest_first_name', 'guest_last_name']
+
+
+def _plain(value):
+    """Plain Python value (numpy scalars -> Python, NaN -> None)"""
+    if _is_blank(value):
+        return None
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def same_value(a, b):
+    """Compare cell values the way they round-trip through the CSV"""
+    if _is_blank(a) or _is_blank(b):
+        return _is_blank(a) and _is_blank(b)
+    return str(_plain(a)) == str(_plain(b))
+
+
+def build_changeset(df, view_df, edited_rows):
+    """Changeset from st.data_editor's ``edited_rows`` state
+
+    ``view_df`` is what the editor showed (possibly a filtered part of
+    ``df``, keeping df's index); edited_rows maps a row position in view_df
+    to {column: new value}.
+    """
+    changeset = []
+    for view_position, edits in edited_rows.items():
+        label = view_df.index[int(view_position)]
+        base_row = df.loc[label]
+        changes = {
+            col: _plain(value) for col, value in edits.items()
+            if col in df.columns and not same_value(base_row[col], value)
+        }
+        if not changes:
+            continue
+        base_columns = [c for c in IDENTITY_COLUMNS if c in df.columns]
+        base_columns += [c for c in changes if c not in base_columns]
+        changeset.append({
+            'position': df.index.get_loc(label),
+            'base': {col: _plain(base_row[col]) for col in base_columns},
+            'changes': changes,
+        })
+    return changeset
+
+
+def conflicting_columns(current_row, change):
+    """Columns whose stored value differs from what the admin saw (empty list = no conflict)"""
+    if current_row is None:
+        return list(change['base'])
+    return [col for col, value in change['base'].items() if not same_value(current_row.get(col), value)]
+
+
+def apply_changeset(df, changeset):
+    """Apply a changeset to the current RSVP dataframe in place
+
+    Returns (number of rows changed, conflicts), where each conflict is the
+    change that was skipped plus the ``columns`` that differed.
+    """
+    applied = 0
+    conflicts = []
+    for change in changeset:
+        position = change['position']
+        current_row = df.iloc[position].to_dict() if position < len(df) else None
+        columns = conflicting_columns(current_row, change)
+        if columns:
+            conflicts.append(dict(change, columns=columns))
+            continue
+
+        for col, value in change['changes'].items():
+            # Text into an all-empty (float) column would upcast with a warning
+            if df[col].dtype != object:
+                df[col] = df[col].astype(object)
+            df.iat[position, df.columns.get_loc(col)] = value
+        applied += 1
+    return applied, conflicts
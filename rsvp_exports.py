@@ -0,0 +1,111 @@
+"""Download files for the admin data page.
+
+Exports are only built when an admin actually clicks a download button
+(st.download_button accepts a callable), and utils.get_rsvp_export caches
+the result until the RSVP data changes, so page renders don't serialize the
+whole table.
+
+Excel needs openpyxl (in requirements.txt) or xlsxwriter and Parquet needs
+pyarrow; formats whose library isn't installed are simply not offered.
+"""
+import importlib.util
+import io
+
+# Values of the attending column that mean "coming" (the form writes 'Ja', older rows 'Yes')
+ATTENDING_VALUES = ('Ja', 'Yes')
+
+PREFERENCES = ["Keine", "Vegetarisch", "Vegan"]
+COURSE_COLUMNS = ['starter_choice', 'main_choice', 'dessert_choice']
+
+
+def _has_module(name):
+    return importlib.util.find_spec(name) is not None
+
+
+def attending_rows(df):
+    if df.empty or 'attending' not in df.columns:
+        return df
+    return df[df['attending'].isin(ATTENDING_VALUES)]
+
+
+def csv_bytes(df):
+    """UTF-8 CSV of a dataframe"""
+    return df.to_csv(index=False, lineterminator="\n").encode("utf-8")
+
+
+def xlsx_bytes(df):
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    engine = "openpyxl" if _has_module("openpyxl") else "xlsxwriter"
+    with pd.ExcelWriter(buffer, engine=engine) as writer:
+        df.to_excel(writer, index=False, sheet_name="RSVPs")
+    return buffer.getvalue()
+
+
+def parquet_bytes(df):
+    buffer = io.BytesIO()
+    # Mixed columns (text plus NaN for empty cells) are stored as strings
+    df.astype({col: "string" for col in df.columns if df[col].dtype == object}).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def catering_sheet(df):
+    """One line per party (contact) with guest count, food choices and dietary notes, plus a total"""
+    import pandas as pd
+
+    guests = attending_rows(df)
+    if guests.empty:
+        return pd.DataFrame(columns=['Kontaktperson', 'E-Mail', 'Gäste'])
+
+    records = []
+    for (contact, email), party in guests.groupby(['contact_name', 'contact_email'], sort=True, dropna=False):
+        names = (party['guest_first_name'].fillna('') + ' ' + party['guest_last_name'].fillna('')).str.strip()
+        record = {'Kontaktperson': contact, 'E-Mail': email, 'Gäste': len(party), 'Namen': ', '.join(names)}
+        if 'essenspräferenz' in party.columns:
+            counts = party['essenspräferenz'].value_counts()
+            for preference in PREFERENCES:
+                record[preference] = int(counts.get(preference, 0))
+        for column in COURSE_COLUMNS:
+            if column in party.columns:
+                counts = party[column].dropna().value_counts()
+                record[column] = ', '.join(f"{count}x {choice}" for choice, count in counts.items() if count and choice)
+        if 'dietary_requirements' in party.columns:
+            notes = party['dietary_requirements'].dropna().astype(str).str.strip()
+            record['Unverträglichkeiten/Allergien'] = '; '.join(note for note in notes if note)
+        records.append(record)
+
+    sheet = pd.DataFrame(records)
+    totals = {'Kontaktperson': 'Gesamt', 'Gäste': int(sheet['Gäste'].sum())}
+    for preference in PREFERENCES:
+        if preference in sheet.columns:
+            totals[preference] = int(sheet[preference].sum())
+    return pd.concat([sheet, pd.DataFrame([totals])], ignore_index=True)
+
+
+# kind -> (button label, file name part, extension, mime type, builder, modules (any of them) it needs)
+EXPORTS = {
+    'all_csv': (":material/description: Download All Data (CSV)", "all", "csv", "text/csv",
+                csv_bytes, None),
+    'attending_csv': (":material/check_circle: Download Attending Only (CSV)", "attending", "csv", "text/csv",
+                      lambda df: csv_bytes(attending_rows(df)), None),
+    'all_xlsx': (":material/table_chart: Download All Data (Excel)", "all", "xlsx",
+                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", xlsx_bytes, ("openpyxl", "xlsxwriter")),
+    'all_parquet': (":material/database: Download All Data (Parquet)", "all", "parquet", "application/vnd.apache.parquet",
+                    parquet_bytes, ("pyarrow",)),
+    'catering_csv': (":material/restaurant: Download Catering Sheet (CSV)", "catering", "csv", "text/csv",
+                     lambda df: csv_bytes(catering_sheet(df)), None),
+}
+
+
+def available_exports():
+    """Export kinds whose libraries are installed"""
+    return [
+        kind for kind, (*_, modules) in EXPORTS.items()
+        if modules is None or any(_has_module(module) for module in modules)
+    ]
+
+
+def build_export(kind, df):
+    """File contents for an export kind"""
+    return EXPORTS[kind][4](df)
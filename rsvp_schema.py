@@ -0,0 +1,109 @@
+"""Column types for the RSVP table.
+
+Read as-is, every RSVP column is an object column of Python strings and
+timestamps stay text. RSVP frames are loaded with explicit dtypes instead:
+
+* ``timestamp``: datetime64
+* status, food preference and course columns: categorical (a handful of
+  distinct values repeated on every row)
+* everything else: string, backed by pyarrow when it's installed (it comes
+  with Streamlit) and pandas' own string dtype otherwise
+
+With pyarrow the CSV is also parsed by pyarrow's reader, which is several
+times faster than pandas' own parser on large files.
+
+Empty cells are <NA>/NaT. bench/bench_rsvp_schema.py compares memory and
+parse time with the untyped loader.
+
+The typed frame is for aggregates, search and exports. The admin data
+editor gets editable_rsvps() instead: st.data_editor would turn categorical
+columns into select boxes limited to the existing values and datetime
+columns into date pickers.
+"""
+import importlib.util
+
+import storage
+
+# Only check that pyarrow is there: importing it (and numpy) is left to the
+# functions that read RSVPs, the guest pages don't need it
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+TEXT_DTYPE = "string[pyarrow]" if HAVE_PYARROW else "string"
+
+CATEGORY_COLUMNS = ['attending', 'essenspräferenz', 'starter_choice', 'main_choice', 'dessert_choice']
+DATETIME_COLUMNS = ['timestamp']
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # as app.py stores it
+
+
+def is_blank(value):
+    """Empty cell: None, NaN, NaT, <NA> or an empty/whitespace string"""
+    if value is None:
+        return True
+    try:
+        if value != value:  # NaN, NaT
+            return True
+    except TypeError:  # <NA> can't be used as a bool
+        return True
+    return isinstance(value, str) and value.strip() == ''
+
+
+def typed_rsvps(df):
+    """Convert an RSVP dataframe to the schema's dtypes (returns a new frame)"""
+    import pandas as pd
+
+    if df.empty:
+        return df
+    columns = {}
+    for col in df.columns:
+        if col in DATETIME_COLUMNS:
+            columns[col] = pd.to_datetime(df[col], errors='coerce', format='ISO8601')
+        elif col in CATEGORY_COLUMNS:
+            columns[col] = df[col].astype(TEXT_DTYPE).astype('category')
+        else:
+            columns[col] = df[col].astype(TEXT_DTYPE)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def editable_rsvps(df):
+    """Plain text columns for st.data_editor, so every cell can be typed freely
+
+    Timestamps are formatted back the way they are stored, empty cells
+    become None. The index is kept for build_changeset.
+    """
+    import pandas as pd
+
+    if df.empty:
+        return df
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in DATETIME_COLUMNS and pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime(TIMESTAMP_FORMAT)
+        columns[col] = values.astype(object).where(values.notna(), None)
+    return pd.DataFrame(columns, index=df.index)
+
+
+def read_rsvps_csv(path):
+    """Read the RSVP CSV straight into the schema's dtypes"""
+    import pandas as pd
+
+    if not HAVE_PYARROW:
+        # Everything as text first (keeps phone numbers' leading zeros), then narrow down
+        df = pd.read_csv(path, dtype=TEXT_DTYPE, keep_default_na=False, na_values=[''])
+        return typed_rsvps(df)
+
+    import pyarrow
+    from pyarrow import csv as pyarrow_csv
+
+    # pyarrow's multithreaded reader; every column is read as text for the same reason.
+    # Comments may contain line breaks, hence newlines_in_values.
+    table = pyarrow_csv.read_csv(
+        path,
+        parse_options=pyarrow_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pyarrow_csv.ConvertOptions(
+            column_types={col: pyarrow.string() for col in storage.read_header(path) or []},
+            null_values=[''],
+            strings_can_be_null=True
+        )
+    )
+    df = table.to_pandas(types_mapper={pyarrow.string(): pd.StringDtype("pyarrow")}.get)
+    return typed_rsvps(df)
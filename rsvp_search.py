@@ -0,0 +1,153 @@
+"""Search index over the RSVP names for the admin data page.
+
+Names are normalized before indexing: lowercased, umlauts folded
+(ä -> ae, ö -> oe, ü -> ue, ß -> ss) and other accents dropped, then split
+into tokens. A token written with an umlaut is also indexed with the bare
+vowel, so "Müller" is found by "Mueller", "Müller" and "Muller", and a
+query "Müller" finds all three spellings. A plain "ae/oe/ue" is left
+alone: it can't be told apart from the vowels in "Joel" or "Manuel", which
+must not turn into "Jol" and "Manul".
+
+A query term matches a token that contains it. Terms of three or more
+characters are looked up through a trigram index, shorter ones by prefix
+in a sorted token list; if a term matches nothing, tokens sharing most of
+its trigrams are taken instead ("Mülller" still finds "Müller"). All terms
+of a query have to match for a row to be returned.
+
+Rows are identified by their position in the RSVP table. Appended rows
+are added incrementally (see utils.save_rsvp_batch); anything else
+rebuilds the index.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+
+from rsvp_schema import is_blank
+
+# Columns that are searched
+SEARCH_COLUMNS = ['contact_name', 'guest_first_name', 'guest_last_name']
+
+# Share of trigrams a token needs to have in common with a term to count as a fuzzy match
+FUZZY_THRESHOLD = 0.6
+
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+_BARE_UMLAUTS = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def _strip_accents(text):
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def _spellings(text):
+    """Tokens of a text, each as the set of its spellings (ü -> ue, and ü -> u if it had an umlaut)"""
+    text = unicodedata.normalize('NFC', str(text)).lower()
+    folded = _TOKEN.findall(_strip_accents(text.translate(_UMLAUTS)))
+    bare = _TOKEN.findall(_strip_accents(text.translate(_BARE_UMLAUTS)))
+    # Both translations only replace letters with letters, so the tokens line up
+    return [{token, bare_token} for token, bare_token in zip(folded, bare)]
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class RSVPSearchIndex:
+    """Token and trigram index mapping normalized names to row positions"""
+
+    def __init__(self, columns=SEARCH_COLUMNS):
+        self.columns = columns
+        self.lock = threading.RLock()
+        # Signature of the stored data this index belongs to (None = unknown)
+        self.signature = None
+        self._reset()
+
+    def _reset(self):
+        self.row_count = 0
+        self._postings = {}  # token -> set of row positions
+        self._sorted_tokens = []  # for prefix lookups
+        self._trigram_tokens = {}  # trigram -> set of tokens
+
+    def _add_token(self, token, row):
+        rows = self._postings.get(token)
+        if rows is not None:
+            rows.add(row)
+            return
+        self._postings[token] = {row}
+        bisect.insort(self._sorted_tokens, token)
+        for trigram in _trigrams(token):
+            self._trigram_tokens.setdefault(trigram, set()).add(token)
+
+    def add_rows(self, rows):
+        """Index newly appended rows (dicts of column -> value)"""
+        with self.lock:
+            for row in rows:
+                for column in self.columns:
+                    value = row.get(column)
+                    if is_blank(value):
+                        continue
+                    for spellings in _spellings(value):
+                        for token in spellings:
+                            self._add_token(token, self.row_count)
+                self.row_count += 1
+
+    def rebuild(self, df, signature=None):
+        """Re-index a full RSVP dataframe"""
+        with self.lock:
+            self._reset()
+            if not df.empty:
+                columns = [c for c in self.columns if c in df.columns]
+                self.add_rows(df[columns].to_dict('records'))
+            self.signature = signature
+
+    def _matching_tokens(self, term):
+        """Tokens containing the term (or starting with it, for short terms)"""
+        if len(term) < 3:
+            start = bisect.bisect_left(self._sorted_tokens, term)
+            end = bisect.bisect_left(self._sorted_tokens, term + '\uffff')
+            return self._sorted_tokens[start:end]
+
+        postings = sorted((self._trigram_tokens.get(t, set()) for t in _trigrams(term)), key=len)
+        candidates = set.intersection(*postings) if postings[0] else set()
+        return [token for token in candidates if term in token]
+
+    def _fuzzy_tokens(self, term):
+        """Tokens sharing most of the term's trigrams"""
+        term_trigrams = _trigrams(term)
+        shared = {}
+        for trigram in term_trigrams:
+            for token in self._trigram_tokens.get(trigram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        return [
+            token for token, count in shared.items()
+            if count / max(len(term_trigrams), len(token) - 2) >= FUZZY_THRESHOLD
+        ]
+
+    def _rows_for_term(self, spellings):
+        tokens = set()
+        for term in spellings:
+            tokens.update(self._matching_tokens(term))
+        if not tokens:
+            for term in spellings:
+                if len(term) >= 3:
+                    tokens.update(self._fuzzy_tokens(term))
+
+        rows = set()
+        for token in tokens:
+            rows |= self._postings[token]
+        return rows
+
+    def search(self, query):
+        """Sorted positions of the rows matching every term of the query"""
+        terms = _spellings(query)
+        if not terms:
+            return []
+        with self.lock:
+            # Rarest term first, so the intersection shrinks quickly
+            results = sorted((self._rows_for_term(spellings) for spellings in terms), key=len)
+        rows = results[0]
+        for other in results[1:]:
+            rows = rows & other
+        return sorted(rows)
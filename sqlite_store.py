@@ -0,0 +1,480 @@
+"""SQLite storage backend for RSVPs and the gift registry.
+
+Enabled with ``backend = "sqlite"`` in the ``[files]`` section of
+secrets.toml. The database runs in WAL mode so page renders can read while
+a guest submission or gift purchase is being written, and gift purchases
+are plain indexed UPDATEs instead of a rewrite of the whole registry.
+
+Existing CSV data can be imported once with:
+
+    python sqlite_store.py migrate --db wedding.db --rsvps wedding_rsvps.csv --gifts gift_registry.csv
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import storage
+from rsvp_edits import conflicting_columns
+
+# Columns every RSVP table has (others are added on demand, like the CSV header)
+RSVP_BASE_COLUMNS = [
+    'timestamp', 'contact_name', 'contact_email', 'contact_phone', 'attending',
+    'guest_first_name', 'guest_last_name', 'essenspräferenz',
+    'dietary_requirements', 'comments'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rsvps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {rsvp_columns}
+);
+CREATE INDEX IF NOT EXISTS idx_rsvps_contact_email ON rsvps (contact_email);
+CREATE INDEX IF NOT EXISTS idx_rsvps_attending ON rsvps (attending);
+
+CREATE TABLE IF NOT EXISTS gifts (
+    id INTEGER PRIMARY KEY,
+    gift_id TEXT,
+    name TEXT,
+    description TEXT,
+    url TEXT,
+    image_url TEXT,
+    purchased INTEGER NOT NULL DEFAULT 0,
+    session_id TEXT,
+    quantity_total INTEGER NOT NULL DEFAULT 1,
+    quantity_purchased INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS gift_purchases (
+    gift_id INTEGER NOT NULL REFERENCES gifts (id) ON DELETE CASCADE,
+    user_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (gift_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_gift_purchases_user_id ON gift_purchases (user_id);
+""".format(rsvp_columns=",\n    ".join(f'"{col}" TEXT' for col in RSVP_BASE_COLUMNS))
+
+# Idle connections per database file. Streamlit runs every script run on a
+# new thread, so connections are borrowed for one call and returned instead
+# of being kept per thread.
+MAX_IDLE_CONNECTIONS = 8
+_idle_connections = {}
+_idle_guard = threading.Lock()
+# Database files whose schema has been set up by this process
+_schema_ready = set()
+_schema_guard = threading.Lock()
+
+
+def _quote(name):
+    """Quote a column name for use in SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _open(db_path):
+    conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _ensure_schema(conn, key):
+    """Create and upgrade the schema, once per process and database file"""
+    if key in _schema_ready:
+        return
+    with _schema_guard:
+        if key not in _schema_ready:
+            conn.executescript(SCHEMA)
+            _upgrade_schema(conn)
+            _schema_ready.add(key)
+
+
+@contextmanager
+def connect(db_path):
+    """Borrow a connection to the database for the block (one thread at a time)"""
+    key = os.path.abspath(db_path)
+    with _idle_guard:
+        idle = _idle_connections.setdefault(key, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _open(db_path)
+
+    try:
+        _ensure_schema(conn, key)
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        with _idle_guard:
+            idle = _idle_connections[key]
+            if len(idle) < MAX_IDLE_CONNECTIONS:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+def _upgrade_schema(conn):
+    """Bring databases created by older versions up to date"""
+    gift_columns = [row['name'] for row in conn.execute("PRAGMA table_info(gifts)")]
+    if 'gift_id' not in gift_columns:
+        conn.execute("ALTER TABLE gifts ADD COLUMN gift_id TEXT")
+    # Stable ids for gifts stored before ids existed
+    for row in conn.execute("SELECT id FROM gifts WHERE gift_id IS NULL OR gift_id = ''").fetchall():
+        conn.execute("UPDATE gifts SET gift_id = ? WHERE id = ?", (storage.new_gift_id(), row['id']))
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_gifts_gift_id ON gifts (gift_id)")
+
+
+class _transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+def _clean(value):
+    """Convert a dataframe/CSV value to something sqlite3 can store (NaN -> NULL)"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    return value
+
+
+# RSVPs
+
+def _rsvp_columns(conn):
+    """Data columns of the rsvps table in table order"""
+    return [row['name'] for row in conn.execute("PRAGMA table_info(rsvps)") if row['name'] != 'id']
+
+
+def _ensure_rsvp_columns(conn, columns):
+    """Add any columns the table doesn't have yet"""
+    existing = _rsvp_columns(conn)
+    for col in columns:
+        if col not in existing:
+            conn.execute(f"ALTER TABLE rsvps ADD COLUMN {_quote(col)} TEXT")
+            existing.append(col)
+
+
+def _insert_rsvps(conn, rows):
+    """Insert RSVP rows (dicts) inside an open transaction"""
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    _ensure_rsvp_columns(conn, columns)
+
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO rsvps ({', '.join(_quote(c) for c in columns)}) VALUES ({placeholders})"
+    conn.executemany(sql, [
+        [None if _clean(row.get(col)) is None else str(_clean(row.get(col))) for col in columns]
+        for row in rows
+    ])
+
+
+def load_rsvps(db_path):
+    """Load all RSVPs as a dataframe in submission order"""
+    import pandas as pd
+
+    with connect(db_path) as conn:
+        columns = _rsvp_columns(conn)
+        rows = conn.execute(f"SELECT {', '.join(_quote(c) for c in columns)} FROM rsvps ORDER BY id").fetchall()
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame([tuple(row) for row in rows], columns=columns)
+    # Drop added columns that no row uses, to match what the CSV would contain
+    return df[[c for c in columns if c in RSVP_BASE_COLUMNS or df[c].notna().any()]]
+
+
+def append_rsvps(db_path, rows):
+    """Insert RSVP rows in a single transaction (all or nothing)"""
+    if not rows:
+        return
+    with connect(db_path) as conn, _transaction(conn):
+        _insert_rsvps(conn, rows)
+
+
+def replace_rsvps(db_path, df):
+    """Replace all RSVPs with the contents of a dataframe (admin edits)"""
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    with connect(db_path) as conn, _transaction(conn):
+        conn.execute("DELETE FROM rsvps")
+        _ensure_rsvp_columns(conn, list(df.columns))
+        if records:
+            _insert_rsvps(conn, records)
+
+
+def update_rsvps(db_path, changeset):
+    """Apply row-level admin edits (see rsvp_edits) in one transaction
+
+    Rows are addressed by their position in submission order, like in
+    load_rsvps. Returns (number of rows changed, conflicts).
+    """
+    applied = 0
+    conflicts = []
+    with connect(db_path) as conn, _transaction(conn):
+        ids = [row['id'] for row in conn.execute("SELECT id FROM rsvps ORDER BY id")]
+        for change in changeset:
+            position = change['position']
+            row = None
+            if position < len(ids):
+                row = conn.execute("SELECT * FROM rsvps WHERE id = ?", (ids[position],)).fetchone()
+            columns = conflicting_columns(dict(row) if row is not None else None, change)
+            if columns:
+                conflicts.append(dict(change, columns=columns))
+                continue
+
+            changes = change['changes']
+            _ensure_rsvp_columns(conn, list(changes))
+            assignments = ", ".join(f"{_quote(col)} = ?" for col in changes)
+            conn.execute(
+                f"UPDATE rsvps SET {assignments} WHERE id = ?",
+                [None if _clean(v) is None else str(_clean(v)) for v in changes.values()] + [ids[position]]
+            )
+            applied += 1
+    return applied, conflicts
+
+
+# Gift registry
+#
+# Gifts are addressed by their stable gift_id; the integer id is internal
+# (insertion order, target of gift_purchases.gift_id).
+
+def load_gift_registry_rows(db_path):
+    """Load the gift registry as a list of dicts with the CSV's columns (no pandas)"""
+    with connect(db_path) as conn:
+        purchase_rows = conn.execute(
+            "SELECT gift_id, user_id, quantity FROM gift_purchases ORDER BY gift_id, seq"
+        ).fetchall()
+        gift_rows = conn.execute("SELECT * FROM gifts ORDER BY id").fetchall()
+
+    purchases = {}
+    for row in purchase_rows:
+        purchases.setdefault(row['gift_id'], []).append({'user_id': row['user_id'], 'quantity': row['quantity']})
+
+    records = []
+    for row in gift_rows:
+        record = dict(row)
+        record['purchased'] = bool(record['purchased'])
+        record['session_id'] = record['session_id'] or ''
+        record['purchase_details'] = json.dumps(purchases.get(record.pop('id'), []))
+        record['id'] = record.pop('gift_id')
+        records.append(record)
+    return records
+
+
+def load_gift_registry(db_path):
+    """Load the gift registry as a dataframe indexed by gift id, with the CSV's columns"""
+    import pandas as pd
+
+    df = pd.DataFrame(load_gift_registry_rows(db_path), columns=storage.GIFT_COLUMNS)
+    df.index = df['id'].tolist()
+    return df
+
+
+def _insert_gift(conn, record):
+    """Insert one gift record (dict with the CSV's columns) and its purchases"""
+    cursor = conn.execute(
+        "INSERT INTO gifts (gift_id, name, description, url, image_url, purchased, session_id, "
+        "quantity_total, quantity_purchased) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            _clean(record.get('id')) or storage.new_gift_id(),
+            _clean(record.get('name')),
+            _clean(record.get('description')),
+            _clean(record.get('url')),
+            _clean(record.get('image_url')),
+            int(bool(_clean(record.get('purchased')))),
+            _clean(record.get('session_id')) or '',
+            int(_clean(record.get('quantity_total')) or 1),
+            int(_clean(record.get('quantity_purchased')) or 0),
+        )
+    )
+    try:
+        details = json.loads(record.get('purchase_details') or '[]')
+    except (TypeError, ValueError):
+        details = []
+    for seq, purchase in enumerate(details):
+        conn.execute(
+            "INSERT INTO gift_purchases (gift_id, user_id, quantity, seq) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (gift_id, user_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+            (cursor.lastrowid, purchase['user_id'], int(purchase['quantity']), seq)
+        )
+
+
+def save_gift_registry(db_path, df):
+    """Replace the whole gift registry with a dataframe (gift ids are kept)"""
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    with connect(db_path) as conn, _transaction(conn):
+        conn.execute("DELETE FROM gift_purchases")
+        conn.execute("DELETE FROM gifts")
+        for record in records:
+            _insert_gift(conn, record)
+
+
+def add_gift(db_path, gift):
+    """Add a new gift (dict of editable columns); returns its id"""
+    record = {col: gift[col] for col in storage.GIFT_COLUMNS if col in gift}
+    record['id'] = storage.new_gift_id()
+    record.update(purchased=False, session_id='', quantity_purchased=0, purchase_details='[]')
+    with connect(db_path) as conn, _transaction(conn):
+        _insert_gift(conn, record)
+    return record['id']
+
+
+def update_gift(db_path, gift_id, changes):
+    """Update the editable columns of one gift, keeping its purchases"""
+    columns = [col for col in changes if col in ('name', 'description', 'url', 'image_url', 'quantity_total')]
+    with connect(db_path) as conn, _transaction(conn):
+        if columns:
+            assignments = ", ".join(f"{col} = ?" for col in columns)
+            conn.execute(
+                f"UPDATE gifts SET {assignments} WHERE gift_id = ?",
+                [_clean(changes[col]) for col in columns] + [gift_id]
+            )
+        updated = conn.execute(
+            "UPDATE gifts SET purchased = (quantity_purchased >= quantity_total) WHERE gift_id = ?", (gift_id,)
+        ).rowcount
+    return updated == 1
+
+
+def delete_gift(db_path, gift_id):
+    """Delete one gift and its purchase records"""
+    with connect(db_path) as conn, _transaction(conn):
+        deleted = conn.execute("DELETE FROM gifts WHERE gift_id = ?", (gift_id,)).rowcount
+    return deleted == 1
+
+
+def mark_gift_as_purchased(db_path, gift_id, user_id, quantity=1):
+    """Record a purchase of up to ``quantity`` items; returns False if nothing is left"""
+    with connect(db_path) as conn, _transaction(conn):
+        gift = conn.execute(
+            "SELECT id, quantity_total, quantity_purchased FROM gifts WHERE gift_id = ?", (gift_id,)
+        ).fetchone()
+        if gift is None:
+            return False
+
+        # Don't allow purchasing more than available
+        quantity = min(quantity, gift['quantity_total'] - gift['quantity_purchased'])
+        if quantity <= 0:
+            return False
+
+        # Compare-and-swap: only applies if the stock is still what we read
+        updated = conn.execute(
+            "UPDATE gifts SET quantity_purchased = quantity_purchased + ?, "
+            "purchased = (quantity_purchased + ? >= quantity_total), session_id = ? "
+            "WHERE id = ? AND quantity_purchased = ? AND quantity_purchased + ? <= quantity_total",
+            (quantity, quantity, user_id, gift['id'], gift['quantity_purchased'], quantity)
+        ).rowcount
+        if updated != 1:
+            return False
+
+        conn.execute(
+            "INSERT INTO gift_purchases (gift_id, user_id, quantity, seq) "
+            "VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), -1) + 1 FROM gift_purchases WHERE gift_id = ?)) "
+            "ON CONFLICT (gift_id, user_id) DO UPDATE SET quantity = quantity + excluded.quantity",
+            (gift['id'], user_id, quantity, gift['id'])
+        )
+    return True
+
+
+def unmark_gift_as_purchased(db_path, gift_id, user_id, quantity=None):
+    """Remove a user's purchases of a gift (all of them if quantity is None)"""
+    with connect(db_path) as conn, _transaction(conn):
+        purchase = conn.execute(
+            "SELECT p.gift_id, p.quantity FROM gift_purchases p JOIN gifts g ON g.id = p.gift_id "
+            "WHERE g.gift_id = ? AND p.user_id = ?", (gift_id, user_id)
+        ).fetchone()
+        if purchase is None:
+            return False
+        row_id = purchase['gift_id']
+
+        qty_to_remove = purchase['quantity'] if quantity is None else min(quantity, purchase['quantity'])
+        if qty_to_remove >= purchase['quantity']:
+            conn.execute("DELETE FROM gift_purchases WHERE gift_id = ? AND user_id = ?", (row_id, user_id))
+        else:
+            conn.execute(
+                "UPDATE gift_purchases SET quantity = quantity - ? WHERE gift_id = ? AND user_id = ?",
+                (qty_to_remove, row_id, user_id)
+            )
+
+        # Session id follows the last remaining purchaser
+        last = conn.execute(
+            "SELECT user_id FROM gift_purchases WHERE gift_id = ? ORDER BY seq DESC LIMIT 1", (row_id,)
+        ).fetchone()
+        conn.execute(
+            "UPDATE gifts SET quantity_purchased = quantity_purchased - ?, "
+            "purchased = (quantity_purchased - ? >= quantity_total), session_id = ? WHERE id = ?",
+            (qty_to_remove, qty_to_remove, last['user_id'] if last else '', row_id)
+        )
+    return True
+
+
+# One-shot migration from the CSV files
+
+def migrate_from_csv(db_path, rsvp_csv=None, gift_csv=None, force=False):
+    """Import existing CSV data into the database
+
+    Refuses to import into tables that already hold data unless ``force``
+    is set, in which case the tables are replaced. Returns the number of
+    (rsvps, gifts) imported.
+    """
+    import pandas as pd
+
+    with connect(db_path) as conn:
+        has_rsvps = conn.execute("SELECT 1 FROM rsvps LIMIT 1").fetchone() is not None
+        has_gifts = conn.execute("SELECT 1 FROM gifts LIMIT 1").fetchone() is not None
+    imported_rsvps = imported_gifts = 0
+
+    if rsvp_csv and os.path.exists(rsvp_csv):
+        if not force and has_rsvps:
+            raise RuntimeError("rsvps table is not empty (use --force to replace it)")
+        df = pd.read_csv(rsvp_csv, dtype={'contact_phone': str})
+        replace_rsvps(db_path, df)
+        imported_rsvps = len(df)
+
+    if gift_csv and os.path.exists(gift_csv):
+        if not force and has_gifts:
+            raise RuntimeError("gifts table is not empty (use --force to replace it)")
+        df = storage.read_gift_registry_csv(gift_csv)
+        save_gift_registry(db_path, df)
+        imported_gifts = len(df)
+
+    return imported_rsvps, imported_gifts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite storage backend tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="import the existing CSV files")
+    migrate.add_argument("--db", default="wedding.db")
+    migrate.add_argument("--rsvps", default="wedding_rsvps.csv")
+    migrate.add_argument("--gifts", default="gift_registry.csv")
+    migrate.add_argument("--force", action="store_true", help="replace tables that already contain data")
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        rsvps, gifts = migrate_from_csv(args.db, args.rsvps, args.gifts, force=args.force)
+        print(f"Imported {rsvps} RSVP rows and {gifts} gifts into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""File storage helpers for the RSVP and gift registry CSVs.
+
+Guest submissions are appended to the end of the file while holding an
+exclusive lock, so saving a response costs the same no matter how many
+RSVPs already exist. The whole file is only rewritten for admin edits (or
+when a row brings a column the file doesn't have yet), and rewrites go
+through a temp file + os.replace so readers never see a half-written file.
+A batch of rows (one party) is always stored completely or not at all.
+"""
+import csv
+import io
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows - fall back to in-process locking only
+    fcntl = None
+
+# In-process locks, one per file (flock alone doesn't cover Windows)
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+# Files whose lock the current thread already holds
+_held_locks = threading.local()
+
+
+def _get_thread_lock(path):
+    """Get the in-process lock for a file path"""
+    key = os.path.abspath(path)
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.Lock()
+        return _thread_locks[key]
+
+
+@contextmanager
+def file_lock(path, shared=False, lock_path=None):
+    """Lock a data file for the duration of the block
+
+    The lock is taken on a separate ``<path>.lock`` file so the data file
+    itself can be swapped out with os.replace while the lock is held.
+    ``lock_path`` puts that file somewhere else, e.g. when path's directory
+    is served to the browser. Nested calls from the same thread reuse the
+    lock already held.
+    """
+    key = os.path.abspath(path)
+    held = _held_locks.__dict__.setdefault('paths', set())
+    if key in held:
+        yield
+        return
+
+    with _get_thread_lock(path):
+        with open(lock_path or path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def read_header(path):
+    """Return the column names of a CSV file, or None if it has no header yet"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        try:
+            return next(csv.reader(f))
+        except StopIteration:
+            return None
+
+
+def _ends_with_newline(path):
+    """Check whether a non-empty file ends with a line break"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b"\n", b"\r")
+
+
+def _format_value(value):
+    """Convert a cell value to the text written to the CSV"""
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _atomic_write(path, write_fn):
+    """Write a file via a temp file in the same directory + os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".csv", dir=directory)
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _rewrite_with_columns(path, columns, new_rows):
+    """Rewrite the CSV with an extended header, keeping all existing rows"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        existing_rows = list(csv.DictReader(f))
+
+    def write(f):
+        writer = csv.DictWriter(f, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        for row in existing_rows:
+            writer.writerow(row)
+        for row in new_rows:
+            writer.writerow({col: _format_value(row.get(col)) for col in columns})
+
+    _atomic_write(path, write)
+
+
+def _append_atomically(path, header, rows):
+    """Append all rows with a single write, rolling back on failure
+
+    The rows are encoded up front and handed to one os.write call on an
+    O_APPEND descriptor, so a crashing process can't leave half a party
+    in the file. If the write fails or comes up short (e.g. disk full),
+    the file is truncated back to its previous size.
+    """
+    buffer = io.StringIO()
+    if not _ends_with_newline(path):
+        buffer.write("\n")
+    writer = csv.DictWriter(buffer, fieldnames=header, lineterminator="\n")
+    for row in rows:
+        writer.writerow({col: _format_value(row.get(col)) for col in header})
+    data = buffer.getvalue().encode("utf-8")
+
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        original_size = os.fstat(fd).st_size
+        try:
+            written = os.write(fd, data)
+            if written != len(data):
+                raise OSError(f"Short write to {path}: {written} of {len(data)} bytes")
+            os.fsync(fd)
+        except BaseException:
+            os.ftruncate(fd, original_size)
+            raise
+    finally:
+        os.close(fd)
+
+
+def append_rows(path, rows):
+    """Append RSVP rows (dicts) to the CSV file as one all-or-nothing write
+
+    Rows are written to the end of the file, so the cost doesn't depend on
+    the file size. Only when a row brings columns the file doesn't have yet
+    is the file rewritten with the extended header (via temp file, so that
+    path is atomic too).
+    """
+    if not rows:
+        return
+
+    with file_lock(path):
+        header = read_header(path)
+
+        if header is None:
+            # New file - header from the rows in insertion order
+            columns = []
+            for row in rows:
+                columns.extend(key for key in row if key not in columns)
+
+            def write(f):
+                writer = csv.DictWriter(f, fieldnames=columns, lineterminator="\n")
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow({col: _format_value(row.get(col)) for col in columns})
+
+            _atomic_write(path, write)
+            return
+
+        new_columns = []
+        for row in rows:
+            new_columns.extend(key for key in row if key not in header and key not in new_columns)
+
+        if new_columns:
+            _rewrite_with_columns(path, header + new_columns, rows)
+            return
+
+        _append_atomically(path, header, rows)
+
+
+def write_dataframe(path, df):
+    """Replace the whole CSV file with the contents of a dataframe"""
+    with file_lock(path):
+        _atomic_write(path, lambda f: df.to_csv(f, index=False, lineterminator="\n"))
+
+
+def update_dataframe(path, update_fn, **read_csv_kwargs):
+    """Read-modify-write a CSV file while holding its lock
+
+    ``update_fn`` gets the current dataframe, modifies it in place and
+    returns True if it should be written back. Rows appended meanwhile by
+    other sessions are part of what update_fn sees, so they're kept.
+    """
+    import pandas as pd
+
+    with file_lock(path):
+        df = pd.read_csv(path, **read_csv_kwargs)
+        changed = update_fn(df)
+        if changed:
+            _atomic_write(path, lambda f: df.to_csv(f, index=False, lineterminator="\n"))
+        return changed
+
+
+# Gift registry CSV (semicolon separated)
+GIFT_COLUMNS = ['id', 'name', 'description', 'url', 'image_url', 'purchased', 'session_id', 'quantity_total', 'quantity_purchased', 'purchase_details']
+
+
+def new_gift_id():
+    """Generate a new stable gift id"""
+    return 'gift_' + uuid.uuid4().hex[:10]
+
+
+def assign_gift_ids(df):
+    """Give every gift without a unique id a new one and index the frame by id
+
+    Afterwards ``df.at[gift_id, column]`` is a hash lookup. Returns True
+    if any ids were added (so the caller knows the file needs saving).
+    """
+    if 'id' not in df.columns:
+        df.insert(0, 'id', '')
+    ids = df['id'].fillna('').astype(str).str.strip()
+    missing = (ids == '') | ids.duplicated()
+    if missing.any():
+        ids[missing] = [new_gift_id() for _ in range(int(missing.sum()))]
+    df['id'] = ids
+    df.index = ids.tolist()
+    return bool(missing.any())
+
+
+def _parse_gift_registry_csv(path):
+    """Parse the gift registry CSV into a dataframe with all expected columns"""
+    import pandas as pd
+
+    if not os.path.exists(path):
+        df = pd.DataFrame(columns=GIFT_COLUMNS)
+        assign_gift_ids(df)
+        return df
+
+    df = pd.read_csv(
+        path,
+        sep=';',
+        quotechar='"',
+        doublequote=True,
+        encoding='utf-8',
+        dtype={'id': str}
+    )
+    # Empty links come back as NaN (a float column if no gift has one), which
+    # the wishlist cards can't strip() and which refuses the first purchase's
+    # session id; keep them as empty strings
+    for col in ('url', 'image_url', 'session_id'):
+        if col in df.columns:
+            df[col] = df[col].fillna('').astype(str)
+    # Ensure purchased column is boolean
+    df['purchased'] = df['purchased'].astype(bool)
+
+    # Convert literal \n to actual line breaks in text columns
+    text_columns = ['name', 'description']
+    for col in text_columns:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace('\\n', '\n', regex=False)
+
+    # Add quantity columns if they don't exist
+    if 'quantity_total' not in df.columns:
+        df['quantity_total'] = 1
+    if 'quantity_purchased' not in df.columns:
+        df['quantity_purchased'] = 0
+    if 'purchase_details' not in df.columns:
+        df['purchase_details'] = '[]'
+
+    # Fill NaN values with defaults
+    df['quantity_total'] = df['quantity_total'].fillna(1).astype(int)
+    df['quantity_purchased'] = df['quantity_purchased'].fillna(0).astype(int)
+    df['purchase_details'] = df['purchase_details'].fillna('[]').astype(str)
+
+    df.attrs['ids_added'] = assign_gift_ids(df)
+    return df
+
+
+def read_gift_registry_csv(path):
+    """Load the gift registry, indexed by gift id
+
+    Gifts added to the CSV by hand don't have an id yet; they get one on
+    first load and it is written back right away, so every session sees
+    the same ids.
+    """
+    df = _parse_gift_registry_csv(path)
+    if not df.attrs.pop('ids_added', False):
+        return df
+
+    with file_lock(path):
+        # Re-read under the lock in case another process assigned them first
+        df = _parse_gift_registry_csv(path)
+        if df.attrs.pop('ids_added', False):
+            write_gift_registry_csv(path, df)
+        return df
+
+
+def _gift_row(record):
+    """One gift as a dict with all columns, normalized like _parse_gift_registry_csv"""
+    def text(col):
+        value = record.get(col)
+        return '' if value is None else str(value)
+
+    def number(col, default):
+        try:
+            return int(float(record.get(col)))
+        except (TypeError, ValueError):  # missing, empty or NaN
+            return default
+
+    return {
+        'id': text('id').strip(),
+        'name': text('name').replace('\\n', '\n'),
+        'description': text('description').replace('\\n', '\n'),
+        'url': text('url'),
+        'image_url': text('image_url'),
+        'purchased': text('purchased').strip().lower() in ('true', '1'),
+        'session_id': text('session_id'),
+        'quantity_total': number('quantity_total', 1),
+        'quantity_purchased': number('quantity_purchased', 0),
+        'purchase_details': text('purchase_details') or '[]',
+    }
+
+
+def read_gift_registry_rows(path):
+    """Load the gift registry as a list of dicts, in file order, without pandas
+
+    For read-only views (the guests' wishlist). Gifts without a unique id
+    are left to read_gift_registry_csv, which assigns and saves them.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        rows = [_gift_row(record) for record in csv.DictReader(f, delimiter=';', quotechar='"', doublequote=True)]
+
+    ids = [row['id'] for row in rows]
+    if '' in ids or len(set(ids)) != len(ids):
+        return [_gift_row(record) for record in read_gift_registry_csv(path).to_dict('records')]
+    return rows
+
+
+def write_gift_registry_csv(path, df):
+    """Write the gift registry dataframe back to its CSV file"""
+    # New gifts (e.g. added by the admin page) get their id here
+    assign_gift_ids(df)
+    with file_lock(path):
+        _atomic_write(path, lambda f: df.to_csv(
+            f,
+            index=False,
+            sep=';',
+            quotechar='"',
+            quoting=csv.QUOTE_NONNUMERIC,
+            doublequote=True,
+            lineterminator='\n'
+        ))
+
+
+def update_gift_registry_csv(path, update_fn):
+    """Read-modify-write the gift registry while holding its lock
+
+    ``update_fn`` gets the current dataframe, modifies it in place and
+    returns True if it should be written back. Concurrent updates (from
+    other sessions or processes) are serialized, so a check made inside
+    update_fn still holds when the result is written.
+    """
+    with file_lock(path):
+        df = read_gift_registry_csv(path)
+        changed = update_fn(df)
+        if changed:
+            write_gift_registry_csv(path, df)
+        return changed
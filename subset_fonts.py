@@ -0,0 +1,236 @@
+"""Subset the theme fonts to WOFF2 and point config.toml at them.
+
+The full TTFs live in ``fonts/`` (not served, not copied into the image).
+This script looks at ``.streamlit/config.toml`` to see which font faces
+the theme actually uses:
+
+* a ``[[theme.fontFaces]]`` table counts only if its family is named in
+  ``font``, ``headingFont`` or ``codeFont`` (main theme or sidebar)
+* its source is the file in ``fonts/`` with the same name as the table's
+  url (``app/static/fonts/JosefinSans-Regular.woff2`` ->
+  ``fonts/JosefinSans-Regular.ttf``), so the script can be run again after
+  changing the theme
+
+Each used face is cut down to Latin (with the German umlauts, ß/ẞ and
+typographic punctuation) plus any other character found in the app's
+source and settings files, and written to ``static/fonts/`` as WOFF2. The
+fontFaces tables in config.toml are then replaced with one per subset,
+including a ``unicodeRange`` so that browsers fall back to a system font
+for other characters (a guest name in Cyrillic, say) instead of failing
+to render them. The rest of config.toml is left untouched.
+
+Needs fontTools with Brotli for WOFF2 (``pip install fonttools brotli``);
+only when the fonts change, the app itself doesn't use it. Commit the
+output in ``static/fonts/`` and the rewritten config.toml.
+
+    python subset_fonts.py            # subset and rewrite config.toml
+    python subset_fonts.py --check    # only show what would be done
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+
+import toml
+
+CONFIG_PATH = os.path.join(".streamlit", "config.toml")
+SOURCE_DIR = "fonts"
+OUTPUT_DIR = os.path.join("static", "fonts")
+URL_PREFIX = "app/static/fonts/"
+SOURCE_EXTENSIONS = ('.ttf', '.otf', '.woff', '.woff2')
+
+# Basic Latin, Latin-1 (ÄÖÜäöüß, accented names), ẞ, dashes, quotes „“‚‘,
+# bullet, ellipsis, €
+BASE_RANGES = [
+    (0x0020, 0x007E),
+    (0x00A0, 0x00FF),
+    (0x0152, 0x0153),
+    (0x1E9E, 0x1E9E),
+    (0x2013, 0x2014),
+    (0x2018, 0x201E),
+    (0x2022, 0x2022),
+    (0x2026, 0x2026),
+    (0x20AC, 0x20AC),
+]
+
+# Files whose string literals end up on the page
+TEXT_SOURCES = ["*.py", os.path.join(".streamlit", "*.toml"), os.path.join(".streamlit", "*.toml.example")]
+
+THEME_FONT_KEYS = ("font", "headingFont", "codeFont")
+
+
+def used_families(theme):
+    """Font family names referenced by the theme (main and sidebar)"""
+    families = set()
+    for section in (theme, theme.get("sidebar", {})):
+        for key in THEME_FONT_KEYS:
+            for name in str(section.get(key, "")).split(","):
+                name = name.strip().strip("'\"")
+                if name:
+                    families.add(name.split(":")[0])  # "<name>:<css url>" form
+    return families
+
+
+def find_source(url):
+    """Full font file in fonts/ for a fontFaces url (by file name, any extension)"""
+    stem = os.path.splitext(os.path.basename(url))[0]
+    for ext in SOURCE_EXTENSIONS:
+        path = os.path.join(SOURCE_DIR, stem + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"no source font for {url} in {SOURCE_DIR}/ ({stem}.ttf)")
+
+
+def app_text_codepoints():
+    """Non-ASCII characters that appear in the app's source and settings files"""
+    codepoints = set()
+    for pattern in TEXT_SOURCES:
+        for path in glob.glob(pattern):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                codepoints.update(ord(c) for c in f.read() if ord(c) > 0x7E and c.isprintable())
+    return codepoints
+
+
+def wanted_codepoints(extra_text=""):
+    codepoints = {cp for start, end in BASE_RANGES for cp in range(start, end + 1)}
+    codepoints |= app_text_codepoints()
+    codepoints |= {ord(c) for c in extra_text}
+    return codepoints
+
+
+def unicode_range(codepoints):
+    """CSS unicode-range for a set of code points, consecutive ones merged"""
+    ranges = []
+    for cp in sorted(codepoints):
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ", ".join(f"U+{start:04X}" if start == end else f"U+{start:04X}-{end:04X}" for start, end in ranges)
+
+
+def subset(source, codepoints):
+    """WOFF2 bytes of ``source`` limited to ``codepoints``; also returns the ones it covers"""
+    from fontTools import subset as ft_subset
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(source)
+    covered = set(font.getBestCmap()) & codepoints
+
+    options = ft_subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["kern", "liga", "calt", "ccmp", "locl", "mark", "mkmk"]
+    options.hinting = False  # browsers on high-DPI screens ignore it anyway
+    options.desubroutinize = True  # compresses better with Brotli
+    options.name_IDs = [1, 2, 4, 6]  # family, style, full and PostScript name only
+    subsetter = ft_subset.Subsetter(options)
+    subsetter.populate(unicodes=covered)
+    subsetter.subset(font)
+
+    buffer = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(buffer)
+    return buffer.getvalue(), covered
+
+
+def face_table(face):
+    lines = ["[[theme.fontFaces]]"]
+    for key in ("family", "url", "style", "weight", "unicodeRange"):
+        if key in face:
+            value = face[key]
+            lines.append(f"{key}={value}" if isinstance(value, int) else f'{key}="{value}"')
+    return "\n".join(lines)
+
+
+def replace_font_faces(config_text, faces):
+    """config.toml with its fontFaces tables replaced, everything else kept as it was"""
+    kept = []
+    in_face = False
+    for line in config_text.splitlines():
+        stripped = line.strip()
+        if stripped == "[[theme.fontFaces]]":
+            in_face = True
+            continue
+        if in_face and (not stripped or stripped.startswith("[")):
+            in_face = False
+            if not stripped:
+                continue
+        if not in_face:
+            kept.append(line)
+    while kept and not kept[0].strip():
+        kept.pop(0)
+    header = "\n\n".join(face_table(face) for face in faces)
+    return header + "\n\n" + "\n".join(kept) + "\n"
+
+
+def _write(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subset the theme fonts to WOFF2 and update config.toml")
+    parser.add_argument("--config", default=CONFIG_PATH, help="Streamlit config to read and rewrite")
+    parser.add_argument("--extra-text", default="", help="additional characters the subsets must contain")
+    parser.add_argument("--check", action="store_true", help="only report, don't write anything")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config_text = f.read()
+    theme = toml.loads(config_text).get("theme", {})
+    families = used_families(theme)
+    faces = theme.get("fontFaces", [])
+
+    used = [face for face in faces if face.get("family") in families]
+    for face in faces:
+        if face not in used:
+            print(f"unused face dropped: {face.get('family')} ({face.get('url')})")
+    if not used:
+        sys.exit("No font face of the theme's families (font/headingFont/codeFont) is declared, nothing to do.")
+
+    codepoints = wanted_codepoints(args.extra_text)
+    if not args.check:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+    new_faces = []
+    outputs = set()
+    total_before = total_after = 0
+    for face in used:
+        source = find_source(face["url"])
+        data, covered = subset(source, codepoints)
+        filename = os.path.splitext(os.path.basename(source))[0] + ".woff2"
+        outputs.add(filename)
+
+        size = os.path.getsize(source)
+        total_before += size
+        total_after += len(data)
+        print(f"{source}: {size / 1024:.0f} KB -> {filename}: {len(data) / 1024:.1f} KB ({len(covered)} characters)")
+
+        new_face = {key: value for key, value in face.items() if key != "unicodeRange"}
+        new_face["url"] = URL_PREFIX + filename
+        new_face["unicodeRange"] = unicode_range(covered)
+        new_faces.append(new_face)
+        if not args.check:
+            _write(os.path.join(OUTPUT_DIR, filename), data)
+
+    existing = os.listdir(OUTPUT_DIR) if os.path.isdir(OUTPUT_DIR) else []
+    stale = [name for name in existing if name.endswith(".woff2") and name not in outputs]
+    for name in stale:
+        print(f"no longer used: {os.path.join(OUTPUT_DIR, name)}")
+        if not args.check:
+            os.remove(os.path.join(OUTPUT_DIR, name))
+
+    print(f"total: {total_before / 1024:.0f} KB -> {total_after / 1024:.1f} KB")
+    if args.check:
+        return
+
+    new_config = replace_font_faces(config_text, new_faces)
+    if new_config != config_text:
+        _write(args.config, new_config.encode("utf-8"))
+        print(f"updated {args.config}")
+
+
+if __name__ == "__main__":
+    main()
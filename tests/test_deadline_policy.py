@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from streamlit.testing.v1 import AppTest
+
+from deadline_policy import DeadlinePolicy
+
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+def policy(deadline, **settings):
+    return DeadlinePolicy.from_settings(dict(settings, deadline_datetime=deadline, timezone="Europe/Berlin"))
+
+
+def berlin(*args, fold=0):
+    return datetime(*args, tzinfo=BERLIN, fold=fold)
+
+
+def test_periods_around_the_deadline():
+    p = policy("2026-06-20 18:00", grace_period_hours=12, warning_days=7)
+
+    assert p.status(berlin(2026, 6, 1, 12, 0))[1:4] == (False, False, False)
+    assert p.status(berlin(2026, 6, 15, 12, 0))[1:4] == (False, False, True)
+    assert p.status(berlin(2026, 6, 21, 5, 0))[1:4] == (True, True, False)
+    assert p.status(berlin(2026, 6, 21, 7, 0))[1:4] == (True, False, False)
+    assert p.status(berlin(2026, 6, 21, 7, 0)).remaining == timedelta(0)
+
+
+def test_remaining_time_across_the_spring_forward():
+    # 02:00 CET -> 03:00 CEST on 29 March: only one real hour between 01:30 and 03:30
+    p = policy("2026-03-29 03:30")
+
+    assert p.status(berlin(2026, 3, 29, 1, 30)).remaining == timedelta(hours=1)
+
+
+def test_deadline_in_the_spring_forward_gap_moves_after_the_change():
+    p = policy("2026-03-29 02:30")
+
+    assert p.deadline == datetime(2026, 3, 29, 1, 30, tzinfo=timezone.utc)
+    assert (p.deadline.hour, p.deadline.utcoffset()) == (3, timedelta(hours=2))
+
+
+def test_ambiguous_deadline_is_the_first_occurrence():
+    # 03:00 CEST -> 02:00 CET on 25 October: 02:30 happens twice
+    p = policy("2026-10-25 02:30")
+
+    assert p.status(berlin(2026, 10, 25, 2, 45, fold=0)).past
+    assert p.status(berlin(2026, 10, 25, 2, 15, fold=1)).past  # earlier wall clock, but an hour later
+
+
+def test_grace_period_is_elapsed_time_across_the_fall_back():
+    p = policy("2026-10-24 12:00", grace_period_hours=24)
+
+    assert p.grace_end == berlin(2026, 10, 25, 11, 0)
+    # Subtracting the two directly would give the wall clock difference (23 hours)
+    assert p.grace_end.astimezone(timezone.utc) - p.deadline.astimezone(timezone.utc) == timedelta(hours=24)
+    assert p.status(berlin(2026, 10, 25, 11, 30)).in_grace is False
+
+
+def test_naive_and_aware_now_give_the_same_answers():
+    p = policy("2026-06-20 18:00")
+    naive = datetime(2026, 6, 20, 17, 0)  # wall clock in Berlin
+    aware_utc = datetime(2026, 6, 20, 15, 0, tzinfo=timezone.utc)
+
+    for now in (naive, aware_utc, berlin(2026, 6, 20, 17, 0)):
+        status = p.status(now)
+        assert status.past is False
+        assert status.remaining == timedelta(hours=1)
+        assert status.now == berlin(2026, 6, 20, 17, 0)
+        assert status.now.tzinfo is BERLIN
+
+
+def test_broken_settings_give_a_policy_without_deadline():
+    p = DeadlinePolicy.from_settings({'deadline_datetime': "20.06.2026", 'timezone': "Europe/Berlin"})
+
+    assert p.deadline is None and p.error is not None
+    assert p.status().past is False
+
+
+def _deadline_script():
+    import streamlit as st
+    from utils import get_deadline_policy, reload_deadline_policy
+
+    if st.session_state.get("reload"):
+        reload_deadline_policy()
+    policy = get_deadline_policy()
+    st.session_state.setdefault("policies", []).append(policy)
+    st.write(str(policy.deadline))
+
+
+def test_reload_deadline_policy_rebuilds_the_cached_policy(tmp_path):
+    at = AppTest.from_function(_deadline_script)
+    at.secrets["files"] = {'csv_file': str(tmp_path / "rsvps.csv")}
+    at.secrets["deadline"] = {'deadline_datetime': "2026-06-20 18:00", 'timezone': "Europe/Berlin"}
+
+    at.run()
+    at.run()
+    first, second = at.session_state["policies"]
+    assert first is second  # cached between reruns
+    assert at.markdown[0].value == "2026-06-20 18:00:00+02:00"
+
+    at.session_state["reload"] = True
+    at.run()
+    assert at.session_state["policies"][-1] is not first
+    at.session_state["reload"] = False
+
+    at.secrets["deadline"] = {'deadline_datetime': "2026-07-01 12:00", 'timezone': "Europe/Berlin"}
+    at.run()
+    assert at.markdown[0].value == "2026-07-01 12:00:00+02:00"
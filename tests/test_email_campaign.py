@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+import email_campaign
+from email_campaign import create_campaign, load_campaign, send_campaign
+
+RECIPIENTS = [{'email': f"guest{i}@example.com", 'name': f"Gast {i}", 'attending': True} for i in range(5)]
+
+
+class FakeSMTPManager:
+    def __init__(self, sent):
+        self.sent = sent
+
+    def send(self, to_email, subject, body):
+        self.sent.append(to_email)
+        return True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def campaign(tmp_path):
+    directory = str(tmp_path / "campaigns")
+    return directory, create_campaign(directory, "Erinnerung", "Hallo {name}", RECIPIENTS)
+
+
+def run_with_timeout(function, *args, **kwargs):
+    """Result of function, failing the test instead of hanging if it never returns"""
+    outcome = []
+    thread = threading.Thread(target=lambda: outcome.append(function(*args, **kwargs)), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert outcome, "send_campaign did not return"
+    return outcome[0]
+
+
+def test_sends_to_everyone_once(campaign, monkeypatch):
+    directory, campaign_id = campaign
+    sent = []
+    monkeypatch.setattr(email_campaign, "create_smtp_manager", lambda config: FakeSMTPManager(sent))
+
+    assert run_with_timeout(send_campaign, directory, campaign_id, {}, rate=0) == (5, 0)
+    assert sorted(sent) == sorted(r['email'] for r in RECIPIENTS)
+    # A second run skips everyone already logged as sent
+    assert run_with_timeout(send_campaign, directory, campaign_id, {}, rate=0) == (0, 0)
+    assert len(sent) == 5
+
+
+def test_returns_when_smtp_setup_fails(campaign, monkeypatch):
+    directory, campaign_id = campaign
+
+    def broken_factory(config):
+        raise KeyError("host")
+    monkeypatch.setattr(email_campaign, "create_smtp_manager", broken_factory)
+
+    progress = []
+    result = run_with_timeout(send_campaign, directory, campaign_id, {}, connections=3, rate=0,
+                              progress=lambda done, total: progress.append((done, total)))
+    assert result == (0, 5)
+    assert progress[-1] == (5, 5)
+    assert not load_campaign(directory, campaign_id)['done']
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+
+import pytest
+
+import email_outbox
+import email_utils
+from email_outbox import MAX_ATTEMPTS, RETRY_BASE_DELAY, EmailOutbox
+
+ORGANIZER = {"to": "orga@example.com", "subject": "Neue Zusage", "body": "..."}
+FAILED_NOTICE = {"to": "orga@example.com", "subject": "Bestätigung nicht zugestellt", "body": "..."}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def time_ns(self):
+        self.now += 1e-6  # keeps queue file names unique and ordered
+        return int(self.now * 1e9)
+
+
+class FakeSMTPManager:
+    """Stands in for email_utils.SMTPConnectionManager; fails the first sends to some addresses"""
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})  # address -> number of sends that fail (None: all)
+        self.rejected = set()  # addresses the server refuses for good
+        self.sent = []
+        self.attempts = []
+
+    def send(self, to_email, subject, body, raise_rejected=False):
+        self.attempts.append(to_email)
+        if to_email in self.rejected:
+            if raise_rejected:
+                raise email_utils.MessageRejected("550 no such user")
+            return False
+        remaining = self.failures.get(to_email, 0)
+        if remaining is None or remaining > 0:
+            if remaining:
+                self.failures[to_email] = remaining - 1
+            raise email_utils.smtplib.SMTPServerDisconnected("connection lost")
+        self.sent.append((to_email, subject))
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(email_outbox, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    manager = FakeSMTPManager()
+    monkeypatch.setattr(email_utils, "get_smtp_manager", lambda: manager)
+    return manager
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch, clock, smtp):
+    # No worker thread: the tests call process_due themselves
+    monkeypatch.setattr(EmailOutbox, "start", lambda self: None)
+    return EmailOutbox(str(tmp_path / "outbox"))
+
+
+def test_transient_failure_is_retried_after_backoff(outbox, clock, smtp):
+    smtp.failures["anna@example.com"] = 1
+    outbox.enqueue("anna@example.com", "Danke", "...", on_success=ORGANIZER, on_failure=FAILED_NOTICE)
+
+    assert outbox.process_due() == RETRY_BASE_DELAY
+    assert smtp.sent == [] and outbox.pending_count() == 1
+
+    clock.now += RETRY_BASE_DELAY - 1
+    outbox.process_due()
+    assert smtp.attempts == ["anna@example.com"]  # not due yet
+
+    clock.now += 1
+    assert outbox.process_due() is None
+    # The organizer notification is queued once the guest's mail went out
+    assert smtp.sent == [("anna@example.com", "Danke")]
+    outbox.process_due()
+    assert smtp.sent[1] == ("orga@example.com", "Neue Zusage")
+    assert outbox.pending_count() == 0
+
+
+def test_permanent_failure_gives_up_and_queues_on_failure(outbox, clock, smtp):
+    smtp.failures["typo@exmaple.com"] = None
+    outbox.enqueue("typo@exmaple.com", "Danke", "...", on_success=ORGANIZER, on_failure=FAILED_NOTICE)
+
+    delays = []
+    while True:
+        delay = outbox.process_due()
+        if delay is None:
+            break
+        delays.append(delay)
+        clock.now += delay
+
+    assert delays == [RETRY_BASE_DELAY * 2 ** n for n in range(MAX_ATTEMPTS - 1)]
+    assert smtp.attempts.count("typo@exmaple.com") == MAX_ATTEMPTS
+    assert len(os.listdir(outbox.failed_directory)) == 1
+
+    outbox.process_due()
+    assert smtp.sent == [("orga@example.com", "Bestätigung nicht zugestellt")]
+    assert outbox.pending_count() == 0
+
+
+def test_new_instance_picks_up_queued_messages(tmp_path, clock, smtp, monkeypatch):
+    directory = str(tmp_path / "outbox")
+    monkeypatch.setattr(EmailOutbox, "start", lambda self: None)
+    smtp.failures["anna@example.com"] = 1
+    before_restart = EmailOutbox(directory)
+    before_restart.enqueue("anna@example.com", "Danke", "...")
+    before_restart.enqueue("ben@example.com", "Danke", "...")
+    before_restart.process_due()  # Anna's first attempt fails and is rescheduled
+    assert smtp.sent == [("ben@example.com", "Danke")]
+
+    after_restart = EmailOutbox(directory)
+    assert after_restart.pending_count() == 1
+    clock.now += RETRY_BASE_DELAY
+    assert after_restart.process_due() is None
+    assert ("anna@example.com", "Danke") in smtp.sent
+    assert after_restart.pending_count() == 0
+
+
+def test_worker_thread_delivers_leftovers_on_start(tmp_path, smtp, monkeypatch):
+    directory = str(tmp_path / "outbox")
+    with monkeypatch.context() as patch:
+        patch.setattr(EmailOutbox, "start", lambda self: None)
+        EmailOutbox(directory).enqueue("anna@example.com", "Danke", "...")
+
+    outbox = EmailOutbox(directory)
+    outbox.start()
+    deadline = time.time() + 5
+    while outbox.pending_count() and time.time() < deadline:
+        time.sleep(0.01)
+    assert smtp.sent == [("anna@example.com", "Danke")]
+
+
+def test_rejected_recipient_fails_at_once(outbox, clock, smtp):
+    smtp.rejected.add("typo@exmaple.com")
+    outbox.enqueue("typo@exmaple.com", "Danke", "...", on_success=ORGANIZER, on_failure=FAILED_NOTICE)
+
+    assert outbox.process_due() is None
+    assert smtp.attempts == ["typo@exmaple.com"]
+    assert len(os.listdir(outbox.failed_directory)) == 1
+
+    outbox.process_due()
+    assert smtp.sent == [("orga@example.com", "Bestätigung nicht zugestellt")]
+
+
+@pytest.mark.parametrize("delivered", [True, False])
+def test_follow_up_is_queued_before_the_message_leaves_the_queue(outbox, clock, smtp, monkeypatch, delivered):
+    if not delivered:
+        smtp.rejected.add("anna@example.com")
+    outbox.enqueue("anna@example.com", "Danke", "...", on_success=ORGANIZER, on_failure=FAILED_NOTICE)
+
+    original = os.path.join(outbox.directory, outbox._pending_files()[0])
+
+    def crash_on_original(function):
+        def wrapper(src, *args):
+            if src == original:
+                raise RuntimeError("killed")
+            return function(src, *args)
+        return wrapper
+    # The process dies right where the original message would leave the queue
+    with monkeypatch.context() as patch:
+        patch.setattr(email_outbox.os, "remove", crash_on_original(os.remove))
+        patch.setattr(email_outbox.os, "replace", crash_on_original(os.replace))
+        with pytest.raises(RuntimeError):
+            outbox.process_due()
+
+    follow_ups = []
+    for name in outbox._pending_files():
+        with open(os.path.join(outbox.directory, name), encoding="utf-8") as f:
+            follow_ups.append(json.load(f)["subject"])
+    expected = ORGANIZER if delivered else FAILED_NOTICE
+    assert expected["subject"] in follow_ups
@@ -0,0 +1,107 @@
+import smtplib
+
+import pytest
+
+import email_utils
+
+
+class FakeSMTP:
+    """smtplib.SMTP stand-in; ``errors`` maps a recipient to the exceptions its sendmail calls raise, in order"""
+
+    errors = {}
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        return (250, b"OK")
+
+    def sendmail(self, from_addr, to_addr, msg):
+        pending = FakeSMTP.errors.get(to_addr)
+        if pending:
+            raise pending.pop(0)
+        self.sent.append(to_addr)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    FakeSMTP.errors = {}
+    FakeSMTP.instances = []
+    monkeypatch.setattr(email_utils.smtplib, "SMTP", FakeSMTP)
+    return email_utils.SMTPConnectionManager("smtp.example.com", 587, "user", "secret")
+
+
+def test_refused_recipient_is_not_resent_and_keeps_the_session(manager):
+    FakeSMTP.errors["typo@exmaple.com"] = [
+        smtplib.SMTPRecipientsRefused({"typo@exmaple.com": (550, b"No such user")})
+    ]
+
+    results = manager.send_many([("typo@exmaple.com", "Danke", "..."), ("anna@example.com", "Danke", "...")])
+
+    assert results == [False, True]
+    assert len(FakeSMTP.instances) == 1
+    assert FakeSMTP.instances[0].sent == ["anna@example.com"]
+    assert not FakeSMTP.instances[0].closed
+
+
+def test_data_error_is_not_resent(manager):
+    FakeSMTP.errors["anna@example.com"] = [smtplib.SMTPDataError(554, b"Message rejected")]
+
+    assert manager.send("anna@example.com", "Danke", "...") is False
+    assert len(FakeSMTP.instances) == 1
+    assert FakeSMTP.instances[0].sent == []
+    assert manager.send("ben@example.com", "Danke", "...") is True
+    assert len(FakeSMTP.instances) == 1
+
+
+@pytest.mark.parametrize("error", [
+    smtplib.SMTPServerDisconnected("Connection unexpectedly closed"),
+    ConnectionResetError(104, "Connection reset by peer"),
+    TimeoutError("timed out"),
+])
+def test_lost_connection_reconnects_and_resends_once(manager, error):
+    FakeSMTP.errors["anna@example.com"] = [error]
+
+    assert manager.send("anna@example.com", "Danke", "...") is True
+    assert len(FakeSMTP.instances) == 2
+    assert FakeSMTP.instances[0].closed
+    assert FakeSMTP.instances[1].sent == ["anna@example.com"]
+
+
+def test_second_lost_connection_gives_up(manager):
+    FakeSMTP.errors["anna@example.com"] = [ConnectionResetError(), ConnectionResetError()]
+
+    assert manager.send("anna@example.com", "Danke", "...") is False
+    assert len(FakeSMTP.instances) == 2
+
+
+@pytest.mark.parametrize("error, rejected", [
+    (smtplib.SMTPRecipientsRefused({"anna@example.com": (550, b"No such user")}), True),
+    (smtplib.SMTPRecipientsRefused({"anna@example.com": (450, b"Mailbox busy")}), False),
+    (smtplib.SMTPDataError(554, b"Message rejected"), True),
+    (smtplib.SMTPDataError(451, b"Try again later"), False),
+    (ConnectionResetError(), False),
+])
+def test_raise_rejected_only_for_permanent_answers(manager, error, rejected):
+    FakeSMTP.errors["anna@example.com"] = [error, error]
+
+    if rejected:
+        with pytest.raises(email_utils.MessageRejected):
+            manager.send("anna@example.com", "Danke", "...", raise_rejected=True)
+    else:
+        assert manager.send("anna@example.com", "Danke", "...", raise_rejected=True) is False
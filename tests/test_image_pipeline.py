@@ -0,0 +1,14 @@
+import os
+
+import image_pipeline
+
+
+def test_manifest_lock_stays_out_of_the_served_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(image_pipeline.OUTPUT_DIR)
+
+    image_pipeline._store_entry("images/white-hart.png", {'fallback': 'white-hart.png', 'sources': {}})
+
+    assert os.listdir(image_pipeline.OUTPUT_DIR) == ["manifest.json"]
+    assert os.path.exists(image_pipeline.MANIFEST_LOCK_PATH)
+    assert "images/white-hart.png" in image_pipeline._read_manifest()
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import sqlite_store
+import storage
+from rsvp_aggregates import COUNTED_COLUMNS
+
+STORED = [
+    {'timestamp': '2026-04-01 09:00:00', 'contact_name': 'Carla Roth', 'contact_email': 'carla@example.com',
+     'attending': 'Yes', 'guest_first_name': 'Carla', 'guest_last_name': 'Roth', 'essenspräferenz': '',
+     'starter_choice': 'Suppe', 'main_choice': 'Fisch', 'dessert_choice': '', 'dietary_requirements': 'Laktose'},
+    {'timestamp': '2026-04-02 10:00:00', 'contact_name': 'Emil Berg', 'contact_email': 'emil@example.com',
+     'attending': 'No', 'guest_first_name': '', 'guest_last_name': '', 'essenspräferenz': '',
+     'starter_choice': '', 'main_choice': '', 'dessert_choice': '', 'dietary_requirements': ''},
+]
+# One party from the form, as app.py builds it: no course columns, so the CSV gets a new column too
+PARTY = [
+    {'timestamp': '2026-05-01 10:00:00', 'contact_name': 'Anna Weber', 'contact_email': 'anna@example.com',
+     'contact_phone': '0171 2345678', 'attending': 'Ja', 'guest_first_name': 'Anna', 'guest_last_name': 'Weber',
+     'essenspräferenz': 'Vegan', 'dietary_requirements': 'Nüsse', 'comments': ''},
+    {'timestamp': '2026-05-01 10:00:00', 'contact_name': 'Anna Weber', 'contact_email': 'anna@example.com',
+     'contact_phone': '0171 2345678', 'attending': 'Ja', 'guest_first_name': 'Ben', 'guest_last_name': 'Weber',
+     'essenspräferenz': 'Keine', 'dietary_requirements': '  ', 'comments': ''},
+]
+STATUSES = ['Ja', 'Yes', 'No', None]
+
+
+def counts(aggregates):
+    """Everything the dashboards read from an RSVPAggregates"""
+    return {
+        status: {
+            'rows': aggregates.row_count(status),
+            'dietary': aggregates.dietary_count(status),
+            **{column: aggregates.value_counts(status, column) for column in COUNTED_COLUMNS},
+        }
+        for status in STATUSES
+    }
+
+
+def _batch_script():
+    import streamlit as st
+    import utils
+    from rsvp_aggregates import RSVPAggregates
+
+    step = st.session_state.get("step")
+    if step == "sync":
+        st.session_state.aggregates = utils.get_rsvp_aggregates()
+    elif step == "save":
+        utils.save_rsvp_batch(st.session_state.batch)
+        full = RSVPAggregates()
+        full.rebuild(utils.load_rsvps())
+        st.session_state.full = full
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_batch_updates_match_a_full_recount(tmp_path, monkeypatch, backend):
+    csv_path = str(tmp_path / "rsvps.csv")
+    db_path = str(tmp_path / "wedding.db")
+    if backend == "sqlite":
+        sqlite_store.append_rsvps(db_path, STORED)
+    else:
+        storage.write_dataframe(csv_path, pd.DataFrame(STORED))
+
+    at = AppTest.from_function(_batch_script)
+    at.secrets["files"] = {'csv_file': csv_path}
+    at.run()  # imports utils
+    import utils
+    monkeypatch.setattr(utils, "CSV_FILE", csv_path)
+    monkeypatch.setattr(utils, "SQLITE_FILE", db_path)
+    monkeypatch.setattr(utils, "STORAGE_BACKEND", backend)
+
+    at.session_state["step"] = "sync"
+    at.run()
+    aggregates = at.session_state["aggregates"]
+    assert aggregates.row_count('Yes') == 1
+    rebuilds = []
+    monkeypatch.setattr(aggregates, "rebuild", lambda *args: rebuilds.append(args))
+
+    at.session_state["step"] = "save"
+    at.session_state["batch"] = PARTY
+    at.run()
+
+    assert rebuilds == []  # counted incrementally, not recounted
+    assert aggregates.signature == utils._file_signature(utils._storage_paths(csv_path))
+    assert counts(aggregates) == counts(at.session_state["full"])
+    assert aggregates.total_rows == 4
+    assert aggregates.value_counts('Ja', 'essenspräferenz') == {'Vegan': 1, 'Keine': 1}
+    assert aggregates.dietary_count('Ja') == 1
@@ -0,0 +1,170 @@
+import pandas as pd
+import pytest
+
+import sqlite_store
+import storage
+from rsvp_edits import apply_changeset, build_changeset
+from rsvp_schema import is_blank, read_rsvps_csv
+
+ROWS = [
+    {'timestamp': '2026-05-01 10:00:00', 'contact_name': 'Anna Weber', 'contact_email': 'anna@example.com',
+     'attending': 'Ja', 'guest_first_name': 'Anna', 'guest_last_name': 'Weber', 'main_choice': 'Fisch'},
+    {'timestamp': '2026-05-01 10:00:00', 'contact_name': 'Anna Weber', 'contact_email': 'anna@example.com',
+     'attending': 'Ja', 'guest_first_name': 'Ben', 'guest_last_name': 'Weber', 'main_choice': 'Fleisch'},
+    {'timestamp': '2026-05-02 18:30:00', 'contact_name': 'Carla Roth', 'contact_email': 'carla@example.com',
+     'attending': 'Nein', 'guest_first_name': 'Carla', 'guest_last_name': 'Roth', 'main_choice': ''},
+]
+LATE_GUEST = {'timestamp': '2026-05-03 09:15:00', 'contact_name': 'Dora Lang', 'contact_email': 'dora@example.com',
+              'attending': 'Ja', 'guest_first_name': 'Dora', 'guest_last_name': 'Lang', 'main_choice': 'Vegetarisch'}
+
+
+class CSVBackend:
+    """What utils.save_rsvp_changes does for the CSV backend, without the caches"""
+
+    def __init__(self, tmp_path):
+        self.path = str(tmp_path / "rsvps.csv")
+        storage.write_dataframe(self.path, pd.DataFrame(ROWS))
+
+    def load(self):
+        return read_rsvps_csv(self.path)
+
+    def append(self, rows):
+        storage.append_rows(self.path, rows)
+
+    def replace(self, df):
+        storage.write_dataframe(self.path, df)
+
+    def save(self, changeset):
+        result = (0, [])
+
+        def update(df):
+            nonlocal result
+            result = apply_changeset(df, changeset)
+            return result[0] > 0
+        storage.update_dataframe(self.path, update, dtype={'contact_phone': str})
+        return result
+
+
+class SQLiteBackend:
+    def __init__(self, tmp_path):
+        self.path = str(tmp_path / "wedding.db")
+        sqlite_store.append_rsvps(self.path, ROWS)
+
+    def load(self):
+        return sqlite_store.load_rsvps(self.path)
+
+    def append(self, rows):
+        sqlite_store.append_rsvps(self.path, rows)
+
+    def replace(self, df):
+        sqlite_store.replace_rsvps(self.path, df)
+
+    def save(self, changeset):
+        return sqlite_store.update_rsvps(self.path, changeset)
+
+
+@pytest.fixture(params=[CSVBackend, SQLiteBackend], ids=["csv", "sqlite"])
+def backend(request, tmp_path):
+    return request.param(tmp_path)
+
+
+def column(df, name):
+    """Column values with blanks as '' (the backends load them as NA or None)"""
+    return ['' if is_blank(value) else value for value in df[name]]
+
+
+def names(df):
+    return column(df, 'guest_first_name')
+
+
+def stored_rows(backend):
+    """The stored rows as plain objects, to change them the way another session would"""
+    return backend.load().astype(object)
+
+
+def test_build_changeset_maps_filtered_rows_and_skips_unchanged_cells():
+    df = pd.DataFrame(ROWS)
+    view = df[df['contact_email'] == 'carla@example.com']
+
+    changeset = build_changeset(df, view, {0: {'attending': 'Ja', 'guest_last_name': 'Roth'}})
+
+    assert len(changeset) == 1
+    change = changeset[0]
+    assert change['position'] == 2
+    assert change['changes'] == {'attending': 'Ja'}
+    assert change['base']['attending'] == 'Nein'
+    assert change['base']['guest_first_name'] == 'Carla'
+    assert build_changeset(df, view, {0: {'attending': 'Nein'}}) == []
+
+
+def test_edit_round_trip(backend):
+    snapshot = backend.load()
+    changeset = build_changeset(snapshot, snapshot, {
+        1: {'main_choice': 'Vegetarisch'},
+        2: {'attending': 'Ja', 'main_choice': 'Fisch'},
+    })
+
+    assert backend.save(changeset) == (2, [])
+
+    df = backend.load()
+    assert column(df, 'main_choice') == ['Fisch', 'Vegetarisch', 'Fisch']
+    assert column(df, 'attending') == ['Ja', 'Ja', 'Ja']
+    assert names(df) == ['Anna', 'Ben', 'Carla']
+
+
+def test_edit_of_a_row_changed_since_the_snapshot_is_a_conflict(backend):
+    snapshot = backend.load()
+    changeset = build_changeset(snapshot, snapshot, {2: {'main_choice': 'Fisch'}, 0: {'main_choice': 'Fleisch'}})
+    # Carla picks her main course herself while the admin is editing
+    current = stored_rows(backend)
+    current.loc[2, 'main_choice'] = 'Vegetarisch'
+    backend.replace(current)
+
+    applied, conflicts = backend.save(changeset)
+
+    assert applied == 1
+    assert [(c['position'], c['columns']) for c in conflicts] == [(2, ['main_choice'])]
+    assert column(backend.load(), 'main_choice') == ['Fleisch', 'Fleisch', 'Vegetarisch']
+
+
+def test_change_to_another_column_of_the_row_is_not_a_conflict(backend):
+    snapshot = backend.load()
+    changeset = build_changeset(snapshot, snapshot, {2: {'main_choice': 'Fisch'}})
+    current = stored_rows(backend)
+    current.loc[2, 'contact_name'] = 'Carla Roth-Berg'
+    backend.replace(current)
+
+    assert backend.save(changeset) == (1, [])
+    df = backend.load()
+    assert df.loc[2, 'main_choice'] == 'Fisch'
+    assert df.loc[2, 'contact_name'] == 'Carla Roth-Berg'
+
+
+def test_rows_appended_during_the_edit_survive_the_save(backend):
+    snapshot = backend.load()
+    changeset = build_changeset(snapshot, snapshot, {0: {'main_choice': 'Vegetarisch'}})
+    backend.append([LATE_GUEST])
+
+    assert backend.save(changeset) == (1, [])
+
+    df = backend.load()
+    assert names(df) == ['Anna', 'Ben', 'Carla', 'Dora']
+    assert column(df, 'main_choice') == ['Vegetarisch', 'Fleisch', '', 'Vegetarisch']
+
+
+def test_deleted_rows_shift_positions_into_conflicts(backend):
+    snapshot = backend.load()
+    changeset = build_changeset(snapshot, snapshot, {1: {'main_choice': 'Fisch'}, 2: {'attending': 'Ja'}})
+    # Ben's row is removed in the meantime: Carla moves up to position 1, position 2 is gone
+    current = stored_rows(backend)
+    backend.replace(current.drop(index=1).reset_index(drop=True))
+
+    applied, conflicts = backend.save(changeset)
+
+    assert applied == 0
+    assert [c['position'] for c in conflicts] == [1, 2]
+    assert 'guest_first_name' in conflicts[0]['columns']
+    df = backend.load()
+    assert names(df) == ['Anna', 'Carla']
+    assert column(df, 'main_choice')[0] == 'Fisch'
+    assert column(df, 'attending') == ['Ja', 'Nein']
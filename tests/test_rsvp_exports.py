@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+import pytest
+
+from rsvp_exports import available_exports, build_export
+
+DF = pd.DataFrame([
+    {'contact_name': 'Anna Weber', 'contact_phone': '0171 2345678', 'attending': 'Ja', 'comments': 'Wir freuen uns!'},
+    {'contact_name': 'Carla Roth', 'contact_phone': None, 'attending': 'Nein', 'comments': 'Leider\nverhindert'},
+])
+
+
+def test_csv_export_round_trips():
+    data = build_export('all_csv', DF)
+
+    assert data.startswith(b"contact_name,contact_phone,attending,comments\n")
+    df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    assert df.to_dict('records') == DF.fillna('').to_dict('records')
+
+
+def test_attending_csv_keeps_only_attending_guests():
+    df = pd.read_csv(io.BytesIO(build_export('attending_csv', DF)), dtype=str)
+    assert df['contact_name'].tolist() == ['Anna Weber']
+
+
+def test_xlsx_export_round_trips():
+    pytest.importorskip("openpyxl")
+    assert 'all_xlsx' in available_exports()
+
+    df = pd.read_excel(io.BytesIO(build_export('all_xlsx', DF)), sheet_name="RSVPs", dtype=str)
+    assert df['contact_phone'].tolist()[0] == '0171 2345678'
+    assert df['comments'].tolist() == DF['comments'].tolist()
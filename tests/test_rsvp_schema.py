@@ -0,0 +1,54 @@
+import pandas as pd
+
+import storage
+from rsvp_edits import apply_changeset, build_changeset
+from rsvp_schema import editable_rsvps, read_rsvps_csv
+
+ROWS = [
+    {'timestamp': '2026-05-01 10:00:00', 'contact_name': 'Anna Weber', 'contact_phone': '0171 2345678',
+     'attending': 'Ja', 'main_choice': 'Fisch', 'comments': ''},
+    {'timestamp': '2026-05-02 18:30:00', 'contact_name': 'Carla Roth', 'contact_phone': '',
+     'attending': 'Nein', 'main_choice': '', 'comments': 'Leider verhindert'},
+]
+
+
+def test_typed_frame_uses_categories_and_datetimes(tmp_path):
+    path = str(tmp_path / "rsvps.csv")
+    storage.write_dataframe(path, pd.DataFrame(ROWS))
+
+    df = read_rsvps_csv(path)
+
+    assert isinstance(df['attending'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+    assert df.loc[0, 'contact_phone'] == '0171 2345678'
+
+
+def test_editor_frame_is_plain_text(tmp_path):
+    path = str(tmp_path / "rsvps.csv")
+    storage.write_dataframe(path, pd.DataFrame(ROWS))
+    df = read_rsvps_csv(path)
+
+    editable = editable_rsvps(df.iloc[[1]])
+
+    assert (editable.dtypes == object).all()
+    assert editable.index.tolist() == [1]
+    assert editable.loc[1].to_dict() == {
+        'timestamp': '2026-05-02 18:30:00', 'contact_name': 'Carla Roth', 'contact_phone': None,
+        'attending': 'Nein', 'main_choice': None, 'comments': 'Leider verhindert',
+    }
+
+
+def test_editor_accepts_values_outside_the_current_categories(tmp_path):
+    path = str(tmp_path / "rsvps.csv")
+    storage.write_dataframe(path, pd.DataFrame(ROWS))
+    df = read_rsvps_csv(path)
+    # st.data_editor's edited_rows for typed-in values; a categorical column would only offer the existing ones
+    edited_rows = {1: {'main_choice': 'Vegetarisch', 'attending': 'Vielleicht'}}
+
+    changeset = build_changeset(df, editable_rsvps(df), edited_rows)
+    storage.update_dataframe(path, lambda current: apply_changeset(current, changeset)[0] > 0)
+
+    saved = read_rsvps_csv(path)
+    assert saved.loc[1, 'main_choice'] == 'Vegetarisch'
+    assert saved.loc[1, 'attending'] == 'Vielleicht'
+    assert str(saved.loc[1, 'timestamp']) == '2026-05-02 18:30:00'
@@ -0,0 +1,50 @@
+import pytest
+
+from rsvp_search import RSVPSearchIndex
+
+NAMES = ["Joel Weber", "Jolanda Berg", "Manuel Roth", "Manulea Tui", "Samuel Kraus",
+         "Jürgen Müller", "Lisa Mueller", "Tom Muller", "Anna Göbel", "Ben Straße"]
+
+
+@pytest.fixture
+def index():
+    index = RSVPSearchIndex(columns=['contact_name'])
+    index.add_rows([{'contact_name': name} for name in NAMES])
+    return index
+
+
+def found(index, query):
+    return [NAMES[row] for row in index.search(query)]
+
+
+def test_joel_does_not_match_jol(index):
+    assert found(index, "Joel") == ["Joel Weber"]
+    assert found(index, "Jol") == ["Jolanda Berg"]
+    assert found(index, "Jolanda") == ["Jolanda Berg"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Manuel", ["Manuel Roth"]),
+    ("Manul", ["Manulea Tui"]),
+    ("Samuel", ["Samuel Kraus"]),
+    ("samul", []),
+])
+def test_ordinary_vowel_pairs_are_not_collapsed(index, query, expected):
+    assert found(index, query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Müller", ["Jürgen Müller", "Lisa Mueller", "Tom Muller"]),
+    ("Mueller", ["Jürgen Müller", "Lisa Mueller"]),
+    ("Muller", ["Jürgen Müller", "Tom Muller"]),
+    ("jurgen", ["Jürgen Müller"]),
+    ("Goebel", ["Anna Göbel"]),
+    ("strasse", ["Ben Straße"]),
+])
+def test_umlaut_spellings(index, query, expected):
+    assert found(index, query) == expected
+
+
+def test_fuzzy_fallback_still_finds_typos(index):
+    assert found(index, "Mülller") == ["Jürgen Müller", "Lisa Mueller", "Tom Muller"]
+    assert found(index, "Jolandaa") == ["Jolanda Berg"]
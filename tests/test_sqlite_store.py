@@ -0,0 +1,47 @@
+import threading
+
+import sqlite_store
+
+
+def test_connections_are_reused_across_threads(tmp_path):
+    db_path = str(tmp_path / "wedding.db")
+    seen = []
+
+    def run():
+        sqlite_store.append_rsvps(db_path, [{'contact_name': 'Anna', 'attending': 'Ja'}])
+        with sqlite_store.connect(db_path) as conn:
+            seen.append(id(conn))
+
+    for _ in range(5):  # one thread per call, like Streamlit's script runs
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+    assert len(set(seen)) == 1
+    assert len(sqlite_store.load_rsvps(db_path)) == 5
+
+
+def test_schema_is_set_up_once_per_database(tmp_path, monkeypatch):
+    calls = []
+    upgrade = sqlite_store._upgrade_schema
+    monkeypatch.setattr(sqlite_store, "_upgrade_schema", lambda conn: calls.append(conn) or upgrade(conn))
+
+    db_path = str(tmp_path / "wedding.db")
+    gift_id = sqlite_store.add_gift(db_path, {'name': 'Toaster', 'quantity_total': 1})
+    assert sqlite_store.mark_gift_as_purchased(db_path, gift_id, 'usr_1')
+    assert sqlite_store.load_gift_registry_rows(db_path)[0]['quantity_purchased'] == 1
+    assert len(calls) == 1
+
+
+def test_failed_transaction_is_rolled_back_before_reuse(tmp_path):
+    db_path = str(tmp_path / "wedding.db")
+    try:
+        with sqlite_store.connect(db_path) as conn, sqlite_store._transaction(conn):
+            conn.execute("INSERT INTO gifts (gift_id, name) VALUES ('gift_x', 'Vase')")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    with sqlite_store.connect(db_path) as conn:
+        assert not conn.in_transaction
+    assert sqlite_store.load_gift_registry_rows(db_path) == []
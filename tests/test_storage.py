@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+
+import pytest
+
+import storage
+from gift_registry import reserve_purchase
+
+# A registry as the admin page writes it before any gift has a link or a buyer:
+# the link and session columns are empty on every row
+REGISTRY_WITHOUT_LINKS = (
+    '"id";"name";"description";"url";"image_url";"purchased";"session_id";'
+    '"quantity_total";"quantity_purchased";"purchase_details"\n'
+    '"gift_toaster";"Toaster";"Für das Frühstück";"";"";False;"";1;0;"[]"\n'
+    '"gift_teller";"Teller";"6 Stück";"";"";False;"";6;0;"[]"\n'
+)
+
+
+def test_registry_without_links_loads_text_columns_as_strings(tmp_path):
+    path = tmp_path / "gift_registry.csv"
+    path.write_text(REGISTRY_WITHOUT_LINKS, encoding="utf-8")
+
+    df = storage.read_gift_registry_csv(str(path))
+
+    for col in ('url', 'image_url', 'session_id'):
+        assert df[col].tolist() == ['', '']
+        assert df[col].str.strip().tolist() == ['', '']  # what the wishlist cards call
+
+
+def test_registry_without_links_accepts_a_first_purchase(tmp_path):
+    path = tmp_path / "gift_registry.csv"
+    path.write_text(REGISTRY_WITHOUT_LINKS, encoding="utf-8")
+
+    changed = storage.update_gift_registry_csv(
+        str(path), lambda df: reserve_purchase(df, 'gift_teller', 'usr_anna', 2)
+    )
+
+    assert changed
+    df = storage.read_gift_registry_csv(str(path))
+    assert df.at['gift_teller', 'session_id'] == 'usr_anna'
+    assert df.at['gift_teller', 'quantity_purchased'] == 2
+    assert json.loads(df.at['gift_teller', 'purchase_details']) == [{'user_id': 'usr_anna', 'quantity': 2}]
+    assert df.at['gift_toaster', 'url'] == ''
+
+
+# All-or-nothing RSVP appends
+
+PARTY = [
+    {'contact_name': 'Anna Weber', 'guest_first_name': 'Anna', 'comments': 'Wir freuen uns, "sehr"!'},
+    {'contact_name': 'Anna Weber', 'guest_first_name': 'Ben', 'comments': 'Zeile 1\nZeile 2'},
+]
+
+
+def rsvp_file(tmp_path, text="contact_name,guest_first_name,comments\nCarla Roth,Carla,\n"):
+    path = tmp_path / "rsvps.csv"
+    path.write_bytes(text.encode("utf-8"))
+    return path
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_append_writes_the_whole_party(tmp_path):
+    path = rsvp_file(tmp_path)
+
+    storage.append_rows(str(path), PARTY)
+
+    assert [row['guest_first_name'] for row in read_rows(path)] == ['Carla', 'Anna', 'Ben']
+    assert read_rows(path)[2]['comments'] == 'Zeile 1\nZeile 2'
+
+
+def test_failed_write_is_rolled_back(tmp_path, monkeypatch):
+    path = rsvp_file(tmp_path)
+    before = path.read_bytes()
+    real_write = storage.os.write
+
+    def failing_write(fd, data):
+        real_write(fd, data[:len(data) // 2])  # part of the party reaches the file, then the disk is full
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(storage.os, "write", failing_write)
+
+    with pytest.raises(OSError):
+        storage.append_rows(str(path), PARTY)
+    assert path.read_bytes() == before
+
+
+def test_short_write_is_rolled_back(tmp_path, monkeypatch):
+    path = rsvp_file(tmp_path)
+    before = path.read_bytes()
+    real_write = storage.os.write
+    monkeypatch.setattr(storage.os, "write", lambda fd, data: real_write(fd, data[:10]))
+
+    with pytest.raises(OSError, match="Short write"):
+        storage.append_rows(str(path), PARTY)
+    assert path.read_bytes() == before
+
+
+def test_append_after_a_missing_trailing_newline(tmp_path):
+    path = rsvp_file(tmp_path, "contact_name,guest_first_name,comments\nCarla Roth,Carla,Bis bald")
+
+    storage.append_rows(str(path), PARTY)
+
+    rows = read_rows(path)
+    assert [row['guest_first_name'] for row in rows] == ['Carla', 'Anna', 'Ben']
+    assert rows[0]['comments'] == 'Bis bald'
+
+
+def test_new_column_rewrites_the_file_keeping_existing_rows(tmp_path):
+    path = rsvp_file(tmp_path)
+    party = [dict(row, dietary_requirements='Vegan' if row['guest_first_name'] == 'Ben' else None)
+             for row in PARTY]
+
+    storage.append_rows(str(path), party)
+
+    assert storage.read_header(str(path)) == ['contact_name', 'guest_first_name', 'comments', 'dietary_requirements']
+    rows = read_rows(path)
+    assert [row['guest_first_name'] for row in rows] == ['Carla', 'Anna', 'Ben']
+    assert [row['dietary_requirements'] for row in rows] == ['', '', 'Vegan']
+    assert [name for name in os.listdir(tmp_path) if name.startswith(".tmp_")] == []
+
+
+def test_append_to_a_new_file_writes_the_header(tmp_path):
+    path = tmp_path / "rsvps.csv"
+
+    storage.append_rows(str(path), PARTY)
+
+    assert storage.read_header(str(path)) == ['contact_name', 'guest_first_name', 'comments']
+    assert len(read_rows(path)) == 2
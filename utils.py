@@ -1,16 +1,47 @@
 import streamlit as st
-import pandas as pd
 import os
-import csv
-from datetime import datetime, timedelta
-import pytz
 import uuid
-import json
-import json
+import threading
+from contextlib import ExitStack
+
+import perf
+import storage
+import image_pipeline
+import sqlite_store
+from rsvp_aggregates import RSVPAggregates
+from rsvp_search import RSVPSearchIndex
+from rsvp_edits import apply_changeset
+import rsvp_exports
+from rsvp_schema import TEXT_DTYPE, read_rsvps_csv, typed_rsvps
+from gift_registry import (
+    GiftRegistrySnapshot, reserve_purchase, release_purchase,
+    insert_gift, apply_gift_changes, remove_gift
+)
+from deadline_policy import DeadlinePolicy
+from app_logging import get_logger
+
+log = get_logger(__name__)
 
 # CSV file path
 CSV_FILE = st.secrets["files"]["csv_file"]
 
+# Storage backend: "csv" (default) or "sqlite"
+STORAGE_BACKEND = st.secrets["files"].get("backend", "csv")
+SQLITE_FILE = st.secrets["files"].get("sqlite_file", "wedding.db")
+
+@st.cache_resource(show_spinner=False)
+def prepare_images():
+    """Convert new or changed photos in images/ once per server process (in the background)"""
+    def run():
+        try:
+            image_pipeline.build()
+        except Exception:
+            log.exception("Could not prepare images")
+
+    thread = threading.Thread(target=run, name="prepare-images", daemon=True)
+    thread.start()
+    return thread
+
 def get_browser_id():
     """Get or create a persistent browser ID using query params"""
     
@@ -21,108 +52,260 @@ def get_browser_id():
         
         if browser_id:
             st.session_state.browser_id = browser_id
-            print(f"[DEBUG] Loaded browser ID from query params: {browser_id}")
+            log.debug("Loaded browser ID from query params", extra={'browser_id': browser_id})
         else:
             # Generate new ID
             new_id = 'usr_' + str(uuid.uuid4())[:12]
             st.session_state.browser_id = new_id
             st.query_params['uid'] = new_id
-            print(f"[DEBUG] Generated new browser ID: {new_id}")
+            log.debug("Generated new browser ID", extra={'browser_id': new_id})
     
     return st.session_state.browser_id
 
+# Parsed RSVP data is shared by all sessions until the stored data changes
+_rsvp_generation = 0
+
+def _invalidate_rsvp_cache():
+    """Force the next load_rsvps() to re-read the stored RSVPs"""
+    global _rsvp_generation
+    _rsvp_generation += 1
+
+def _file_signature(paths):
+    """(mtime_ns, size) of each path, None for missing files"""
+    file_stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            file_stats.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            file_stats.append(None)
+    return tuple(file_stats)
+
+def _storage_paths(csv_path):
+    """Files whose change means the data stored for csv_path may have changed"""
+    if STORAGE_BACKEND == "sqlite":
+        return [SQLITE_FILE, SQLITE_FILE + "-wal"]
+    return [csv_path]
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_rsvps_cached(signature):
+    """Parse the RSVPs once per signature (shared by all sessions)"""
+    return _read_rsvps()
+
+@perf.timed("rsvps.load")
 def load_rsvps():
-    """Load existing RSVP data from CSV file"""
+    """Load existing RSVP data, re-reading only if it changed since the last call
+
+    Returns a copy, so callers are free to modify it.
+    """
+    return _load_rsvps_cached(_rsvp_data_signature()).copy()
+
+def _rsvp_data_signature():
+    """Key that changes whenever the stored RSVPs may have changed"""
+    return (_rsvp_generation, _file_signature(_storage_paths(CSV_FILE)))
+
+@perf.timed("rsvps.read")
+def _read_rsvps():
+    """Load existing RSVP data from the configured storage backend"""
+    import pandas as pd
+
+    if STORAGE_BACKEND == "sqlite":
+        return typed_rsvps(sqlite_store.load_rsvps(SQLITE_FILE))
     if os.path.exists(CSV_FILE):
         try:
-            return pd.read_csv(CSV_FILE, dtype={'contact_phone': str})
-        except:
+            with storage.file_lock(CSV_FILE, shared=True):
+                return read_rsvps_csv(CSV_FILE)
+        except Exception:
+            log.exception("Could not read RSVPs", extra={'path': CSV_FILE})
             return pd.DataFrame()
     return pd.DataFrame()
 
 def save_rsvp(rsvp_data):
-    """Save RSVP data to CSV file"""
-    df = load_rsvps()
-    new_df = pd.DataFrame([rsvp_data])
-    df = pd.concat([df, new_df], ignore_index=True)
-    # Ensure phone numbers are saved as strings
-    if 'contact_phone' in df.columns:
-        df['contact_phone'] = df['contact_phone'].astype(str)
-    df.to_csv(CSV_FILE, index=False)
+    """Append a single RSVP row to the CSV file"""
+    save_rsvp_batch([rsvp_data])
 
+@perf.timed("rsvps.append")
+def save_rsvp_batch(rsvp_rows):
+    """Append all rows of one submission (e.g. a whole party) in one write
+
+    Either every row is stored or none of them is.
+    """
+    views = _rsvp_views()
+    with ExitStack() as stack:
+        for view in views:
+            stack.enter_context(view.lock)
+        # Only add the new rows to views that matched the data before this write
+        signature = _file_signature(_storage_paths(CSV_FILE))
+        up_to_date = [view.signature == signature for view in views]
+        for view in views:
+            view.signature = None
+        try:
+            if STORAGE_BACKEND == "sqlite":
+                sqlite_store.append_rsvps(SQLITE_FILE, rsvp_rows)
+            else:
+                storage.append_rows(CSV_FILE, rsvp_rows)
+        finally:
+            _invalidate_rsvp_cache()
+        signature = _file_signature(_storage_paths(CSV_FILE))
+        for view, view_up_to_date in zip(views, up_to_date):
+            if view_up_to_date:
+                view.add_rows(rsvp_rows)
+                view.signature = signature
+
+@perf.timed("rsvps.rewrite")
 def save_rsvps(df):
-    """Save entire RSVP dataframe to CSV file"""
-    # Ensure phone numbers are saved as strings
+    """Save entire RSVP dataframe to CSV file (used for admin edits)"""
+    # Ensure phone numbers are saved as strings (empty stays empty, not "nan")
     if 'contact_phone' in df.columns:
-        df['contact_phone'] = df['contact_phone'].astype(str)
-    df.to_csv(CSV_FILE, index=False)
+        df['contact_phone'] = df['contact_phone'].astype(TEXT_DTYPE)
+    views = _rsvp_views()
+    with ExitStack() as stack:
+        for view in views:
+            stack.enter_context(view.lock)
+            view.signature = None
+        try:
+            if STORAGE_BACKEND == "sqlite":
+                sqlite_store.replace_rsvps(SQLITE_FILE, df)
+            else:
+                storage.write_dataframe(CSV_FILE, df)
+        finally:
+            _invalidate_rsvp_cache()
+        signature = _file_signature(_storage_paths(CSV_FILE))
+        for view in views:
+            view.rebuild(df, signature)
+
+@perf.timed("rsvps.update")
+def save_rsvp_changes(changeset):
+    """Apply row-level admin edits (see rsvp_edits) to the current stored RSVPs
+
+    Returns (number of rows changed, conflicts). Rows changed by someone
+    else since the admin loaded them are skipped and reported as conflicts;
+    RSVPs submitted meanwhile are kept.
+    """
+    if not changeset:
+        return 0, []
+
+    result = (0, [])
+    def update(df):
+        nonlocal result
+        result = apply_changeset(df, changeset)
+        return result[0] > 0
 
-# Deadline utility functions
-def get_deadline_datetime():
-    """Get the deadline datetime from secrets configuration"""
     try:
-        deadline_str = st.secrets["deadline"]["deadline_datetime"]
-        timezone_str = st.secrets["deadline"].get("timezone", "UTC")
+        if STORAGE_BACKEND == "sqlite":
+            result = sqlite_store.update_rsvps(SQLITE_FILE, changeset)
+        else:
+            storage.update_dataframe(CSV_FILE, update, dtype={'contact_phone': str})
+    finally:
+        _invalidate_rsvp_cache()
+        # Edits can keep the file size (and, within the timestamp granularity,
+        # the mtime), so don't rely on the signature to notice them
+        for view in _rsvp_views():
+            with view.lock:
+                view.signature = None
+    return result
+
+@st.cache_resource(max_entries=len(rsvp_exports.EXPORTS), show_spinner=False)
+def _build_rsvp_export(kind, signature):
+    """Build an export once per data version (shared by all sessions)"""
+    # Read-only use, so the cached frame is used without the defensive copy
+    df = _load_rsvps_cached(signature)
+    with perf.timed(f"rsvps.export.{kind}"):
+        return rsvp_exports.build_export(kind, df)
+
+def get_rsvp_export(kind):
+    """Contents of a download file (see rsvp_exports.EXPORTS) for the current RSVPs"""
+    return _build_rsvp_export(kind, _rsvp_data_signature())
+
+# Structures derived from the RSVPs (totals, search index). Appends update
+# them in place; full rewrites and changes made outside the app rebuild them.
+
+@st.cache_resource(show_spinner=False)
+def _get_rsvp_aggregates():
+    """The process-wide RSVP totals (see rsvp_aggregates)"""
+    return RSVPAggregates()
+
+@st.cache_resource(show_spinner=False)
+def _get_rsvp_search_index():
+    """The process-wide RSVP name index (see rsvp_search)"""
+    return RSVPSearchIndex()
+
+def _rsvp_views():
+    return [_get_rsvp_aggregates(), _get_rsvp_search_index()]
+
+def _synced(view, force=False):
+    """Rebuild a view from the stored RSVPs if it doesn't match them anymore"""
+    with view.lock:
+        signature = _file_signature(_storage_paths(CSV_FILE))
+        if force or view.signature != signature:
+            view.rebuild(load_rsvps(), signature)
+    return view
+
+def get_rsvp_aggregates():
+    """RSVP totals for the dashboards, recounted only if the data changed outside the save functions"""
+    return _synced(_get_rsvp_aggregates())
+
+def rebuild_rsvp_aggregates():
+    """Recount the RSVP totals from the stored data"""
+    _invalidate_rsvp_cache()
+    return _synced(_get_rsvp_aggregates(), force=True)
+
+@perf.timed("rsvps.search")
+def search_rsvps(df, query):
+    """Rows of df (as returned by load_rsvps) whose names match the query"""
+    positions = _synced(_get_rsvp_search_index()).search(query)
+    # The index may already include rows appended after df was loaded
+    return df.iloc[[p for p in positions if p < len(df)]]
 
-        # Parse the deadline string
-        deadline_naive = datetime.strptime(deadline_str, "%Y-%m-%d %H:%M")
+# Deadline utility functions
 
-        # Add timezone
-        tz = pytz.timezone(timezone_str)
-        deadline_tz = tz.localize(deadline_naive)
+# Bumped by the settings page after saving, so the policy is rebuilt right away
+_deadline_generation = 0
+
+def reload_deadline_policy():
+    """Drop the cached deadline policy (call after changing the [deadline] settings)"""
+    global _deadline_generation
+    _deadline_generation += 1
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_deadline_policy(settings, generation):
+    """Parse the deadline settings once per revision (shared by all sessions)"""
+    policy = DeadlinePolicy.from_settings(dict(settings))
+    if policy.error:
+        log.error("Error parsing deadline configuration: %s", policy.error)
+    return policy
+
+def get_deadline_policy():
+    """The DeadlinePolicy for the current [deadline] settings"""
+    settings = tuple(sorted(st.secrets.get("deadline", {}).items()))
+    policy = _load_deadline_policy(settings, _deadline_generation)
+    if policy.error:
+        st.error(f"Error parsing deadline configuration: {policy.error}")
+    return policy
+
+def get_deadline_status():
+    """DeadlineStatus for this moment; use one per rerun instead of the single checks below"""
+    return get_deadline_policy().status()
 
-        return deadline_tz
-    except Exception as e:
-        st.error(f"Error parsing deadline configuration: {e}")
-        return None
+def get_deadline_datetime():
+    """Get the deadline datetime from secrets configuration"""
+    return get_deadline_policy().deadline
 
 def is_past_deadline():
     """Check if the current time is past the RSVP deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
-
-    now = datetime.now(deadline.tzinfo)
-    return now > deadline
+    return get_deadline_status().past
 
 def is_within_grace_period():
     """Check if we're within the admin grace period after deadline"""
-    if not is_past_deadline():
-        return False
-
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
-
-    grace_hours = st.secrets["deadline"].get("grace_period_hours", 24)
-    grace_period = timedelta(hours=grace_hours)
-
-    now = datetime.now(deadline.tzinfo)
-    return now <= (deadline + grace_period)
+    return get_deadline_status().in_grace
 
 def is_within_warning_period():
     """Check if we're within the warning period before deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return False
-
-    warning_days = st.secrets["deadline"].get("warning_days", 7)
-    warning_period = timedelta(days=warning_days)
-
-    now = datetime.now(deadline.tzinfo)
-    return (deadline - warning_period) <= now <= deadline
+    return get_deadline_status().in_warning
 
 def get_time_until_deadline():
     """Get the time remaining until the deadline"""
-    deadline = get_deadline_datetime()
-    if deadline is None:
-        return None
-
-    now = datetime.now(deadline.tzinfo)
-    if now > deadline:
-        return timedelta(0)  # Past deadline
-
-    return deadline - now
+    return get_deadline_status().remaining
 
 def format_time_remaining(time_delta):
     """Format time remaining in a human-readable format"""
@@ -146,223 +329,162 @@ def format_time_remaining(time_delta):
 # Gift Registry utility functions
 GIFT_REGISTRY_FILE = "gift_registry.csv"
 
+# Bumped on every write from this process so cached snapshots are dropped
+# even if the file's mtime doesn't change (coarse timestamps)
+_gift_registry_generation = 0
+
+def _invalidate_gift_registry_snapshot():
+    """Force the next snapshot request to reload the gift registry"""
+    global _gift_registry_generation
+    _gift_registry_generation += 1
+
+def _gift_registry_signature():
+    """Key that changes whenever the stored gift registry may have changed"""
+    return (_gift_registry_generation, _file_signature(_storage_paths(GIFT_REGISTRY_FILE)))
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_gift_registry_snapshot(signature):
+    """Load a snapshot for the given signature (shared by all sessions)"""
+    return GiftRegistrySnapshot(load_gift_registry_rows())
+
+@perf.timed("gifts.snapshot")
+def get_gift_registry_snapshot():
+    """Get the current gift registry snapshot, reloading only if it changed"""
+    return _load_gift_registry_snapshot(_gift_registry_signature())
+
+@perf.timed("gifts.read_rows")
+def load_gift_registry_rows():
+    """Load the gift registry as a list of dicts (no pandas, enough for the snapshot)"""
+    try:
+        if STORAGE_BACKEND == "sqlite":
+            return sqlite_store.load_gift_registry_rows(SQLITE_FILE)
+        return storage.read_gift_registry_rows(GIFT_REGISTRY_FILE)
+    except Exception as e:
+        log.exception("Error loading gift registry")
+        st.error(f"Error loading gift registry: {e}")
+        return []
+
+@perf.timed("gifts.read")
 def load_gift_registry():
-    """Load gift registry data from CSV file"""
-    if os.path.exists(GIFT_REGISTRY_FILE):
-        try:
-            df = pd.read_csv(
-                GIFT_REGISTRY_FILE, 
-                sep=';',
-                quotechar='"',
-                doublequote=True,
-                encoding='utf-8'
-            )
-            # Ensure purchased column is boolean
-            df['purchased'] = df['purchased'].astype(bool)
-            
-            # Convert literal \n to actual line breaks in text columns
-            text_columns = ['name', 'description']
-            for col in text_columns:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace('\\n', '\n', regex=False)
-            
-            # Add quantity columns if they don't exist
-            if 'quantity_total' not in df.columns:
-                df['quantity_total'] = 1
-            if 'quantity_purchased' not in df.columns:
-                df['quantity_purchased'] = 0
-            if 'purchase_details' not in df.columns:
-                df['purchase_details'] = '[]'
-            
-            # Fill NaN values with defaults
-            df['quantity_total'] = df['quantity_total'].fillna(1).astype(int)
-            df['quantity_purchased'] = df['quantity_purchased'].fillna(0).astype(int)
-            df['purchase_details'] = df['purchase_details'].fillna('[]').astype(str)
-            
-            return df
-        except Exception as e:
-            st.error(f"Error loading gift registry: {e}")
-            return pd.DataFrame(columns=['name', 'description', 'url', 'image_url', 'purchased', 'session_id', 'quantity_total', 'quantity_purchased', 'purchase_details'])
-    return pd.DataFrame(columns=['name', 'description', 'url', 'image_url', 'purchased', 'session_id', 'quantity_total', 'quantity_purchased', 'purchase_details'])
+    """Load gift registry data from the configured storage backend"""
+    import pandas as pd
+
+    try:
+        if STORAGE_BACKEND == "sqlite":
+            return sqlite_store.load_gift_registry(SQLITE_FILE)
+        return storage.read_gift_registry_csv(GIFT_REGISTRY_FILE)
+    except Exception as e:
+        log.exception("Error loading gift registry")
+        st.error(f"Error loading gift registry: {e}")
+        return pd.DataFrame(columns=storage.GIFT_COLUMNS)
 
+@perf.timed("gifts.rewrite")
 def save_gift_registry(df):
-    """Save gift registry dataframe to CSV file"""
+    """Save gift registry dataframe to the configured storage backend"""
     try:
-        df.to_csv(
-            GIFT_REGISTRY_FILE, 
-            index=False, 
-            sep=';',
-            quotechar='"',
-            quoting=csv.QUOTE_NONNUMERIC,
-            doublequote=True,
-            encoding='utf-8'
-        )
+        if STORAGE_BACKEND == "sqlite":
+            sqlite_store.save_gift_registry(SQLITE_FILE, df)
+        else:
+            storage.write_gift_registry_csv(GIFT_REGISTRY_FILE, df)
+        _invalidate_gift_registry_snapshot()
         return True
     except Exception as e:
+        log.exception("Error saving gift registry")
         st.error(f"Error saving gift registry: {e}")
         return False
 
-def mark_gift_as_purchased(gift_index, quantity=1):
-    """Mark a gift as purchased by the current browser with specified quantity"""
-    df = load_gift_registry()
-    browser_id = get_browser_id()
-    
-    # Debug logging
-    print(f"[DEBUG] Marking gift {gift_index} as purchased by {browser_id}, quantity: {quantity}")
-    
-    if 0 <= gift_index < len(df):
-        total_available = int(df.at[gift_index, 'quantity_total'])
-        current_purchased = int(df.at[gift_index, 'quantity_purchased'])
-        
-        # Don't allow purchasing more than available
-        remaining = total_available - current_purchased
-        quantity = min(quantity, remaining)
-        
-        if quantity <= 0:
-            return False
-        
-        # Load purchase details
-        try:
-            purchase_details = json.loads(df.at[gift_index, 'purchase_details'])
-        except:
-            purchase_details = []
-        
-        # Check if user already has a purchase record
-        user_found = False
-        for purchase in purchase_details:
-            if purchase['user_id'] == browser_id:
-                purchase['quantity'] += quantity
-                user_found = True
-                break
-        
-        # Add new purchase record if user not found
-        if not user_found:
-            purchase_details.append({'user_id': browser_id, 'quantity': quantity})
-        
-        # Update dataframe
-        new_purchased = current_purchased + quantity
-        df.at[gift_index, 'quantity_purchased'] = new_purchased
-        df.at[gift_index, 'purchase_details'] = json.dumps(purchase_details)
-        df.at[gift_index, 'session_id'] = browser_id  # Keep for backward compatibility
-        
-        # Mark as fully purchased if quantity reached
-        if new_purchased >= total_available:
-            df.at[gift_index, 'purchased'] = True
-        
-        result = save_gift_registry(df)
-        print(f"[DEBUG] Save result: {result}, new quantity: {new_purchased}/{total_available}")
-        return result
-    print(f"[DEBUG] Invalid gift index: {gift_index}")
-    return False
+def _change_gift_registry(sqlite_change, csv_change):
+    """Apply one change atomically with the configured backend
 
-def unmark_gift_as_purchased(gift_index, quantity=None):
+    ``sqlite_change`` is called without arguments, ``csv_change`` gets the
+    freshly read registry dataframe while the registry lock is held.
+    """
+    try:
+        if STORAGE_BACKEND == "sqlite":
+            result = sqlite_change()
+        else:
+            result = storage.update_gift_registry_csv(GIFT_REGISTRY_FILE, csv_change)
+    except Exception as e:
+        log.exception("Error saving gift registry")
+        st.error(f"Error saving gift registry: {e}")
+        return False
+
+    _invalidate_gift_registry_snapshot()
+    return bool(result)
+
+@perf.timed("gifts.add")
+def add_gift(gift):
+    """Add a new gift (dict with name, description, url, image_url, quantity_total)"""
+    return _change_gift_registry(
+        lambda: sqlite_store.add_gift(SQLITE_FILE, gift),
+        lambda df: insert_gift(df, gift)
+    )
+
+@perf.timed("gifts.update")
+def update_gift(gift_id, changes):
+    """Update the editable fields of one gift without touching its purchases"""
+    return _change_gift_registry(
+        lambda: sqlite_store.update_gift(SQLITE_FILE, gift_id, changes),
+        lambda df: apply_gift_changes(df, gift_id, changes)
+    )
+
+@perf.timed("gifts.delete")
+def delete_gift(gift_id):
+    """Delete one gift"""
+    return _change_gift_registry(
+        lambda: sqlite_store.delete_gift(SQLITE_FILE, gift_id),
+        lambda df: remove_gift(df, gift_id)
+    )
+
+@perf.timed("gifts.purchase")
+def mark_gift_as_purchased(gift_id, quantity=1):
+    """Mark a gift as purchased by the current browser with specified quantity
+
+    The availability check and the write happen atomically, so concurrent
+    sessions can never buy more than quantity_total.
+    """
+    browser_id = get_browser_id()
+    result = _change_gift_registry(
+        lambda: sqlite_store.mark_gift_as_purchased(SQLITE_FILE, gift_id, browser_id, quantity),
+        lambda df: reserve_purchase(df, gift_id, browser_id, quantity)
+    )
+    log.debug("Marked gift as purchased", extra={
+        'gift_id': gift_id, 'browser_id': browser_id, 'quantity': quantity, 'ok': result
+    })
+    return result
+
+@perf.timed("gifts.release")
+def unmark_gift_as_purchased(gift_id, quantity=None):
     """Unmark a gift as purchased - only removes purchases by the current user
     If quantity is None, removes all purchases by this user
     If quantity is specified, removes that many items purchased by this user
     """
-    df = load_gift_registry()
     browser_id = get_browser_id()
-    
-    if 0 <= gift_index < len(df):
-        # Load purchase details
-        try:
-            purchase_details = json.loads(df.at[gift_index, 'purchase_details'])
-        except:
-            purchase_details = []
-        
-        # Find user's purchase
-        user_purchase = None
-        user_index = None
-        for i, purchase in enumerate(purchase_details):
-            if purchase['user_id'] == browser_id:
-                user_purchase = purchase
-                user_index = i
-                break
-        
-        if user_purchase is None:
-            print(f"[DEBUG] No purchase found for user {browser_id}")
-            return False  # User has no purchases
-        
-        # Calculate quantity to remove
-        if quantity is None:
-            qty_to_remove = user_purchase['quantity']
-        else:
-            qty_to_remove = min(quantity, user_purchase['quantity'])
-        
-        # Update user's purchase
-        user_purchase['quantity'] -= qty_to_remove
-        
-        # Remove user from list if they have no more purchases
-        if user_purchase['quantity'] <= 0:
-            purchase_details.pop(user_index)
-        
-        # Update total quantity purchased
-        current_total = int(df.at[gift_index, 'quantity_purchased'])
-        new_total = current_total - qty_to_remove
-        
-        # Update dataframe
-        df.at[gift_index, 'quantity_purchased'] = new_total
-        df.at[gift_index, 'purchase_details'] = json.dumps(purchase_details)
-        
-        # Update purchased flag
-        total_available = int(df.at[gift_index, 'quantity_total'])
-        df.at[gift_index, 'purchased'] = (new_total >= total_available)
-        
-        # Update session_id (set to last purchaser or empty)
-        if purchase_details:
-            df.at[gift_index, 'session_id'] = purchase_details[-1]['user_id']
-        else:
-            df.at[gift_index, 'session_id'] = ''
-        
-        print(f"[DEBUG] Removed {qty_to_remove} items for user {browser_id}, new total: {new_total}")
-        return save_gift_registry(df)
-    
-    return False
 
-def can_undo_purchase(gift_index):
+    # Nothing to undo if the purchase index has no record for this browser
+    if gift_id not in get_gift_registry_snapshot().purchases_for_user(browser_id):
+        log.debug("No purchase to undo", extra={'gift_id': gift_id, 'browser_id': browser_id})
+        return False
+
+    result = _change_gift_registry(
+        lambda: sqlite_store.unmark_gift_as_purchased(SQLITE_FILE, gift_id, browser_id, quantity),
+        lambda df: release_purchase(df, gift_id, browser_id, quantity)
+    )
+    log.debug("Removed purchases of gift", extra={
+        'gift_id': gift_id, 'browser_id': browser_id, 'quantity': quantity, 'ok': result
+    })
+    return result
+
+def can_undo_purchase(gift_id):
     """Check if the current browser can undo the purchase of this gift
     Returns True if the current user has made any purchases
     """
-    df = load_gift_registry()
-    browser_id = get_browser_id()
-    
-    if 0 <= gift_index < len(df):
-        # Load purchase details
-        try:
-            purchase_details = json.loads(df.at[gift_index, 'purchase_details'])
-        except:
-            return False
-        
-        # Check if user has any purchases
-        for purchase in purchase_details:
-            if purchase['user_id'] == browser_id and purchase['quantity'] > 0:
-                print(f"[DEBUG] User {browser_id} can undo {purchase['quantity']} items")
-                return True
-        
-        return False
-    return False
+    return get_gift_registry_snapshot().can_undo_purchase(gift_id, get_browser_id())
 
-def get_remaining_quantity(gift_index):
+def get_remaining_quantity(gift_id):
     """Get the remaining quantity available for a gift"""
-    df = load_gift_registry()
-    
-    if 0 <= gift_index < len(df):
-        total = int(df.at[gift_index, 'quantity_total'])
-        purchased = int(df.at[gift_index, 'quantity_purchased'])
-        return max(0, total - purchased)
-    return 0
+    return get_gift_registry_snapshot().remaining_quantity(gift_id)
 
-def get_user_purchased_quantity(gift_index):
+def get_user_purchased_quantity(gift_id):
     """Get the quantity purchased by the current user for a specific gift"""
-    df = load_gift_registry()
-    browser_id = get_browser_id()
-    
-    if 0 <= gift_index < len(df):
-        try:
-            purchase_details = json.loads(df.at[gift_index, 'purchase_details'])
-            for purchase in purchase_details:
-                if purchase['user_id'] == browser_id:
-                    return purchase['quantity']
-        except:
-            pass
-    return 0
+    return get_gift_registry_snapshot().user_purchased_quantity(gift_id, get_browser_id())